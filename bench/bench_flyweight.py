@@ -0,0 +1,62 @@
+"""Race per character: a private copy of the structure against one interned instance.
+
+Reports memory per character and the cost of comparing races."""
+
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+import gc
+import tracemalloc
+from argparse import ArgumentParser
+from copy import deepcopy
+from time import perf_counter
+
+import status
+from status import Race
+
+
+def measure(build) -> tuple[list, float]:
+    gc.collect()
+    tracemalloc.start()
+    races = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return races, size
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+    status.structure_folder = realpath(f"{__file__}/../../structures/") + "/"
+    data = status._AFS_loader("races", "human")
+    human = Race.loader("human")
+
+    copies, copies_size = measure(lambda: [Race(**deepcopy(data)) for _ in range(args.count)])
+    names, names_size = measure(lambda: ["".join(["hu", "man"]) for _ in range(args.count)])
+    interned, interned_size = measure(lambda: [Race.intern("".join(["hu", "man"])) for _ in range(args.count)])
+    assert all(race is human for race in interned)
+
+    print(f"{args.count} characters, bytes of Race per character")
+    print(f"  private copy   {copies_size / args.count:8.1f}")
+    print(f"  name string    {names_size / args.count:8.1f}")
+    print(f"  interned       {interned_size / args.count:8.1f}")
+
+    start = perf_counter()
+    sum(1 for name in names if name == "human")
+    by_name = perf_counter() - start
+    start = perf_counter()
+    sum(1 for race in copies if race.Race["Name"] == "Human")
+    by_content = perf_counter() - start
+    start = perf_counter()
+    sum(1 for race in interned if race is human)
+    by_identity = perf_counter() - start
+    print("comparison, ns per character")
+    print(f"  copy content   {by_content / args.count * 1e9:8.1f}")
+    print(f"  name string    {by_name / args.count * 1e9:8.1f}")
+    print(f"  identity       {by_identity / args.count * 1e9:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
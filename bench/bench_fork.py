@@ -0,0 +1,59 @@
+"""What-if branches of one character: copy.deepcopy against BaseCharacter.fork, time and memory."""
+
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+from argparse import ArgumentParser
+from copy import deepcopy
+from time import perf_counter
+from tracemalloc import get_traced_memory, start as start_tracing, stop as stop_tracing
+
+from status import Attribute, BaseCharacter, CharAttribute
+
+
+def measure(branch, count: int) -> tuple[float, int]:
+    """Seconds per branch and bytes held by count branches."""
+    start = perf_counter()
+    branches = [branch() for _ in range(count)]
+    elapsed = perf_counter() - start
+    del branches
+    # Traced apart from the timing, tracemalloc slows allocation down.
+    start_tracing()
+    branches = [branch() for _ in range(count)]
+    held = get_traced_memory()[0]
+    stop_tracing()
+    del branches
+    return elapsed / count, held
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--branches", type=int, default=10_000)
+    args = parser.parse_args()
+    hero = BaseCharacter(CharAttribute(12, 40, 0, 1, 1, 1, "Hero", "human", 20, {"Slash": "basic"}, 0),
+                         Attribute(*[10] * 13))
+
+    def deepcopy_preview(amount=0):
+        preview = deepcopy(hero)
+        if amount:
+            preview.grant_exp(amount)
+        return preview
+
+    def fork_preview(amount=0):
+        preview = hero.fork()
+        if amount:
+            preview.grant_exp(amount)
+            preview.diff()
+        return preview
+
+    print("  %-22s %10s %12s" % ("branch", "us each", "KiB held"))
+    for name, branch in (("deepcopy", deepcopy_preview), ("fork", fork_preview),
+                         ("deepcopy + grant_exp", lambda: deepcopy_preview(5000)),
+                         ("fork + grant_exp+diff", lambda: fork_preview(5000))):
+        elapsed, held = measure(branch, args.branches)
+        print("  %-22s %10.2f %12.1f" % (name, elapsed * 1e6, held / 1024))
+
+
+if __name__ == '__main__':
+    main()
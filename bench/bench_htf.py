@@ -0,0 +1,61 @@
+"""Character sheet rendering: the old replace loop, str.format, Template.render and render_many."""
+
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+from argparse import ArgumentParser
+from time import perf_counter
+
+from lib.htf import Template
+from lib.internal import RandomStream
+from status import Attribute, BaseCharacter, CharAttribute
+
+sheet = """$[Name] ($[Race]), Level $[Level] EXP $[EXP]
+  Str $[Str]  Agi $[Agi]  Dex $[Dex]  Int $[Int]  Luck $[Luck]
+  Wis $[Wis]  Will $[Will]  Vit $[Vit]  Per $[Per]  End $[End]
+  HP $[Max_HealthPoint]  MP $[Max_MagicalPoint]  Atk $[Atk]  Def $[Def]
+  Crit $[Critical_Percentage]%  Evade $[Evade_Percentage]%  Accuracy $[Accuracy]
+"""
+
+
+def replace_loop(string: str, **kwargs) -> str:
+    """The previous lib.htf.format, with its results kept: one scan per key."""
+    for key, val in kwargs.items():
+        string = string.replace(f"$[{key}]", str(val))
+    return string
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=5000)
+    args = parser.parse_args()
+    stats = RandomStream(0).randint_many(1, 999, (args.count, 13)).tolist()
+    records = [BaseCharacter(CharAttribute(n % 90 + 1, n, 0, 1, 1, 1, f"NPC #{n}", "human", 20, {}, 0),
+                             Attribute(*row)).dump_to_jsonable() for n, row in enumerate(stats)]
+    flat = [{**record[0], **record[1], **record[2]} for record in records]
+    template = Template(sheet)
+    str_format = sheet.replace("$[", "{").replace("]", "}")
+
+    timings = {}
+    start = perf_counter()
+    expected = [replace_loop(sheet, **record) for record in flat]
+    timings["replace loop"] = perf_counter() - start
+    start = perf_counter()
+    rendered = [str_format.format(**record) for record in flat]
+    timings["str.format"] = perf_counter() - start
+    start = perf_counter()
+    rendered_template = [template.render(record) for record in flat]
+    timings["Template.render"] = perf_counter() - start
+    start = perf_counter()
+    rendered_many = template.render_many(records)
+    timings["render_many(dump_to_jsonable)"] = perf_counter() - start
+    assert expected == rendered == rendered_template == rendered_many
+
+    print(f"{args.count} character sheets")
+    for name, seconds in timings.items():
+        print(f"  {name:<30} {seconds / args.count * 1e6:8.2f} us/sheet")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Query time of StructureIndex against a linear scan over parsed structures."""
+
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+
+from lib.index import StructureIndex, _describe
+
+_types = ("Armor", "Weapon", "Accessory", "Potion")
+_slots = ("BodyArmor(0)", "BodyArmor(1)", "BodyArmor(2)", "Hand(0)", "Hand(1)", "Finger(0)")
+_folders = ("armor.head", "armor.chest", "armor.legs", "weapons.swords", "weapons.bows", "rings")
+_stats = ("Str", "Agi", "Vit", "Int", "Dex", "Luck", "Atk", "Def", "MAtk", "MDef")
+
+
+def synthetic(count: int, seed: int):
+    rng = Random(seed)
+    for index in range(count):
+        buff = {name: rng.choice(("%s" % rng.randint(1, 50), "%s%%" % rng.randint(1, 50)))
+                for name in rng.sample(_stats, rng.randint(1, 3))}
+        debuff = {name: "%s" % rng.randint(1, 10) for name in rng.sample(_stats, rng.randint(0, 1))}
+        data = {"ItemHeader": {"Type": rng.choice(_types), "Wear_at": rng.choice(_slots)},
+                "Item": {"Name": "Item #%s" % index, "Buff": buff, "Debuff": debuff}}
+        yield "%s.item_%s" % (rng.choice(_folders), index), data
+
+
+def linear(items: list, under: str, buff: str, minimum: float):
+    """What a caller had to do without the index: look at every structure."""
+    found = []
+    for struct_id, data in items:
+        if not struct_id.startswith(under + "."):
+            continue
+        _, values = _describe(struct_id, data)
+        if buff in data["Item"]["Buff"] and values.get(buff, -1) >= minimum:
+            found.append(struct_id)
+    return sorted(found)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    items = list(synthetic(args.items, args.seed))
+    index = StructureIndex()
+    start = perf_counter()
+    for struct_id, data in items:
+        index.add(struct_id, data)
+    print("build      %8.3f s  %s" % (perf_counter() - start, index.stats()))
+
+    queries = [
+        ("under+buff+min", dict(under="armor.head", buff="Luck", minimum={"Luck": 45})),
+        ("type+wear_at", dict(type="Accessory", wear_at="Finger(0)")),
+        ("range %", dict(minimum={"Atk%": 49})),
+        ("4 terms", dict(type="Armor", wear_at="BodyArmor", under="armor", buff="Str", debuff="Agi")),
+    ]
+    for name, query in queries:
+        start = perf_counter()
+        for _ in range(args.queries):
+            result = index.query(**query)
+        print("%-15s %8.1f us  %s hits" % (name, (perf_counter() - start) / args.queries * 1e6, len(result)))
+
+    start = perf_counter()
+    expected = linear(items, "armor.head", "Luck", 45)
+    scan = perf_counter() - start
+    assert expected == index.query(**queries[0][1])
+    print("linear scan     %8.1f us" % (scan * 1e6))
+
+
+if __name__ == '__main__':
+    main()
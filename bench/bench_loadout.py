@@ -0,0 +1,86 @@
+"""Effective stats of NPCs sharing loadouts: summing every item per character against the loadout cache."""
+
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+from argparse import ArgumentParser
+from os import makedirs
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import status
+from lib.modifier import Modifier
+from status import Attribute, BaseCharacter, CharacterPool, CharAttribute, Item
+
+
+def write_items(folder: str, count: int, rng: Random) -> list[str]:
+    makedirs(f"{folder}/items/gear")
+    item_ids = []
+    for index in range(count):
+        buff = "\n".join("    %s: %s" % (name, rng.choice(("%s" % rng.randint(1, 9), "%s%%" % rng.randint(1, 30))))
+                         for name in rng.sample(status._attribute_fields, 3))
+        with open(f"{folder}/items/gear/item_{index}", "w") as f:
+            f.write("ItemHeader:\n  Type: Armor\nItem:\n  Name: Item %s\n  Buff:\n%s\n" % (index, buff))
+        item_ids.append("gear.item_%s" % index)
+    return item_ids
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--npcs", type=int, default=20_000)
+    parser.add_argument("--loadouts", type=int, default=50)
+    parser.add_argument("--items", type=int, default=40)
+    parser.add_argument("--per-loadout", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = Random(args.seed)
+
+    with TemporaryDirectory() as folder:
+        previous, status.structure_folder = status.structure_folder, folder
+        try:
+            item_ids = write_items(folder, args.items, rng)
+            loadouts = [rng.sample(item_ids, args.per_loadout) for _ in range(args.loadouts)]
+            worn = [rng.choice(loadouts) for _ in range(args.npcs)]
+            npcs = [BaseCharacter(CharAttribute(1, 0, 0, 1, 1, 1, "NPC #%s" % index, "human", 20, {}, 0),
+                                  Attribute(*(rng.randint(1, 20) for _ in status._attribute_fields)), trusted=True)
+                    for index in range(args.npcs)]
+            for item_id in item_ids:
+                Item.loader(item_id).modifiers  # parse and compile up front, both sides share it
+
+            start = perf_counter()
+            for loadout in worn:
+                Modifier.sum(status._stat_fields, (Item.loader(item_id).modifiers for item_id in loadout))
+            summed = perf_counter() - start
+            cache = status.loadout_cache()
+            start = perf_counter()
+            for loadout in worn:
+                cache.get(loadout)
+            cached = perf_counter() - start
+            print("combine   summed %8.1f ms  cached %8.1f ms" % (summed * 1e3, cached * 1e3))
+
+            count = min(args.npcs, 2000)
+            start = perf_counter()
+            for npc, loadout in zip(npcs[:count], worn):
+                npc.effective(*(Item.loader(item_id) for item_id in loadout))
+            summed = (perf_counter() - start) / count
+            start = perf_counter()
+            for npc, loadout in zip(npcs[:count], worn):
+                npc.effective(loadout=loadout)
+            cached = (perf_counter() - start) / count
+            print("effective summed %8.1f us  cached %8.1f us  per NPC" % (summed * 1e6, cached * 1e6))
+
+            pool = CharacterPool(npcs)
+            start = perf_counter()
+            pool.effective(worn)
+            pooled = perf_counter() - start
+            print("pool      %8.1f ms for %s NPCs (%.2f us each)" % (pooled * 1e3, args.npcs, pooled / args.npcs * 1e6))
+            stats = cache.stats()
+            print("cache     hit rate %.3f, %s loadouts, %s bytes" % (stats.hit_rate, stats.size, stats.nbytes))
+        finally:
+            status.structure_folder = previous
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Memory per character for the plain, slotted and packed stat blocks."""
+
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+import gc
+import tracemalloc
+from argparse import ArgumentParser
+
+from lib.internal import RandomStream
+from status import (Attribute, BaseCharacter, CharAttribute, PackedAttribute,
+                    SlottedAttribute, SlottedCharAttribute)
+
+variants = {
+    "plain": (Attribute, CharAttribute),
+    "slotted": (SlottedAttribute, SlottedCharAttribute),
+    "packed": (PackedAttribute, SlottedCharAttribute),
+}
+
+
+def measure(attribute_cls, char_attribute_cls, count: int, stats: list) -> tuple[float, float]:
+    """Bytes per character for the three stat blocks alone, and for whole BaseCharacters."""
+    gc.collect()
+    tracemalloc.start()
+    blocks = [(attribute_cls(*row), char_attribute_cls(1, 0, 0, 1, 1, 1, f"NPC #{n}", "human", 20, {}, 0))
+              for n, row in enumerate(stats)]
+    characters = [BaseCharacter(char_attribute, attribute)
+                  for attribute, char_attribute in blocks]
+    total = tracemalloc.get_traced_memory()[0]
+    del characters
+    gc.collect()
+    only_blocks = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del blocks
+    return only_blocks / count, total / count
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=10000)
+    args = parser.parse_args()
+    stats = RandomStream(0).randint_many(
+        1, 999, (args.count, 13)).tolist()
+    print(f"{args.count} characters")
+    print(f"  {'variant':<10} {'Attribute + CharAttribute':>26} {'whole BaseCharacter':>20}")
+    for name, (attribute_cls, char_attribute_cls) in variants.items():
+        blocks, total = measure(attribute_cls, char_attribute_cls, args.count, stats)
+        print(f"  {name:<10} {blocks:>20.0f} bytes {total:>14.0f} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Bytes and microseconds per character for every serializer backend."""
+
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+from argparse import ArgumentParser
+from time import perf_counter
+
+from lib import serializer
+from lib.internal import RandomStream
+from status import Attribute, BaseCharacter, CharAttribute
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=2000)
+    args = parser.parse_args()
+    stats = RandomStream(0).randint_many(1, 999, (args.count, 13)).tolist()
+    characters = [BaseCharacter(CharAttribute(n % 90 + 1, n * 7, 0, 1, 1, 1, f"NPC #{n}", "human", 20, {"Fire": "1"}, n % 3),
+                                Attribute(*row)) for n, row in enumerate(stats)]
+    print(f"{args.count} characters")
+    print(f"  {'backend':<8} {'bytes':>8} {'dump us':>9} {'load us':>9}")
+    for name in serializer.available():
+        backend = serializer.get(name)
+        start = perf_counter()
+        dumped = [character.dump(serializer=name) for character in characters]
+        dump_time = perf_counter() - start
+        start = perf_counter()
+        for data in dumped:
+            backend.loads(data)
+        load_time = perf_counter() - start
+        size = sum(len(data if backend.binary else data.encode("utf8")) for data in dumped)
+        print(f"  {name:<8} {size / args.count:>8.0f} {dump_time / args.count * 1e6:>9.1f} "
+              f"{load_time / args.count * 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
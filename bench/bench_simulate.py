@@ -0,0 +1,39 @@
+"""Population simulator: wall time per worker count, and a digest to show the output does not change."""
+
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+from argparse import ArgumentParser
+from hashlib import sha256
+from os import cpu_count
+from time import perf_counter
+
+from lib.simulate import simulate
+
+
+def digest(result) -> str:
+    h = sha256()
+    for array in (result.levels, result.exp, result.attributes, result.attribute_sums):
+        h.update(array.tobytes())
+    for name in sorted(result.computational):
+        h.update(result.computational[name].tobytes())
+    return h.hexdigest()[:16]
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", default="1,2,4,%s" % (cpu_count() or 1))
+    args = parser.parse_args()
+    print(f"{args.count} characters over {args.days} days, seed {args.seed}")
+    for workers in sorted({int(value) for value in args.workers.split(",")}):
+        start = perf_counter()
+        result = simulate(args.count, args.days, args.seed, workers)
+        print(f"  {workers:>3} workers {perf_counter() - start:8.2f}s  mean level {result.levels[-1].mean():7.2f}  {digest(result)}")
+
+
+if __name__ == "__main__":
+    main()
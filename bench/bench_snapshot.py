@@ -0,0 +1,48 @@
+"""Export time and one-column query time, dump_to_jsonable dicts against a columnar snapshot."""
+
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+import json
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from lib.internal import RandomStream
+from status import Attribute, BaseCharacter, CharacterPool, CharAttribute, Snapshot, write_snapshot
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+    stats = RandomStream(0).randint_many(1, 999, (args.count, 13)).tolist()
+    characters = [BaseCharacter(CharAttribute(n % 90 + 1, 0, 0, 1, 1, 1, f"NPC #{n}", "human", 20, {"Fire": "1"}, n % 3),
+                                Attribute(*row)) for n, row in enumerate(stats)]
+    print(f"{args.count} characters")
+    with TemporaryDirectory() as folder:
+        start = perf_counter()
+        with open(f"{folder}/population.json", "w") as f:
+            json.dump([character.dump_to_jsonable() for character in characters], f, default=str)
+        print(f"  dump_to_jsonable export  {perf_counter() - start:8.3f}s")
+        start = perf_counter()
+        with open(f"{folder}/population.json") as f:
+            mean = sum(row[0]["Str"] for row in json.load(f)) / args.count
+        print(f"  json mean(Str)           {perf_counter() - start:8.3f}s")
+
+        start = perf_counter()
+        write_snapshot(characters, f"{folder}/list")
+        print(f"  write_snapshot(list)     {perf_counter() - start:8.3f}s")
+        pool = CharacterPool(characters)
+        start = perf_counter()
+        write_snapshot(pool, f"{folder}/pool")
+        print(f"  write_snapshot(pool)     {perf_counter() - start:8.3f}s")
+        start = perf_counter()
+        snapshot_mean = Snapshot(f"{folder}/pool").column("Str").mean()
+        print(f"  snapshot mean(Str)       {perf_counter() - start:8.3f}s")
+        assert abs(mean - snapshot_mean) < 1e-6
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Cold start: parsing a structures/ tree from YAML against a structure pack."""
+
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+import os
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from lib.registry import StructureRegistry
+from lib.structpack import StructurePack, build
+
+_item = """ItemHeader:
+  Type: Armor
+  Wear_at: BodyArmor(0)
+Item:
+  Name: Item %(n)s
+  Description: >
+    Generated item number %(n)s.
+  Buff:
+    Atk: '@const:infinity'
+    Luck: %(luck)s%%
+  Debuff:
+    Agi: 1%%
+"""
+
+
+def generate(root: str, count: int):
+    for n in range(count):
+        folder = f"{root}/items/armor/slot{n % 10}"
+        os.makedirs(folder, exist_ok=True)
+        with open(f"{folder}/item{n}", "w") as f:
+            f.write(_item % {"n": n, "luck": n % 50})
+
+
+def timed(func):
+    start = perf_counter()
+    result = func()
+    return perf_counter() - start, result
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=2000)
+    args = parser.parse_args()
+    with TemporaryDirectory() as folder:
+        root = f"{folder}/structures"
+        generate(root, args.count)
+        filename = f"{folder}/structures.pack"
+
+        def yaml_all():
+            registry = StructureRegistry(root, maxsize=args.count)
+            return [registry.get(key) for key in registry.keys()]
+
+        def pack_all():
+            pack = StructurePack(filename, root)
+            return [pack.get(key) for key in pack.keys()]
+
+        def pack_one():
+            pack = StructurePack(filename, root)
+            return pack.get("items.armor.slot0.item0")
+
+        build_time, _ = timed(lambda: build(root, filename))
+        rows = [
+            ("yaml, every entry", timed(yaml_all)[0]),
+            ("pack, every entry", timed(pack_all)[0]),
+            ("pack, one entry", timed(pack_one)[0]),
+        ]
+        print(f"{args.count} structures, pack built in {build_time*1000:.1f} ms "
+              f"({os.path.getsize(filename)} bytes)")
+        for name, seconds in rows:
+            print(f"  {name:<20} {seconds*1000:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
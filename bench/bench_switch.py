@@ -0,0 +1,58 @@
+"""Switch dispatch time against case count, jump table against the old linear scan."""
+
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+from argparse import ArgumentParser
+from time import perf_counter
+
+from lib.general import Call, Switch, SwitchCaseError
+
+
+def linear_do(case: dict, value):
+    """Switch.do as it was before the jump table, for comparison."""
+    for ck, cv in case.items():
+        if ck == value:
+            if isinstance(cv, Call):
+                return cv()
+            elif callable(cv):
+                return cv()
+            else:
+                return cv
+    if value not in case:
+        raise SwitchCaseError("%s does not exists." % value)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--cases", default="10,100,1000,5000")
+    args = parser.parse_args()
+    print(f"  {'cases':>6} {'linear us':>10} {'do us':>8} {'do_many us':>11}")
+    for count in map(int, args.cases.split(",")):
+        case = {}
+        for index in range(count):
+            kind = index % 3
+            case["command-%s" % index] = (Call(str, index) if kind == 0 else
+                                          (lambda index=index: index) if kind == 1 else index)
+        switch = Switch(case)
+        values = ["command-%s" % (index * 7919 % count) for index in range(args.calls)]
+
+        start = perf_counter()
+        for value in values:
+            linear_do(case, value)
+        linear = perf_counter() - start
+        start = perf_counter()
+        for value in values:
+            switch.do(value)
+        single = perf_counter() - start
+        start = perf_counter()
+        switch.do_many(values)
+        batch = perf_counter() - start
+        print(f"  {count:>6} {linear / args.calls * 1e6:>10.3f} {single / args.calls * 1e6:>8.3f} "
+              f"{batch / args.calls * 1e6:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
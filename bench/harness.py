@@ -0,0 +1,302 @@
+"""Benchmark harness for the status hot paths.
+
+Times every case over a range of population sizes, tracks the peak memory
+of each run and compares the results against a stored JSON baseline.
+
+    $ python bench/harness.py --save bench/baseline.json
+    $ python bench/harness.py --compare bench/baseline.json --threshold 0.25
+    $ python bench/harness.py --cases randint,max_exp --sizes 1,1000,1000000
+
+--compare exits with status 1 when a case got slower, or used more memory,
+than the baseline by more than the threshold. Timings are only comparable
+on the same machine; keep one baseline per machine.
+"""
+
+from sys import path
+from os.path import dirname, join, realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+import gc
+import json
+import platform
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+
+import status
+from lib.internal import RandomStream, randint, set_stream
+from status import Attribute, BaseCharacter, CharAttribute, max_exp, validate_many
+
+_root = dirname(dirname(realpath(__file__)))
+default_sizes = (1, 10, 100, 1000, 10_000)
+all_sizes = (1, 10, 100, 1000, 10_000, 100_000, 1_000_000)
+
+
+class Case(NamedTuple):
+    """A benchmark: setup(size) returns the function that is timed.
+
+    A setup holding resources (files, ...) sets a cleanup attribute on that
+    function, which is called once the case was measured. limit is the largest size the case runs at, for cases too slow for 1e6."""
+    name: str
+    setup: Callable[[int], Callable[[], None]]
+    limit: int = all_sizes[-1]
+
+
+class Result(NamedTuple):
+    """Best time over the repeats, per item and for the whole run, and peak memory in bytes."""
+    seconds: float
+    per_item: float
+    peak_bytes: int
+
+
+class Regression(NamedTuple):
+    key: str
+    metric: str
+    baseline: float
+    current: float
+
+    def __str__(self):
+        return "%s %s: %.6g -> %.6g (%+.1f%%)" % (self.key, self.metric, self.baseline, self.current,
+                                                 (self.current / self.baseline - 1) * 100)
+
+
+def _population(size: int) -> list[tuple[CharAttribute, Attribute]]:
+    stats = RandomStream(size).randint_many(1, 999, (size, 13)).tolist()
+    return [(CharAttribute(1, 0, 0, 1, 1, 1, f"NPC #{n}", "human", 20, {"Fire": "1"}, n % 3), Attribute(*row))
+            for n, row in enumerate(stats)]
+
+
+def _characters(size: int) -> list[BaseCharacter]:
+    return [BaseCharacter(char_attribute, attribute, trusted=True) for char_attribute, attribute in _population(size)]
+
+
+def _randint(size):
+    def run():
+        for _ in range(size):
+            randint(1, 5)
+    return run
+
+
+def _max_exp(size):
+    levels = [level % 100 + 1 for level in range(size)]
+
+    def run():
+        for level in levels:
+            max_exp(level)
+    return run
+
+
+def _construct(size):
+    population = _population(size)
+
+    def run():
+        for char_attribute, attribute in population:
+            BaseCharacter(char_attribute, attribute)
+    return run
+
+
+def _validate(size):
+    blocks = [block for pair in _population(size) for block in pair]
+    return lambda: validate_many(blocks)
+
+
+def _cls_calculate(size):
+    characters = _characters(size)
+
+    def run():
+        for character in characters:
+            character.cls_calculate()
+    return run
+
+
+def _level_up(size):
+    characters = _characters(size)
+
+    def run():
+        for character in characters:
+            character.level_up()
+    return run
+
+
+def _dump(size):
+    characters = _characters(size)
+
+    def run():
+        for character in characters:
+            character.dump()
+    return run
+
+
+def _load(size):
+    folder = TemporaryDirectory()
+    filename = join(folder.name, "character.yaml")
+    with open(filename, "w") as f:
+        f.write(_characters(1)[0].dump())
+
+    def run():
+        for _ in range(size):
+            BaseCharacter.load(filename)
+    run.cleanup = folder.cleanup
+    return run
+
+
+def _structure_keys() -> list[list[str]]:
+    return [key.rsplit(".", 1) for key in status.StructureRegistry(status.structure_folder).keys()]
+
+
+def _afs_loader(size):
+    keys = _structure_keys()
+
+    def run():
+        for index in range(size):
+            status._AFS_loader(*keys[index % len(keys)])
+    return run
+
+
+def _afs_loader_cold(size):
+    keys = _structure_keys()
+
+    def run():
+        for index in range(size):
+            status.registry.invalidate()
+            status._AFS_loader(*keys[index % len(keys)])
+    return run
+
+
+cases: dict[str, Case] = {case.name: case for case in (
+    Case("randint", _randint),
+    Case("max_exp", _max_exp),
+    Case("construct", _construct),
+    Case("validate", _validate),
+    Case("cls_calculate", _cls_calculate),
+    Case("level_up", _level_up, 100_000),
+    Case("dump", _dump, 10_000),
+    Case("load", _load, 10_000),
+    Case("afs_loader", _afs_loader),
+    Case("afs_loader_cold", _afs_loader_cold, 10_000),
+)}
+
+
+def measure(case: Case, size: int, repeat: int = 3) -> Result:
+    """Run one case at one size: best time of repeat runs, then one run under tracemalloc."""
+    previous = set_stream(RandomStream(0))
+    run = None
+    try:
+        run = case.setup(size)
+        best = float("inf")
+        for _ in range(repeat):
+            gc.collect()
+            start = perf_counter()
+            run()
+            best = min(best, perf_counter() - start)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    finally:
+        set_stream(previous)
+        if getattr(run, "cleanup", None) is not None:
+            run.cleanup()
+    return Result(best, best / size, peak)
+
+
+def run(names: list[str] = None, sizes: tuple[int] = default_sizes, repeat: int = 3,
+        report: Optional[Callable[[str, Result], None]] = None) -> dict[str, dict]:
+    """Measure cases (all by default) at every size up to their limit, keyed "case@size"."""
+    results = {}
+    for name in names or cases:
+        case = cases[name]
+        for size in sizes:
+            if size > case.limit:
+                continue
+            key = "%s@%s" % (name, size)
+            result = measure(case, size, repeat)
+            results[key] = result._asdict()
+            if report is not None:
+                report(key, result)
+    return results
+
+
+def environment() -> dict:
+    return {"python": platform.python_version(), "numpy": np.__version__,
+            "machine": platform.machine(), "system": platform.system()}
+
+
+def save(filename: str, results: dict[str, dict]):
+    with open(filename, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=1, sort_keys=True)
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], threshold: float = 0.25,
+            memory_threshold: float = None) -> list[Regression]:
+    """Cases that got slower, or used more memory, than baseline by more than the threshold.
+
+    Cases missing from either side are not compared."""
+    memory_threshold = threshold if memory_threshold is None else memory_threshold
+    regressions = []
+    for key in sorted(results.keys() & baseline.keys()):
+        for metric, limit in (("per_item", threshold), ("peak_bytes", memory_threshold)):
+            before, after = baseline[key][metric], results[key][metric]
+            if before > 0 and after > before * (1 + limit):
+                regressions.append(Regression(key, metric, before, after))
+    return regressions
+
+
+def _print_result(key: str, result: Result):
+    print("  %-24s %12.3f us/item %12.4f s %12s B peak" %
+          (key, result.per_item * 1e6, result.seconds, format(result.peak_bytes, ",")))
+
+
+def main(argv: list[str] = None) -> int:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", default=",".join(cases),
+                        help="comma separated, from: %s" % ", ".join(cases))
+    parser.add_argument("--sizes", default=",".join(map(str, default_sizes)),
+                        help="comma separated population sizes, or 'all' for 1 to 1e6")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", metavar="JSON", help="write the results as a new baseline")
+    parser.add_argument("--compare", metavar="JSON", help="baseline to check the results against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown, 0.25 is 25%% (default)")
+    parser.add_argument("--memory-threshold", type=float, default=None,
+                        help="allowed peak memory growth, defaults to --threshold")
+    args = parser.parse_args(argv)
+
+    names = args.cases.split(",")
+    unknown = set(names).difference(cases)
+    if unknown:
+        parser.error("unknown cases: %s" % ", ".join(sorted(unknown)))
+    sizes = all_sizes if args.sizes == "all" else tuple(int(float(size)) for size in args.sizes.split(","))
+    previous, status.structure_folder = status.structure_folder, join(_root, "structures/")
+    try:
+        results = run(names, sizes, args.repeat, _print_result)
+    finally:
+        status.structure_folder = previous
+
+    if args.save:
+        save(args.save, results)
+        print("Saved %s results to %s" % (len(results), args.save))
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("environment") != environment():
+            print("Warning: baseline was recorded on %s" % baseline.get("environment"), file=sys.stderr)
+        regressions = compare(results, baseline["results"], args.threshold, args.memory_threshold)
+        for regression in regressions:
+            print("REGRESSION %s" % (regression,))
+        if regressions:
+            return 1
+        print("No regressions against %s" % args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""EXP curves
+
+Precomputed cumulative EXP tables, so a level can be found from an EXP
+amount by bisection instead of walking one level at a time.
+
+Jitter is deterministic: every seed (a character) gets one jitter value per
+curve, added to the cost of each of its levels. A character's max EXP is then
+the same every time it is asked for, and one cumulative table per curve
+serves every character, since jitter j only adds j * levels to it."""
+
+from bisect import bisect_right
+from typing import Callable, Optional
+from zlib import crc32
+
+import numpy as np
+
+# int64 cumulative sums of the quadratic curves stay exact well past this.
+_table_limit = 1 << 20
+
+
+class ExpCurve:
+    """Cumulative table over a per-level EXP cost.
+
+    :param cost: maps levels (an array or one int) to the base EXP needed to leave each level.
+    :param jitter: every seed adds a fixed 0..jitter on top of each base cost.
+    :param capped: maps levels (an array or one int) to True where a level cannot be
+        left (its max EXP is Max). The table ends at the first capped level.
+    :param name: tells curves apart, so one seed gets unrelated jitter on each.
+    """
+
+    def __init__(self, cost: Callable[[np.ndarray], np.ndarray], jitter: int,
+                 capped: Callable[[np.ndarray], np.ndarray] = None, name: str = ""):
+        self._cost = cost
+        self._jitter = jitter
+        self._capped = capped
+        self.name = name
+        # _table[k] is the base EXP needed to go from level 1 to level k + 1.
+        self._table = np.zeros(1, dtype=np.int64)
+        self._cap: Optional[int] = None
+
+    def __repr__(self):
+        return "<ExpCurve: %s%s levels%s>" % (self.name and self.name + ", ", len(self._table) - 1,
+                                              "" if self._cap is None else ", Max at %s" % self._cap)
+
+    def _grow(self, levels: int):
+        if levels < len(self._table) or self._cap is not None:
+            return
+        if levels >= _table_limit:
+            raise OverflowError("EXP curve is limited to %s levels" % _table_limit)
+        size = min(max(levels + 1, len(self._table) * 2), _table_limit)
+        start = len(self._table)
+        span = np.arange(start, size, dtype=np.int64)
+        if self._capped is not None:
+            capped = np.flatnonzero(self._capped(span))
+            if len(capped):
+                self._cap = int(span[capped[0]])
+                span = span[:capped[0]]
+        self._table = np.concatenate(
+            (self._table, self._table[-1] + np.cumsum(self._cost(span), dtype=np.int64)))
+
+    def jitter_for(self, seed: int) -> int:
+        """Jitter added to every level cost of seed on this curve."""
+        if not self._jitter:
+            return 0
+        return crc32(b"%s:%d" % (self.name.encode("utf8"), seed)) % (self._jitter + 1)
+
+    def cost(self, level: int, seed: int = 0) -> Optional[int]:
+        """EXP needed to leave level, None if the level is capped."""
+        # cost and capped work on plain ints too, which is much cheaper for one level.
+        if self._capped is not None and self._capped(level):
+            return None
+        return int(self._cost(level)) + self.jitter_for(seed)
+
+    def base(self, level: int) -> int:
+        """Base EXP needed to go from level 1 to level."""
+        self._grow(level - 1)
+        if self._cap is not None and level > self._cap:
+            raise ValueError("Level %s is past the cap at level %s" % (level, self._cap))
+        return int(self._table[level - 1])
+
+    def total(self, level: int, seed: int = 0) -> int:
+        """EXP needed to go from level 1 to level, with the jitter of seed."""
+        return self.base(level) + self.jitter_for(seed) * (level - 1)
+
+    def level_for(self, exp: int, seed: int = 0) -> tuple[int, int]:
+        """Level reached from level 1 with exp in total, and the EXP left over in it.
+
+        Found by bisection over the cumulative table."""
+        if exp < 0:
+            raise ValueError("exp must not be negative")
+        jitter = self.jitter_for(seed)
+        table = self._table
+        while self._cap is None and int(table[-1]) + jitter * (len(table) - 1) <= exp:
+            self._grow(len(table) * 2)
+            table = self._table
+        index = bisect_right(range(len(table)), exp, key=lambda k: int(table[k]) + jitter * k)
+        return index, exp - (int(table[index - 1]) + jitter * (index - 1))
+
+    def resolve(self, level: int, exp: int, seed: int = 0) -> tuple[int, int, np.ndarray]:
+        """Find how many levels exp crosses, starting at level with exp in it.
+
+        Returns (levels gained, leftover exp, costs), where costs[i] is the EXP
+        paid to leave level + i. A capped level is never left."""
+        if self._cap is None:
+            self._grow(level)
+        if self._cap is not None and level >= self._cap:
+            return 0, exp, np.zeros(0, dtype=np.int64)
+        start = self.total(level, seed)
+        reached, leftover = self.level_for(start + exp, seed)
+        gained = reached - level
+        levels = np.arange(level, reached, dtype=np.int64)
+        return gained, leftover, self._cost(levels) + self.jitter_for(seed)
@@ -1,4 +1,6 @@
-from typing import Iterable, Any, Callable
+from functools import partial
+from itertools import repeat
+from typing import Iterable, Any, Callable, Union
 
 default = object()
 
@@ -21,28 +23,86 @@ class Call:
 
 
 class Switch:
-    def __init__(self, case: dict[str, Iterable[Any]], err_reason: str=None):
+    """Dispatch a value to its case.
+
+    Cases are compiled once into a jump table of zero-argument functions, a
+    Call or callable is called and anything else is returned as is. Lookup
+    is a dict access; case keys that cannot be hashed (given as (key, value)
+    pairs) and unhashable values fall back to comparing one by one."""
+
+    def __init__(self, case: Union[dict[Any, Any], Iterable[tuple[Any, Any]]], err_reason: str=None):
         self._case = case
         self._err_reason = err_reason if err_reason else "%s does not exists."
-        if len(case) == 0:
+        pairs = list(case.items() if isinstance(case, dict) else case)
+        if len(pairs) == 0:
             raise ValueError("Switch atleast require 1 case.")
-        
+
         default_flag = False # True if default has been called.
-        for ck in tuple(self._case.keys()):
-            if ck == default and default_flag is False:
+        for ck, _ in pairs:
+            if ck is default and default_flag is False:
                 default_flag = True
-            elif ck == default and default_flag is True:
+            elif ck is default and default_flag is True:
                 raise DuplicationError("Unexpected duplicate default case.")
-    
-    def do(self, value: Any = default) -> Any:
-        for ck, cv in self._case.items():
+
+        self._table: dict[Any, Callable[[], Any]] = {}
+        self._unhashable: list[tuple[Any, Callable[[], Any]]] = []
+        for ck, cv in pairs:
+            entry = _compile_case(cv)
+            try:
+                self._table.setdefault(ck, entry)
+            except TypeError:
+                self._unhashable.append((ck, entry))
+
+    def __len__(self):
+        return len(self._table) + len(self._unhashable)
+
+    def _lookup(self, value: Any) -> Callable[[], Any]:
+        try:
+            return self._table[value]
+        except (KeyError, TypeError):
+            pass
+        for ck, entry in self._unhashable:
             if ck == value:
-                if isinstance(cv, Call):
-                    return cv()
-                elif callable(cv):
-                    return cv()
-                else:
-                    return cv
-        
-        if value not in self._case:
-            raise SwitchCaseError(self._err_reason % value)
+                return entry
+        if not _hashable(value):
+            for ck, entry in self._table.items():
+                if ck == value:
+                    return entry
+        raise SwitchCaseError(self._err_reason % (value,))
+
+    def do(self, value: Any = default) -> Any:
+        try:
+            entry = self._table[value]
+        except (KeyError, TypeError):
+            entry = self._lookup(value)
+        return entry()
+
+    def do_many(self, values: Iterable[Any]) -> list[Any]:
+        """do for every value, in order."""
+        table = self._table
+        results = []
+        append = results.append
+        for value in values:
+            try:
+                entry = table[value]
+            except (KeyError, TypeError):
+                entry = self._lookup(value)
+            append(entry())
+        return results
+
+
+def _compile_case(value: Any) -> Callable[[], Any]:
+    """Zero-argument function that does what Switch.do does with a case value."""
+    if type(value) is Call:
+        return partial(value._primary, *value._args, **value._kwargs)
+    if isinstance(value, Call) or callable(value):
+        return value
+    return repeat(value).__next__
+
+
+def _hashable(value: Any) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
@@ -1,16 +1,119 @@
 """HyperText Formatter"""
 
+import re
+from functools import lru_cache
+from typing import Any, Iterable, Mapping, Union
+
+_placeholder = re.compile(r"\$\[([^\[\]]+)\]")
+
+
+class _Placeholders(dict):
+    """Mapping that leaves unknown keys as their placeholder."""
+
+    def __missing__(self, key: str) -> str:
+        return "$[%s]" % key
+
+
+class Template:
+    """A template parsed once into literal and $[key] segments.
+
+    Rendering is a single pass over the segments, done by one %-format of
+    the whole template. Keys with parentheses cannot be %-format keys, such
+    templates are rendered by joining the segments instead. Keys without a
+    value are left as their placeholder.
+
+        > sheet = Template("$[Name] (Level $[Level])")
+        > sheet.render(Name="Debug", Level=3)
+        'Debug (Level 3)'
+        > sheet.render_many(character.dump_to_jsonable() for character in characters)
+    """
+
+    def __init__(self, string: str):
+        self.string = string
+        self.segments: tuple[Union[str, tuple[str]]] = tuple(_segments(string))
+        self.keys: tuple[str] = tuple(dict.fromkeys(
+            segment[0] for segment in self.segments if isinstance(segment, tuple)))
+        self._format = None
+        if not any("(" in key or ")" in key for key in self.keys):
+            self._format = "".join(segment.replace("%", "%%") if isinstance(segment, str)
+                                   else "%%(%s)s" % segment[0] for segment in self.segments)
+
+    def __repr__(self):
+        return "<Template: %s keys>" % len(self.keys)
+
+    def render(self, mapping: Mapping[str, Any] = None, **kwargs) -> str:
+        """Fill the placeholders from mapping and keyword arguments."""
+        if mapping is None:
+            mapping = kwargs
+        elif kwargs:
+            mapping = {**mapping, **kwargs}
+        if self._format is None:
+            return self._join(mapping)
+        try:
+            return self._format % mapping
+        except KeyError:
+            return self._format % _Placeholders(mapping)
+
+    def render_many(self, records: Iterable[Union[Mapping[str, Any], Iterable[Mapping[str, Any]]]]) -> list[str]:
+        """Render every record. A record is a mapping, or several mappings
+        (like dump_to_jsonable gives) where the first one to have a key wins."""
+        fmt = self._format
+        results = []
+        append = results.append
+        for record in records:
+            if not isinstance(record, Mapping):
+                record = _merge(record)
+            if fmt is None:
+                append(self._join(record))
+                continue
+            try:
+                append(fmt % record)
+            except KeyError:
+                append(fmt % _Placeholders(record))
+        return results
+
+    def _join(self, mapping: Mapping[str, Any]) -> str:
+        """Render segment by segment, for keys a %-format cannot hold."""
+        return "".join(segment if isinstance(segment, str)
+                       else "%s" % (mapping[segment[0]],) if segment[0] in mapping else "$[%s]" % segment[0]
+                       for segment in self.segments)
+
+
+def _segments(string: str) -> Iterable[Union[str, tuple[str]]]:
+    """Literal text as str, placeholders as a (key,) tuple."""
+    position = 0
+    for match in _placeholder.finditer(string):
+        if match.start() > position:
+            yield string[position:match.start()]
+        yield (match.group(1),)
+        position = match.end()
+    if position < len(string):
+        yield string[position:]
+
+
+def _merge(parts: Iterable[Mapping[str, Any]]) -> dict[str, Any]:
+    """One mapping out of several, the first one to have a key wins."""
+    merged = {}
+    for part in reversed(tuple(parts)):
+        merged.update(part)
+    return merged
+
+
+@lru_cache(maxsize=128)
+def compile_template(string: str) -> Template:
+    """Template of string, parsed once and cached."""
+    return Template(string)
+
+
 def format(string: str, **kwargs) -> str:
     """A string formatter
-    
+
     example:
-        
+
         > n = '$[val]'
         > val = "Hello, World!"
         > print(format(n, val=val))
         Hello, World!
-    
+
     """
-    for key,val in kwargs.copy().items():
-        string.replace(f"$[{key}]", val)
-    return string
+    return compile_template(string).render(kwargs)
@@ -0,0 +1,203 @@
+"""Structure index
+
+An in-memory inverted index over item structures, so that queries such as
+"all head armor that buffs Luck" do not have to parse every file.
+
+Terms indexed per structure:
+
+    type     ItemHeader.Type                    "Armor"
+    wear_at  ItemHeader.Wear_at, with and       "BodyArmor(0)", "BodyArmor"
+             without its argument
+    under    every folder above the structure   "armor", "armor.head"
+    buff     stats in the Buff block            "Luck"
+    debuff   stats in the Debuff block          "Agi"
+
+and, for range queries, the net magnitude of every modified stat (Buff
+minus Debuff): "Atk" for the flat part, "Atk%" for the percentage part.
+
+    >>> index = StructureIndex(registry)
+    >>> index.query(under="armor.head", buff="Luck")
+    ['armor.head.debug_headplate']
+    >>> index.query(wear_at="BodyArmor", minimum={"Atk": math.inf})
+
+refresh() re-reads only the files whose mtime changed since the last call.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from math import inf
+from os import stat
+from typing import Callable, Iterable, NamedTuple, Optional, Union
+
+from lib.modifier import parse_value
+from lib.registry import StructureRegistry
+
+
+class IndexStats(NamedTuple):
+    """Size of a StructureIndex and what the last refresh did."""
+    entries: int
+    terms: int
+    added: int
+    updated: int
+    removed: int
+
+
+class StructureIndex:
+    """Inverted index over the structures under prefix in a registry.
+
+    :param registry: where structures are listed and read from.
+    :param prefix: struct id prefix to index, results are relative to it
+        (so they can go straight to Item.loader).
+    :param reader: reads a full struct id, registry.get by default.
+    """
+
+    def __init__(self, registry: Optional[StructureRegistry] = None, prefix: str = "items.",
+                 reader: Callable[[str], dict] = None):
+        self.registry = registry
+        self.prefix = prefix
+        self._reader = reader or (registry.get if registry is not None else None)
+        self._postings: dict[tuple[str, str], set[str]] = {}
+        self._terms: dict[str, tuple[tuple[str, str]]] = {}
+        self._values: dict[str, dict[str, float]] = {}
+        # stat -> sorted [(magnitude, struct id)]
+        self._ranges: dict[str, list[tuple[float, str]]] = {}
+        self._mtimes: dict[str, int] = {}
+        self._last = (0, 0, 0)
+        if registry is not None:
+            self.refresh()
+
+    def __repr__(self):
+        return "<StructureIndex: %s (%s entries)>" % (self.prefix, len(self._terms))
+
+    def __len__(self):
+        return len(self._terms)
+
+    def __contains__(self, struct_id: str) -> bool:
+        return struct_id in self._terms
+
+    def add(self, struct_id: str, data: dict):
+        """Index (or re-index) one structure, struct_id relative to prefix."""
+        if struct_id in self._terms:
+            self.remove(struct_id)
+        terms, values = _describe(struct_id, data)
+        self._terms[struct_id] = terms
+        for term in terms:
+            self._postings.setdefault(term, set()).add(struct_id)
+        self._values[struct_id] = values
+        for name, value in values.items():
+            insort(self._ranges.setdefault(name, []), (value, struct_id))
+
+    def remove(self, struct_id: str):
+        """Drop one structure from the index."""
+        terms = self._terms.pop(struct_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            postings.discard(struct_id)
+            if not postings:
+                del self._postings[term]
+        for name, value in self._values.pop(struct_id).items():
+            entries = self._ranges[name]
+            del entries[bisect_left(entries, (value, struct_id))]
+            if not entries:
+                del self._ranges[name]
+        self._mtimes.pop(struct_id, None)
+
+    def refresh(self) -> IndexStats:
+        """Bring the index up to date with the registry: parse new and changed files, drop deleted ones."""
+        if self.registry is None:
+            raise ValueError("Index has no registry to refresh from")
+        keys = self.registry.index()
+        seen = set()
+        added = updated = 0
+        for key, f_path in keys.items():
+            if not key.startswith(self.prefix):
+                continue
+            struct_id = key[len(self.prefix):]
+            seen.add(struct_id)
+            try:
+                mtime = stat(f_path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if self._mtimes.get(struct_id) == mtime:
+                continue
+            known = struct_id in self._terms
+            self.add(struct_id, self._reader(key))
+            self._mtimes[struct_id] = mtime
+            if known:
+                updated += 1
+            else:
+                added += 1
+        removed = [struct_id for struct_id in self._terms if struct_id not in seen]
+        for struct_id in removed:
+            self.remove(struct_id)
+        self._last = added, updated, len(removed)
+        return self.stats()
+
+    def stats(self) -> IndexStats:
+        return IndexStats(len(self._terms), len(self._postings), *self._last)
+
+    def terms(self, field: str) -> list[str]:
+        """Every indexed value of a term field, e.g. terms("type")."""
+        return sorted(value for name, value in self._postings if name == field)
+
+    def query(self, type: str = None, wear_at: str = None, under: str = None,
+              buff: Union[str, Iterable[str]] = (), debuff: Union[str, Iterable[str]] = (),
+              minimum: dict[str, float] = None, maximum: dict[str, float] = None) -> list[str]:
+        """Struct ids matching every given condition, sorted.
+
+        minimum and maximum bound the net magnitude of stats, inclusive;
+        "Atk" is the flat part and "Atk%" the percentage part (42% is 42)."""
+        terms = []
+        for field, value in (("type", type), ("wear_at", wear_at), ("under", under)):
+            if value is not None:
+                terms.append((field, value))
+        for field, names in (("buff", buff), ("debuff", debuff)):
+            terms.extend((field, name) for name in ((names,) if isinstance(names, str) else names))
+        candidates = [self._postings.get(term, set()) for term in terms]
+        for name in set(minimum or ()).union(maximum or ()):
+            candidates.append(self._range(name, (minimum or {}).get(name, -inf), (maximum or {}).get(name, inf)))
+        if not candidates:
+            return sorted(self._terms)
+        candidates.sort(key=len)
+        return sorted(candidates[0].intersection(*candidates[1:]))
+
+    def _range(self, name: str, low: float, high: float) -> set[str]:
+        entries = self._ranges.get(name)
+        if not entries:
+            return set()
+        start = bisect_left(entries, (low, ""))
+        stop = bisect_right(entries, (high, "\U0010ffff"))
+        return {struct_id for _, struct_id in entries[start:stop]}
+
+
+def _describe(struct_id: str, data: dict) -> tuple[tuple[tuple[str, str]], dict[str, float]]:
+    """Index terms and stat magnitudes of one structure."""
+    terms = []
+    header = data.get("ItemHeader") or {}
+    if header.get("Type") is not None:
+        terms.append(("type", str(header["Type"])))
+    wear_at = header.get("Wear_at")
+    if wear_at is not None:
+        wear_at = str(wear_at)
+        terms.append(("wear_at", wear_at))
+        slot = wear_at.split("(", 1)[0].strip()
+        if slot != wear_at:
+            terms.append(("wear_at", slot))
+    folders = struct_id.split(".")[:-1]
+    terms.extend(("under", ".".join(folders[:depth])) for depth in range(1, len(folders) + 1))
+
+    values: dict[str, float] = {}
+    section = next((val for key, val in data.items() if key != "ItemHeader" and isinstance(val, dict)
+                    and ("Buff" in val or "Debuff" in val)), {})
+    for field, sign in (("buff", 1), ("debuff", -1)):
+        for name, value in (section.get(field.capitalize()) or {}).items():
+            terms.append((field, name))
+            add, mul = parse_value(value)
+            if add:
+                values[name] = values.get(name, 0.0) + sign * add
+            if mul:
+                # From the text, as mul * 100 would give 42.00000000000001 for 42%.
+                values[name + "%"] = values.get(name + "%", 0.0) + sign * float(value.strip()[:-1])
+    # Infinite buff and debuff of one stat cancel out to NaN, which has no place in a range.
+    return tuple(dict.fromkeys(terms)), {name: value for name, value in values.items() if value == value}
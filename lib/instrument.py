@@ -0,0 +1,166 @@
+"""Instrumentation
+
+Opt-in call counters, cumulative timers and duration histograms for a fixed
+set of functions and methods.
+
+Targets are registered once, by owner (a module or class) and attribute
+name. enable() swaps each target for a timing wrapper and disable() puts the
+original back, so while disabled the instrumented code runs exactly as if
+this module did not exist. Callers that hold their own reference (e.g. from
+``from status import max_exp``) keep calling the original.
+
+    >>> instruments = Instrumentation()
+    >>> instruments.register(status, "max_exp")
+    >>> instruments.enable()
+    >>> ...
+    >>> print(instruments.profile())
+
+Times are inclusive ("total") and exclusive of other instrumented calls made
+from inside ("self"), so a level_up that calls cls_calculate is not counted
+twice in the self column.
+"""
+
+from threading import Lock, local
+from time import perf_counter_ns
+from typing import Any, Callable, NamedTuple
+
+
+class CallStats(NamedTuple):
+    """Counters of one instrumented target. Times are in seconds.
+
+    histogram holds (upper bound in seconds, calls) per power-of-two bucket
+    of the call duration, empty buckets left out."""
+    calls: int
+    errors: int
+    total: float
+    self_time: float
+    min: float
+    max: float
+    histogram: tuple[tuple[float, int]]
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.calls if self.calls else 0.0
+
+
+class _Record:
+    __slots__ = ("calls", "errors", "total", "self_time", "min", "max", "buckets")
+
+    def __init__(self):
+        self.calls = self.errors = self.total = self.self_time = self.max = 0
+        self.min = None
+        self.buckets: dict[int, int] = {}
+
+    def freeze(self) -> CallStats:
+        return CallStats(self.calls, self.errors, self.total / 1e9, self.self_time / 1e9,
+                         (self.min or 0) / 1e9, self.max / 1e9,
+                         tuple(((1 << bucket) / 1e9, count) for bucket, count in sorted(self.buckets.items())))
+
+
+class Instrumentation:
+    """A set of instrumented targets and their counters."""
+
+    def __init__(self):
+        self.enabled = False
+        self._targets: dict[str, tuple[Any, str]] = {}
+        self._originals: dict[str, Any] = {}
+        self._records: dict[str, _Record] = {}
+        self._lock = Lock()
+        self._local = local()
+
+    def __repr__(self):
+        return "<Instrumentation: %s targets, %s>" % (len(self._targets), "enabled" if self.enabled else "disabled")
+
+    def register(self, owner: Any, name: str, label: str = None) -> str:
+        """Add owner.name as a target, reported under label (owner.name by default)."""
+        if not hasattr(owner, name):
+            raise AttributeError("%r has no attribute %s" % (owner, name))
+        label = label or "%s.%s" % (getattr(owner, "__name__", owner), name)
+        self._targets[label] = owner, name
+        if self.enabled:
+            self._wrap(label)
+        return label
+
+    def enable(self):
+        """Swap every target for its timing wrapper."""
+        if not self.enabled:
+            for label in self._targets:
+                self._wrap(label)
+            self.enabled = True
+
+    def disable(self):
+        """Put every original target back. Counters are kept until reset."""
+        if self.enabled:
+            for label, (owner, name) in self._targets.items():
+                setattr(owner, name, self._originals.pop(label))
+            self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._records.clear()
+
+    def stats(self) -> dict[str, CallStats]:
+        """Counters of every target that was called, by label."""
+        with self._lock:
+            return {label: record.freeze() for label, record in self._records.items()}
+
+    def profile(self) -> str:
+        """Flat profile of stats(), sorted by self time, like gprof's."""
+        stats = sorted(self.stats().items(), key=lambda item: item[1].self_time, reverse=True)
+        grand = sum(entry.self_time for _, entry in stats) or 1.0
+        lines = ["   %self    self s   total s      calls  mean us   max us  name"]
+        for label, entry in stats:
+            lines.append("%7.2f %9.4f %9.4f %10d %8.2f %8.2f  %s" % (
+                entry.self_time / grand * 100, entry.self_time, entry.total, entry.calls,
+                entry.mean * 1e6, entry.max * 1e6, label))
+        return "\n".join(lines)
+
+    def _wrap(self, label: str):
+        owner, name = self._targets[label]
+        raw = vars(owner).get(name, getattr(owner, name)) if isinstance(owner, type) else getattr(owner, name)
+        self._originals[label] = raw
+        if isinstance(raw, (classmethod, staticmethod)):
+            wrapper = type(raw)(self._timed(label, raw.__func__))
+        else:
+            wrapper = self._timed(label, raw)
+        setattr(owner, name, wrapper)
+
+    def _timed(self, label: str, func: Callable) -> Callable:
+        records = self._records
+        lock = self._lock
+        state = self._local
+
+        def wrapper(*args, **kwargs):
+            stack = getattr(state, "stack", None)
+            if stack is None:
+                stack = state.stack = []
+            stack.append(0)
+            failed = True
+            start = perf_counter_ns()
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                elapsed = perf_counter_ns() - start
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                with lock:
+                    record = records.get(label)
+                    if record is None:
+                        record = records[label] = _Record()
+                    record.calls += 1
+                    record.errors += failed
+                    record.total += elapsed
+                    record.self_time += elapsed - children
+                    record.max = max(record.max, elapsed)
+                    record.min = elapsed if record.min is None else min(record.min, elapsed)
+                    bucket = elapsed.bit_length()
+                    record.buckets[bucket] = record.buckets.get(bucket, 0) + 1
+
+        wrapper.__wrapped__ = func
+        wrapper.__name__ = getattr(func, "__name__", label)
+        wrapper.__qualname__ = getattr(func, "__qualname__", label)
+        wrapper.__doc__ = getattr(func, "__doc__", None)
+        return wrapper
@@ -1,7 +1,10 @@
 """internal"""
 
-from random import Random, randint as _randint
-from secrets import SystemRandom
+from random import Random
+from secrets import randbits
+from threading import local
+
+import numpy as np
 
 # TODO: Add StaticTypesNamedTuple and StaticTypesNamespace.
 # by looking at Python's typing.py about NamedTuple, then implement runtime type checking at initialization level (when __init__ is called)
@@ -13,8 +16,6 @@ from secrets import SystemRandom
 # > TypeError: foo is not a instance of str.
 # But this type checking can be bypassed using set_attr(namespace, 'foo', int, 1)
 
-_Module_Seed = _randint(0, 99999)
-
 class StaticNamespace:
     """Readonly namespace"""
     def __new__(cls, **kwargs):
@@ -41,16 +42,99 @@ class Struct:
     pass
 # TODO: define __setattr__ that checks type of instances. (but if the thing is using typing's stuff. raise StructException )
 
+# Leads the spawn key of every substream. SeedSequence.spawn numbers its
+# children 0, 1, 2..., so substream(0) would otherwise be spawn(1)[0].
+_substream_tag = 0x5355_4253
+
+
+class RandomStream:
+    """Seedable random stream, built once and drawn from many times.
+
+    Scalar draws go through randint, bulk draws through randint_many which
+    returns a NumPy array. Independent substreams can be split off for
+    threads, processes or shards:
+
+        > stream = RandomStream(42)
+        > stream.randint_many(1, 5, 11)
+        > shard = stream.substream(3)  # always the same stream for (42, 3)
+    """
+
+    def __init__(self, seed: int = None, *, _sequence: np.random.SeedSequence = None):
+        if _sequence is None:
+            _sequence = np.random.SeedSequence(
+                randbits(64) if seed is None else seed)
+        self._sequence = _sequence
+        self._generator = np.random.Generator(np.random.PCG64(_sequence))
+        # Scalar draws are much cheaper through random.Random than NumPy.
+        self._random = Random(int(_sequence.generate_state(1, np.uint64)[0]))
+        self._local = local()
+
+    def __repr__(self):
+        return "<RandomStream: %s%s>" % (self._sequence.entropy, ''.join(f'/{key}' for key in self._sequence.spawn_key))
+
+    @property
+    def seed(self) -> int:
+        """Root seed of this stream."""
+        return self._sequence.entropy
+
+    @property
+    def generator(self) -> np.random.Generator:
+        """Underlying NumPy generator."""
+        return self._generator
+
+    def randint(self, minvalue: int, maxvalue: int) -> int:
+        """Draw one integer in [minvalue, maxvalue]."""
+        return self._random.randint(minvalue, maxvalue)
+
+    def randint_many(self, minvalue: int, maxvalue: int, n) -> np.ndarray:
+        """Draw n integers in [minvalue, maxvalue]. n may be a shape tuple."""
+        return self._generator.integers(minvalue, maxvalue, n, endpoint=True)
+
+    def substream(self, key: int) -> 'RandomStream':
+        """Independent child stream, the same one every time for the same key."""
+        return RandomStream(_sequence=np.random.SeedSequence(
+            self._sequence.entropy, spawn_key=self._sequence.spawn_key + (_substream_tag, key)))
+
+    def spawn(self, n: int) -> list['RandomStream']:
+        """n independent child streams, for processes or shards."""
+        return [RandomStream(_sequence=sequence) for sequence in self._sequence.spawn(n)]
+
+    def thread_stream(self) -> 'RandomStream':
+        """Child stream private to the calling thread, created on first use."""
+        stream = getattr(self._local, "stream", None)
+        if stream is None:
+            stream = self._local.stream = self.spawn(1)[0]
+        return stream
+
+
+_stream = RandomStream()
+
+
+def get_stream() -> RandomStream:
+    """Module stream used by randint."""
+    return _stream
+
+
+def set_stream(stream: RandomStream) -> RandomStream:
+    """Replace the module stream, returning the previous one."""
+    global _stream
+    if not isinstance(stream, RandomStream):
+        raise TypeError("Expected RandomStream, got %s" % type(stream).__name__)
+    previous, _stream = _stream, stream
+    return previous
+
+
+def seed(value: int = None) -> RandomStream:
+    """Reseed the module stream, for reproducible runs."""
+    global _stream
+    _stream = RandomStream(value)
+    return _stream
+
+
 def randint(minvalue: int, maxvalue: int, loops: int=5):
+    """Draw one integer in [minvalue, maxvalue] from the module stream.
+
+    loops is ignored, it is kept so old callers still work."""
     if not isinstance(minvalue, int) and not isinstance(maxvalue, int):
         raise TypeError("Both minvalue or maxvalue must be integer")
-    
-    ret = 0
-    while loops > 0:
-        n = Random.randint(0, 100)
-        if n >= 50:
-            ret = SystemRandom(Random(_Module_Seed).randint(0, 99999)).randint(minvalue, maxvalue)
-        if n < 50:
-            ret = Random(SystemRandom(_Module_Seed).randint(0, 99999)).randint(minvalue, maxvalue)
-        loops -= 1
-    return ret
+    return _stream.randint(minvalue, maxvalue)
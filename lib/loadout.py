@@ -0,0 +1,112 @@
+"""Loadout cache
+
+Combined modifiers of item loadouts, so characters wearing the same items
+share one Modifier instead of summing every item's Buff/Debuff each time.
+
+    >>> cache = LoadoutCache(lambda item_id: Item.loader(item_id).modifiers, _stat_fields)
+    >>> cache.get(["armor.head.debug_headplate", "rings.gold"])
+    <Modifier: Luck=+42%, ...>
+
+A loadout is keyed by its sorted item ids, so the order items are listed in
+does not matter, but wearing an item twice does. Entries are evicted least
+recently used first. Cached modifiers are shared and read-only.
+"""
+
+from collections import OrderedDict
+from sys import getsizeof
+from threading import Lock
+from typing import Callable, Iterable, NamedTuple
+
+from lib.modifier import Modifier
+
+
+class LoadoutStats(NamedTuple):
+    """Counters of a LoadoutCache. nbytes is the memory held by its entries."""
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+    nbytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class LoadoutCache:
+    """Bounded LRU of combined modifiers per loadout.
+
+    :param resolve: maps one item id to its Modifier over keys.
+    :param keys: stat order of every modifier.
+    :param maxsize: loadouts kept at most.
+    """
+
+    def __init__(self, resolve: Callable[[str], Modifier], keys: tuple[str], maxsize: int = 1024):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.resolve = resolve
+        self.keys = keys
+        self.maxsize = maxsize
+        self._entries: OrderedDict[tuple[str], Modifier] = OrderedDict()
+        self._lock = Lock()
+        self._hits = self._misses = self._evictions = self._nbytes = 0
+
+    def __repr__(self):
+        return "<LoadoutCache: %s/%s loadouts>" % (len(self._entries), self.maxsize)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, item_ids: Iterable[str]) -> bool:
+        return self.key(item_ids) in self._entries
+
+    @staticmethod
+    def key(item_ids: Iterable[str]) -> tuple[str]:
+        """Cache key of a loadout, its sorted item ids."""
+        return item_ids if isinstance(item_ids, tuple) and _is_sorted(item_ids) else tuple(sorted(item_ids))
+
+    def get(self, item_ids: Iterable[str]) -> Modifier:
+        """Combined modifier of every item in the loadout, from cache when possible."""
+        key = self.key(item_ids)
+        with self._lock:
+            modifier = self._entries.get(key)
+            if modifier is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return modifier
+            self._misses += 1
+        modifier = Modifier.sum(self.keys, (self.resolve(item_id) for item_id in key))
+        modifier.add.setflags(write=False)
+        modifier.mul.setflags(write=False)
+        with self._lock:
+            if key not in self._entries:
+                self._nbytes += _nbytes(key, modifier)
+            self._entries[key] = modifier
+            while len(self._entries) > self.maxsize:
+                self._nbytes -= _nbytes(*self._entries.popitem(last=False))
+                self._evictions += 1
+        return modifier
+
+    def invalidate(self, item_id: str = None):
+        """Drop every loadout holding item_id, or all of them."""
+        with self._lock:
+            if item_id is None:
+                self._entries.clear()
+                self._nbytes = 0
+                return
+            for key in [key for key in self._entries if item_id in key]:
+                self._nbytes -= _nbytes(key, self._entries.pop(key))
+
+    def stats(self) -> LoadoutStats:
+        return LoadoutStats(self._hits, self._misses, self._evictions, len(self._entries), self.maxsize, self._nbytes)
+
+
+def _is_sorted(item_ids: tuple[str]) -> bool:
+    return all(item_ids[index] <= item_ids[index + 1] for index in range(len(item_ids) - 1))
+
+
+def _nbytes(key: tuple[str], modifier: Modifier) -> int:
+    """Memory held by one entry. Item id strings are shared with the caller and not counted."""
+    return getsizeof(key) + getsizeof(modifier) + modifier.add.nbytes + modifier.mul.nbytes
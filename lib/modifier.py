@@ -0,0 +1,130 @@
+"""Modifiers
+
+Compiles the Buff/Debuff blocks of structure files into modifier vectors.
+
+    Buff:
+      Atk: '@const:infinity'   # additive, infinite
+      Luck: 42%                # multiplicative, +42% of the value
+      Str: 3                   # additive, +3
+    Debuff:
+      Agi: 1%                  # the same, with a negative sign
+"""
+
+from math import inf
+from typing import Any, Iterable, Optional
+
+import numpy as np
+
+constants = {
+    "@const:infinity": inf,
+}
+
+
+class Modifier:
+    """Additive and multiplicative part per stat, over a fixed key order.
+
+    A stat becomes (value + add) * (1 + mul), see modify. Adding two modifiers
+    sums both parts, so percentages from several sources stack additively.
+    """
+    __slots__ = ("keys", "add", "mul")
+
+    def __init__(self, keys: tuple[str], add: np.ndarray = None, mul: np.ndarray = None):
+        self.keys = keys
+        self.add = np.zeros(len(keys)) if add is None else add
+        self.mul = np.zeros(len(keys)) if mul is None else mul
+
+    @classmethod
+    def compile(cls, keys: tuple[str], buff: Optional[dict] = None, debuff: Optional[dict] = None) -> 'Modifier':
+        """Parse Buff/Debuff blocks once into a modifier over keys."""
+        new = cls(keys)
+        for block, sign in ((buff, 1), (debuff, -1)):
+            for key, value in (block or {}).items():
+                try:
+                    index = keys.index(key)
+                except ValueError:
+                    raise ValueError("Unknown stat %s" % key) from None
+                add, mul = parse_value(value)
+                new.add[index] += sign * add
+                new.mul[index] += sign * mul
+        return new
+
+    @classmethod
+    def sum(cls, keys: tuple[str], modifiers: Iterable['Modifier']) -> 'Modifier':
+        """Combine many modifiers over keys into one."""
+        new = cls(keys)
+        for modifier in modifiers:
+            new.add += modifier.add
+            new.mul += modifier.mul
+        return new
+
+    def __add__(self, other: 'Modifier') -> 'Modifier':
+        if not isinstance(other, Modifier):
+            return NotImplemented
+        if other.keys != self.keys:
+            raise ValueError("Cannot add modifiers over different stats")
+        return Modifier(self.keys, self.add + other.add, self.mul + other.mul)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Modifier):
+            return NotImplemented
+        return self.keys == other.keys and np.array_equal(self.add, other.add) and np.array_equal(self.mul, other.mul)
+
+    def __bool__(self):
+        return bool(self.add.any() or self.mul.any())
+
+    def __repr__(self):
+        parts = ", ".join(f"{key}={_describe(add, mul)}"
+                          for key, add, mul in zip(self.keys, self.add.tolist(), self.mul.tolist())
+                          if add or mul)
+        return "<Modifier: %s>" % (parts or "none")
+
+    def apply(self, values: np.ndarray, start: int = 0) -> np.ndarray:
+        """Apply the modifier to values ordered like keys[start:].
+
+        values may carry more axes, e.g. one column per character."""
+        stop = start + len(values)
+        add, mul = self.add[start:stop], self.mul[start:stop]
+        if values.ndim > 1:
+            add = add.reshape(add.shape + (1,) * (values.ndim - 1))
+            mul = mul.reshape(add.shape)
+        return modify(values, add, mul)
+
+
+def modify(values: np.ndarray, add: np.ndarray, mul: np.ndarray) -> np.ndarray:
+    """(values + add) * (1 + mul), with the infinite cases defined.
+
+    A stat scaled down by 100% (or more) is 0, even an infinite one, where
+    inf * 0 would give NaN. A stat driven to -inf, e.g. by an infinite
+    debuff, is 0 as well. NaN (NotAvailable) stays NaN."""
+    base = values + add
+    factor = 1 + mul
+    with np.errstate(invalid="ignore"):
+        result = base * factor
+    return np.where((np.isinf(base) & (factor <= 0)) | (result == -inf), 0.0, result)
+
+
+def parse_value(value: Any) -> tuple[float, float]:
+    """Parse one Buff/Debuff value into (add, mul)."""
+    if isinstance(value, bool):
+        raise TypeError("Unexpected modifier value %r" % value)
+    if isinstance(value, (int, float)):
+        return float(value), 0.0
+    if not isinstance(value, str):
+        raise TypeError("Unexpected modifier value %r" % value)
+    value = value.strip()
+    if value.startswith("@"):
+        if value not in constants:
+            raise ValueError("Unknown constant %s" % value)
+        return constants[value], 0.0
+    if value.endswith("%"):
+        return 0.0, float(value[:-1]) / 100
+    return float(value), 0.0
+
+
+def _describe(add: float, mul: float) -> str:
+    parts = []
+    if add:
+        parts.append("%+g" % add)
+    if mul:
+        parts.append("%+g%%" % (mul * 100))
+    return "".join(parts)
@@ -0,0 +1,131 @@
+"""Structure registry
+
+Indexes a structures/ tree once and keeps parsed entries in a bounded LRU.
+Each lookup checks the file mtime, so only changed files are parsed again."""
+
+from collections import OrderedDict
+from os import scandir, stat
+from os.path import normpath
+from threading import Lock
+from typing import NamedTuple
+
+from yaml import safe_load
+
+
+class RegistryStats(NamedTuple):
+    """Counters of a StructureRegistry."""
+    hits: int
+    misses: int
+    reloads: int
+    evictions: int
+    size: int
+    indexed: int
+
+
+class StructureRegistry:
+    """Cached access to the YAML files under root.
+
+    Entries are keyed by struct id, the dotted path under root:
+    structures/items/armor/head/debug_headplate is "items.armor.head.debug_headplate".
+
+    Returned dicts are shared between callers and must not be modified.
+    """
+
+    def __init__(self, root: str, maxsize: int = 256):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.root = root
+        self.maxsize = maxsize
+        self._paths: dict[str, str] = None
+        self._entries: OrderedDict[str, tuple[int, dict]] = OrderedDict()
+        self._lock = Lock()
+        self._hits = self._misses = self._reloads = self._evictions = 0
+
+    def __repr__(self):
+        return "<StructureRegistry: %s (%s cached)>" % (self.root, len(self._entries))
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index()
+
+    def _index(self) -> dict[str, str]:
+        if self._paths is None:
+            self.index()
+        return self._paths
+
+    def index(self) -> dict[str, str]:
+        """(Re-)walk root, mapping every struct id to its file."""
+        paths = {}
+        pending = [(normpath(self.root), '')]
+        while pending:
+            folder, prefix = pending.pop()
+            with scandir(folder) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir():
+                        pending.append((entry.path, f'{prefix}{entry.name}.'))
+                    else:
+                        paths[prefix + entry.name] = entry.path
+        self._paths = paths
+        return paths
+
+    def keys(self, prefix: str = '') -> list[str]:
+        """Indexed struct ids, optionally only those under prefix."""
+        return sorted(key for key in self._index() if key.startswith(prefix))
+
+    def path(self, key: str) -> str:
+        """File of a struct id, re-indexing once for files added since."""
+        paths = self._index()
+        if key not in paths:
+            paths = self.index()
+        if key not in paths:
+            raise FileNotFoundError(key)
+        return paths[key]
+
+    def get(self, key: str) -> dict:
+        """Parsed content of a struct id, from cache unless the file changed."""
+        f_path = self.path(key)
+        try:
+            mtime = stat(f_path).st_mtime_ns
+        except FileNotFoundError:
+            self.invalidate(key)
+            self._paths.pop(key, None)
+            raise FileNotFoundError(key) from None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == mtime:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+            if entry is None:
+                self._misses += 1
+            else:
+                self._reloads += 1
+        data = _parse(f_path)
+        with self._lock:
+            self._entries[key] = mtime, data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return data
+
+    def invalidate(self, key: str = None):
+        """Drop one cached entry, or all of them."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> RegistryStats:
+        return RegistryStats(self._hits, self._misses, self._reloads, self._evictions,
+                             len(self._entries), len(self._paths or ()))
+
+
+def _parse(f_path: str) -> dict:
+    with open(f_path) as f:
+        n = safe_load(f.read())
+    if not isinstance(n, dict):
+        raise TypeError("Expected dict type, got %s" % type(n))
+    return n
@@ -0,0 +1,257 @@
+"""Serializers
+
+Backends that turn a character mapping (plain dicts, lists, strings and
+numbers) into text or bytes and back:
+
+    yaml     pure-Python yaml.safe_dump / safe_load
+    cyaml    the same YAML through libyaml, when PyYAML was built with it
+    json     stdlib json
+    binary   compact tagged binary format, see BinarySerializer
+
+The backend is picked per call by name, or per process with set_default.
+"""
+
+import json
+import struct
+from abc import ABC, abstractmethod
+from typing import Any, Union
+
+import yaml
+
+
+class SerializerError(ValueError):
+    """Data cannot be encoded or decoded by a serializer."""
+
+
+class Serializer(ABC):
+    """A serializer backend.
+
+    :param name: is the name it is registered under.
+    :param binary: is True when dumps returns bytes instead of str.
+    :param extensions: are the file extensions that mean this backend.
+    """
+    name: str = ""
+    binary: bool = False
+    extensions: tuple[str] = ()
+
+    def __repr__(self):
+        return "<%s: %s>" % (self.__class__.__name__, self.name)
+
+    @abstractmethod
+    def dumps(self, obj: dict, **options) -> Union[str, bytes]:
+        pass
+
+    @abstractmethod
+    def loads(self, data: Union[str, bytes]) -> Any:
+        pass
+
+
+class YamlSerializer(Serializer):
+    name = "yaml"
+    extensions = (".yaml", ".yml")
+
+    def dumps(self, obj: dict, **options) -> str:
+        return yaml.safe_dump(obj, **options)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return yaml.safe_load(data)
+
+
+class CYamlSerializer(YamlSerializer):
+    """YAML through libyaml, several times faster than the pure-Python one."""
+    name = "cyaml"
+
+    def dumps(self, obj: dict, **options) -> str:
+        return yaml.dump(obj, Dumper=yaml.CSafeDumper, **options)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return yaml.load(data, Loader=yaml.CSafeLoader)
+
+
+class JsonSerializer(Serializer):
+    name = "json"
+    extensions = (".json",)
+
+    def dumps(self, obj: dict, **options) -> str:
+        options.setdefault("separators", (",", ":"))
+        return json.dumps(obj, **options)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+
+class BinarySerializer(Serializer):
+    """Compact tagged binary format.
+
+    MAGIC, then one value: a tag byte followed by its payload.
+
+        N / T / F      None, True, False
+        i  varint      int, zigzag encoded
+        f  8 bytes     float, little endian double
+        s  varint n    str, n bytes of UTF-8
+        l  varint n    list of n values
+        d  varint n    dict of n key, value pairs
+    """
+    name = "binary"
+    binary = True
+    extensions = (".rpgc",)
+    MAGIC = b"RPGC\x01"
+
+    def dumps(self, obj: dict, **options) -> bytes:
+        out = bytearray(self.MAGIC)
+        _encode(obj, out)
+        return bytes(out)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        if isinstance(data, str):
+            raise SerializerError("Binary data expected, got str")
+        if not data.startswith(self.MAGIC):
+            raise SerializerError("Not a binary character record")
+        try:
+            value, index = _decode(memoryview(data), len(self.MAGIC))
+        except (IndexError, struct.error, UnicodeDecodeError) as exc:
+            raise SerializerError("Truncated or corrupted record: %s" % exc) from None
+        if index != len(data):
+            raise SerializerError("Trailing data after record")
+        return value
+
+
+_double = struct.Struct("<d")
+
+
+def _encode_varint(value: int, out: bytearray):
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _encode(value: Any, out: bytearray):
+    if value is None:
+        out += b"N"
+    elif value is True:
+        out += b"T"
+    elif value is False:
+        out += b"F"
+    elif isinstance(value, int):
+        out += b"i"
+        _encode_varint(value * 2 if value >= 0 else -value * 2 - 1, out)
+    elif isinstance(value, float):
+        out += b"f"
+        out += _double.pack(value)
+    elif isinstance(value, str):
+        data = value.encode("utf8")
+        out += b"s"
+        _encode_varint(len(data), out)
+        out += data
+    elif isinstance(value, (list, tuple)):
+        out += b"l"
+        _encode_varint(len(value), out)
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, dict):
+        out += b"d"
+        _encode_varint(len(value), out)
+        for key, item in value.items():
+            _encode(key, out)
+            _encode(item, out)
+    else:
+        raise SerializerError("Cannot encode %s" % type(value).__name__)
+
+
+def _decode_varint(data: memoryview, index: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[index]
+        index += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, index
+        shift += 7
+
+
+def _decode(data: memoryview, index: int) -> tuple[Any, int]:
+    tag = data[index]
+    index += 1
+    if tag == 0x69:  # i
+        value, index = _decode_varint(data, index)
+        return (value >> 1) ^ -(value & 1), index
+    if tag == 0x73:  # s
+        size, index = _decode_varint(data, index)
+        return str(data[index:index + size], "utf8"), index + size
+    if tag == 0x66:  # f
+        return _double.unpack_from(data, index)[0], index + 8
+    if tag == 0x64:  # d
+        size, index = _decode_varint(data, index)
+        value = {}
+        for _ in range(size):
+            key, index = _decode(data, index)
+            value[key], index = _decode(data, index)
+        return value, index
+    if tag == 0x6c:  # l
+        size, index = _decode_varint(data, index)
+        value = []
+        for _ in range(size):
+            item, index = _decode(data, index)
+            value.append(item)
+        return value, index
+    if tag == 0x4e:  # N
+        return None, index
+    if tag == 0x54:  # T
+        return True, index
+    if tag == 0x46:  # F
+        return False, index
+    raise SerializerError("Unknown tag %r" % chr(tag))
+
+
+_serializers: dict[str, Serializer] = {}
+_default = "yaml"
+
+
+def register(serializer: Serializer) -> Serializer:
+    """Make a backend available by its name."""
+    if not isinstance(serializer, Serializer):
+        raise TypeError("Expected Serializer, got %s" % type(serializer).__name__)
+    _serializers[serializer.name] = serializer
+    return serializer
+
+
+def get(name: Union[str, Serializer] = None) -> Serializer:
+    """Backend by name, the process default when name is None."""
+    if isinstance(name, Serializer):
+        return name
+    try:
+        return _serializers[_default if name is None else name]
+    except KeyError:
+        raise SerializerError("Unknown serializer %s, available: %s" % (
+            name, ", ".join(available()))) from None
+
+
+def available() -> list[str]:
+    return sorted(_serializers)
+
+
+def set_default(name: str) -> str:
+    """Set the backend used when none is given, returning the previous one."""
+    global _default
+    get(name)
+    previous, _default = _default, name
+    return previous
+
+
+def for_data(data: bytes, filename: str = "") -> Serializer:
+    """Guess the backend of stored data, from its content then its file extension."""
+    if data.startswith(BinarySerializer.MAGIC):
+        return _serializers["binary"]
+    for serializer in _serializers.values():
+        if serializer.extensions and filename.endswith(serializer.extensions) and not serializer.binary:
+            return _serializers["cyaml"] if serializer.name == "yaml" and "cyaml" in _serializers else serializer
+    default = get()
+    return _serializers["yaml"] if default.binary else default
+
+
+register(YamlSerializer())
+if yaml.__with_libyaml__:
+    register(CYamlSerializer())
+register(JsonSerializer())
+register(BinarySerializer())
@@ -0,0 +1,163 @@
+"""Columnar snapshots
+
+A population written as one typed column per stat, for analytics over many
+characters without building a dict per character.
+
+    snapshot/
+        meta.json          rows, and the kind and dtype of every column
+        Str.npy            one NumPy .npy file per numeric column
+        ...
+        Name.npy           int32 codes into the string table
+        strings.bin        UTF-8 string table, every distinct string once
+        strings.npy        int64 offsets into strings.bin, one more than strings
+
+Columns are "number" (the .npy holds the values), "string" (codes into the
+string table) or "json" (codes into the string table, each string a JSON
+document, for values like Skills that are not plain strings).
+
+Snapshot opens every .npy memory-mapped and only when a column is first
+asked for, so a query over Str never reads the other columns.
+"""
+
+import json
+from os import makedirs
+from os.path import join
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+VERSION = 1
+_kinds = ("number", "string", "json")
+
+
+class SnapshotError(ValueError):
+    """A snapshot folder is missing or was written by another format version."""
+
+
+def write(folder: str, rows: int, columns: dict[str, np.ndarray],
+          strings: dict[str, Iterable[Any]] = None, documents: dict[str, Iterable[Any]] = None) -> int:
+    """Write a snapshot of rows rows into folder. Returns the row count.
+
+    columns maps names to 1-d arrays of length rows, strings to iterables of
+    str and documents to iterables of JSON-able values."""
+    makedirs(folder, exist_ok=True)
+    meta = {"version": VERSION, "rows": rows, "columns": {}}
+    for name, values in columns.items():
+        values = np.asarray(values)
+        if values.shape != (rows,):
+            raise ValueError("Column %s has shape %s, expected (%s,)" % (name, values.shape, rows))
+        np.save(join(folder, name + ".npy"), values, allow_pickle=False)
+        meta["columns"][name] = {"kind": "number", "dtype": values.dtype.str}
+
+    table: dict[str, int] = {}
+    for kind, source in (("string", strings or {}), ("json", documents or {})):
+        for name, values in source.items():
+            codes = np.fromiter((table.setdefault(value, len(table)) for value in
+                                 (_as_string(name, val) if kind == "string" else json.dumps(val, separators=(",", ":"))
+                                  for val in values)),
+                                dtype=np.int32, count=rows)
+            np.save(join(folder, name + ".npy"), codes, allow_pickle=False)
+            meta["columns"][name] = {"kind": kind, "dtype": codes.dtype.str}
+
+    encoded = [text.encode("utf8") for text in table]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+    with open(join(folder, "strings.bin"), "wb") as f:
+        f.writelines(encoded)
+    np.save(join(folder, "strings.npy"), offsets, allow_pickle=False)
+    with open(join(folder, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=1)
+    return rows
+
+
+def _as_string(name: str, value: Any) -> str:
+    if not isinstance(value, str):
+        raise TypeError("Column %s expects str, got %s" % (name, type(value).__name__))
+    return value
+
+
+class Snapshot:
+    """Read-only, memory-mapped view over a snapshot folder.
+
+        >>> snapshot = Snapshot("population/")
+        >>> snapshot.column("Str").mean()  # reads Str.npy only
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        try:
+            with open(join(folder, "meta.json")) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            raise SnapshotError("%s is not a snapshot" % folder) from None
+        if meta.get("version") != VERSION:
+            raise SnapshotError("%s was written by snapshot format %s, expected %s" %
+                                (folder, meta.get("version"), VERSION))
+        self.rows: int = meta["rows"]
+        self.kinds: dict[str, str] = {name: column["kind"] for name, column in meta["columns"].items()}
+        self._arrays: dict[str, np.ndarray] = {}
+        self._table: list[str] = None
+
+    def __repr__(self):
+        return "<Snapshot: %s (%s rows, %s columns)>" % (self.folder, self.rows, len(self.kinds))
+
+    def __len__(self):
+        return self.rows
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.kinds
+
+    @property
+    def columns(self) -> tuple[str]:
+        return tuple(self.kinds)
+
+    def _array(self, name: str) -> np.ndarray:
+        array = self._arrays.get(name)
+        if array is None:
+            if name not in self.kinds:
+                raise KeyError(name)
+            array = self._arrays[name] = np.load(join(self.folder, name + ".npy"), mmap_mode="r")
+        return array
+
+    def _strings(self) -> list[str]:
+        if self._table is None:
+            offsets = np.load(join(self.folder, "strings.npy")).tolist()
+            with open(join(self.folder, "strings.bin"), "rb") as f:
+                data = f.read()
+            self._table = [data[start:stop].decode("utf8") for start, stop in zip(offsets, offsets[1:])]
+        return self._table
+
+    def column(self, name: str) -> Any:
+        """A numeric column as a read-only memory-mapped array, any other as a list."""
+        array = self._array(name)
+        kind = self.kinds[name]
+        if kind == "number":
+            return array
+        table = self._strings()
+        if kind == "string":
+            return [table[code] for code in array.tolist()]
+        return [json.loads(table[code]) for code in array.tolist()]
+
+    def codes(self, name: str) -> np.ndarray:
+        """String table codes of a string or json column, equal values share a code."""
+        if self.kinds.get(name, "number") == "number":
+            raise KeyError("%s is not a string column" % name)
+        return self._array(name)
+
+    def row(self, index: int) -> dict[str, Any]:
+        """Every column of one row, as plain Python values."""
+        if not -self.rows <= index < self.rows:
+            raise IndexError("Row %s out of range" % index)
+        row = {}
+        for name, kind in self.kinds.items():
+            value = self._array(name)[index].item()
+            if kind == "string":
+                value = self._strings()[value]
+            elif kind == "json":
+                value = json.loads(self._strings()[value])
+            row[name] = value
+        return row
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        for index in range(self.rows):
+            yield self.row(index)
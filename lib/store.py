@@ -0,0 +1,206 @@
+"""Async character store
+
+An asyncio facade over BaseCharacter.load/dump and the structure loader for
+servers that must not block their event loop on file I/O.
+
+    >>> async with AsyncCharacterStore("saves/") as store:
+    ...     hero = await store.load("hero")
+    ...     hero.grant_exp(120)
+    ...     await store.save(hero, "hero")
+
+Parsing, serializing, building characters and file access run on a bounded
+thread pool. Concurrent loads of the same id share one read. Saves are buffered for
+write_window seconds; saving the same id again inside the window replaces
+the buffered state, and the whole buffer is written as one batch. A load of
+an id with a buffered save returns the buffered state.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from os import makedirs, replace
+from os.path import join
+from typing import NamedTuple, Union
+
+import status
+from lib.serializer import Serializer, get as get_serializer
+from status import BaseCharacter
+
+
+class StoreStats(NamedTuple):
+    """Counters of an AsyncCharacterStore."""
+    loads: int
+    reads: int
+    merged: int
+    saves: int
+    writes: int
+    batches: int
+
+
+class AsyncCharacterStore:
+    """Characters kept as one file per id under folder.
+
+    :param serializer: backend of lib.serializer the files are written with.
+    :param max_workers: threads doing the blocking work.
+    :param write_window: seconds a save waits for more saves to batch with.
+    """
+
+    def __init__(self, folder: str, serializer: Union[str, Serializer] = None, max_workers: int = 4,
+                 write_window: float = 0.05):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.folder = folder
+        self.serializer = get_serializer(serializer)
+        self.write_window = write_window
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="character-store")
+        self._loading: dict[str, asyncio.Future] = {}
+        self._pending: dict[str, dict] = {}
+        # Saves handed to the thread pool and not written yet.
+        self._writing: dict[str, dict] = {}
+        self._batch: asyncio.Future = None
+        self._flusher: asyncio.TimerHandle = None
+        self._closed = False
+        self._loads = self._reads = self._merged = self._saves = self._writes = self._batches = 0
+        makedirs(folder, exist_ok=True)
+
+    def __repr__(self):
+        return "<AsyncCharacterStore: %s (%s)>" % (self.folder, self.serializer.name)
+
+    async def __aenter__(self) -> 'AsyncCharacterStore':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def path(self, character_id: str) -> str:
+        """File of a character id."""
+        if not character_id or character_id.startswith(".") or "/" in character_id or "\\" in character_id:
+            raise ValueError("Invalid character id %r" % character_id)
+        return join(self.folder, character_id + (self.serializer.extensions[:1] or ("",))[0])
+
+    async def _run(self, func, *args):
+        if self._closed:
+            raise RuntimeError("%r is closed" % self)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def load(self, character_id: str, trusted: bool = False) -> BaseCharacter:
+        """Load a character, sharing the read with concurrent loads of the same id.
+
+        Every caller gets its own BaseCharacter, built on the thread pool:
+        validation and cls_calculate may load structure files."""
+        self._loads += 1
+        filename = self.path(character_id)
+        pending = self._pending.get(character_id, self._writing.get(character_id))
+        if pending is not None:
+            return await self._run(_build, pending, trusted)
+        reading = self._loading.get(character_id)
+        if reading is None:
+            self._reads += 1
+            reading = self._loading[character_id] = asyncio.ensure_future(self._run(self._read, filename, trusted))
+            reading.add_done_callback(lambda _: self._loading.pop(character_id, None))
+            return (await asyncio.shield(reading))[1]
+        self._merged += 1
+        mapping, _ = await asyncio.shield(reading)
+        return await self._run(_build, mapping, trusted)
+
+    def _read(self, filename: str, trusted: bool) -> tuple[dict, BaseCharacter]:
+        """Read and parse a file, and build the character of the load that started the read."""
+        with open(filename, "rb") as file:
+            data = file.read()
+        mapping = self.serializer.loads(data if self.serializer.binary else data.decode("utf8"))
+        return mapping, _build(mapping, trusted)
+
+    async def save(self, character: BaseCharacter, character_id: str = None):
+        """Buffer the current state of character and wait until its batch is written.
+
+        character_id defaults to the character's Name."""
+        if self._closed:
+            raise RuntimeError("%r is closed" % self)
+        character_id = character.character_attribute.Name if character_id is None else character_id
+        self.path(character_id)
+        self._saves += 1
+        self._pending[character_id] = _copy_mapping(character._to_mapping())
+        if self._batch is None:
+            self._schedule()
+        await asyncio.shield(self._batch)
+
+    def _schedule(self):
+        """Start a batch, flushed write_window seconds from now."""
+        loop = asyncio.get_running_loop()
+        self._batch = loop.create_future()
+        self._flusher = loop.call_later(self.write_window, lambda: asyncio.ensure_future(self._flush_later()))
+
+    async def flush(self):
+        """Write the buffered saves now, as one batch."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        batch, self._batch = self._batch, None
+        pending, self._pending = self._pending, {}
+        if batch is None:
+            return
+        self._writing.update(pending)
+        try:
+            self._batches += 1
+            await self._run(self._write, pending)
+        except BaseException as exc:
+            if not batch.done():
+                batch.set_exception(exc)
+            # Saves that were not written go back, unless newer ones arrived, and are retried later.
+            for key, val in pending.items():
+                self._pending.setdefault(key, val)
+            if self._pending and self._batch is None and not self._closed:
+                self._schedule()
+                # Nobody may be waiting on the retry, its failure must not be reported as never retrieved.
+                self._batch.add_done_callback(lambda future: future.cancelled() or future.exception())
+            raise
+        else:
+            batch.set_result(len(pending))
+        finally:
+            for key, val in pending.items():
+                if self._writing.get(key) is val:
+                    del self._writing[key]
+
+    async def _flush_later(self):
+        try:
+            await self.flush()
+        except Exception:
+            pass  # raised to the waiting save calls through their batch
+
+    def _write(self, pending: dict[str, dict]):
+        for character_id, mapping in pending.items():
+            data = self.serializer.dumps(mapping)
+            filename = self.path(character_id)
+            with open(filename + ".tmp", "wb") as file:
+                file.write(data if self.serializer.binary else data.encode("utf8"))
+            replace(filename + ".tmp", filename)
+            self._writes += 1
+
+    async def load_structure(self, path: str, struct_id: str) -> dict:
+        """Structure loader of status (pack or YAML), off the event loop."""
+        return await self._run(status._load_structure, path, struct_id)
+
+    async def close(self):
+        """Write what is buffered and stop the thread pool."""
+        if self._closed:
+            return
+        try:
+            await self.flush()
+        finally:
+            self._closed = True
+            self._executor.shutdown(wait=False)
+
+    def stats(self) -> StoreStats:
+        return StoreStats(self._loads, self._reads, self._merged, self._saves, self._writes, self._batches)
+
+
+def _build(mapping: dict, trusted: bool) -> BaseCharacter:
+    """A character of its own out of a mapping that may be shared."""
+    return BaseCharacter._from_mapping(_copy_mapping(mapping), trusted)
+
+
+def _copy_mapping(mapping: dict) -> dict:
+    """Copy of a character mapping that shares no mutable value with it."""
+    mapping = dict(mapping)
+    if isinstance(mapping.get("Skills"), dict):
+        mapping["Skills"] = dict(mapping["Skills"])
+    return mapping
@@ -0,0 +1,135 @@
+"""Structure pack
+
+Compiles a whole structures/ tree into one binary file, so a cold start
+does not have to parse every YAML file.
+
+Layout (little endian):
+
+    magic    8 bytes   b"RPGSPACK"
+    version  u16       pack format version
+    marshal  u16       marshal format version of the payloads
+    python   2 x u8    major, minor version that wrote the payloads
+    index    u32       length of the index, which follows the header
+    index              marshal'd {struct_id: (offset, length, mtime_ns, relative path)}
+    payloads           one marshal'd dict per entry
+
+At runtime the file is memory-mapped and an entry is decoded the first time
+it is asked for.
+
+    $ python -m lib.structpack structures/ structures.pack
+"""
+
+import marshal
+import mmap
+import struct
+import sys
+from os import stat
+from os.path import join, relpath
+from typing import Optional
+
+from lib.registry import StructureRegistry
+
+MAGIC = b"RPGSPACK"
+VERSION = 1
+_header = struct.Struct("<8sHHBBI")
+
+
+class StalePackError(Exception):
+    """The pack was written by another format or Python version."""
+
+
+def build(root: str, filename: str) -> int:
+    """Compile every structure under root into filename. Returns the entry count."""
+    registry = StructureRegistry(root, maxsize=1)
+    index = {}
+    payloads = []
+    offset = 0
+    for key in registry.keys():
+        f_path = registry.path(key)
+        mtime = stat(f_path).st_mtime_ns
+        payload = marshal.dumps(registry.get(key))
+        index[key] = offset, len(payload), mtime, relpath(f_path, root)
+        payloads.append(payload)
+        offset += len(payload)
+    index_data = marshal.dumps(index)
+    with open(filename, "wb") as f:
+        f.write(_header.pack(MAGIC, VERSION, marshal.version,
+                             *sys.version_info[:2], len(index_data)))
+        f.write(index_data)
+        f.writelines(payloads)
+    return len(index)
+
+
+class StructurePack:
+    """Read-only, lazily decoded view over a pack file.
+
+    get returns None for entries whose source file under root changed since
+    the pack was built, so callers can fall back to the YAML file."""
+
+    def __init__(self, filename: str, root: str):
+        self.filename = filename
+        self.root = root
+        with open(filename, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, marshal_version, major, minor, index_size = _header.unpack_from(
+            self._map)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError("%s is not a structure pack" % filename)
+        if (version, marshal_version, major, minor) != (VERSION, marshal.version, *sys.version_info[:2]):
+            self._map.close()
+            raise StalePackError(filename)
+        start = _header.size + index_size
+        self._start = start
+        self._index: dict[str, tuple[int, int, int, str]] = marshal.loads(
+            self._map[_header.size:start])
+        self._decoded: dict[str, dict] = {}
+
+    def __repr__(self):
+        return "<StructurePack: %s (%s entries)>" % (self.filename, len(self._index))
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def keys(self) -> list[str]:
+        return sorted(self._index)
+
+    def close(self):
+        self._map.close()
+
+    def is_fresh(self, key: str) -> bool:
+        """Whether the source file of key is unchanged since the pack was built."""
+        entry = self._index.get(key)
+        if entry is None:
+            return False
+        try:
+            return stat(join(self.root, entry[3])).st_mtime_ns == entry[2]
+        except FileNotFoundError:
+            return False
+
+    def get(self, key: str, check: bool = True) -> Optional[dict]:
+        """Decoded entry, or None if it is not in the pack or (with check) stale."""
+        if check and not self.is_fresh(key):
+            return None
+        data = self._decoded.get(key)
+        if data is None:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            offset = self._start + entry[0]
+            data = self._decoded[key] = marshal.loads(
+                self._map[offset:offset + entry[1]])
+        return data
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Compile a structures/ tree into a pack.")
+    parser.add_argument("root")
+    parser.add_argument("output")
+    args = parser.parse_args()
+    print("Packed %s structures into %s" % (build(args.root, args.output), args.output))
@@ -6,21 +6,41 @@ The basic status will be implemented here."""
 __version__ = "0.0.1-5a Non-functional"
 __author__ = "RimuEirnarn"
 
+import sys
+from copy import copy
+from zlib import crc32
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from os.path import exists, join
-from typing import Any, Iterable, Literal, NamedTuple, NoReturn, Union
+from array import array
+from dataclasses import dataclass, fields, make_dataclass
+from functools import partial
+from types import MappingProxyType
+from json import dumps as json_dumps, loads as json_loads
+from weakref import WeakValueDictionary
+from typing import IO, Any, Callable, Iterable, Literal, NamedTuple, NoReturn, Optional, Union, get_args, get_origin, get_type_hints
+from os import stat
+from os.path import dirname, join
 from warnings import warn
 from math import inf
-from lib.internal import randint
-
+from lib.internal import RandomStream, get_stream
+from lib.instrument import CallStats, Instrumentation
+from lib.curve import ExpCurve
+from lib.registry import StructureRegistry
+from lib.index import StructureIndex
+from lib.loadout import LoadoutCache, LoadoutStats
+from lib.structpack import StalePackError, StructurePack
+from lib.modifier import Modifier, modify
+from lib.formula import FormulaSet, compile_formulas, load_formulas
+from lib.snapshot import Snapshot, write as _write_snapshot
+from lib.serializer import Serializer, for_data as _serializer_for, get as get_serializer
+
+import numpy as np
 from yaml import safe_dump, safe_load
 from lib.htf import format
-from dataclasses import dataclass
 
 _debug_ = True
 _default_unmatched_str = "Unmatched type of %s, expected %s but got %s"
 structure_folder = "structures/"
+formula_file = join(dirname(__file__), "lib", "formula.yaml")
 
 # TODO: Always do runtime type checking for every Character creation. This must be affecting only Attribute, CharAttribute and ComputationalAttribute
 # But only creation at .load() will use 'Literal' only to Race and Gender parameter.
@@ -50,6 +70,15 @@ class FrozenClassWarning(Warning):
              "Some classes is in frozen state and thus for further calculations cannot be done. Therefore, they cannot do anything.", cls, stacklevel, source)
 
 
+class StalePackWarning(Warning):
+    """A structure pack cannot be used, structures are read from YAML instead."""
+
+    @classmethod
+    def warn(cls, filename: str, stacklevel=0, source=None):
+        warn("Structure pack %s is stale, falling back to the structures folder." %
+             filename, cls, stacklevel, source)
+
+
 class FrozenClassError(Exception):
     """Classes that are required is a frozen classes."""
 
@@ -58,6 +87,10 @@ class UnableToSetAttribute(Exception):
     """An operation failed because the instance is not writable."""
 
 
+class ForkConflictError(Exception):
+    """A fork cannot be committed, its parent changed since the fork."""
+
+
 class NotAvailable:
     def __init__(self):
         pass
@@ -72,6 +105,41 @@ class NotAvailable:
         return "N/A"
 
 
+class LevelUpRecord(NamedTuple):
+    """One level crossed by BaseCharacter.grant_exp.
+
+    :param Level: is the level reached.
+    :param EXP_Cost: is the EXP paid to reach it.
+    :param Gains: maps each Attribute name to the amount it was raised by."""
+    Level: int
+    EXP_Cost: int
+    Gains: dict[str, int]
+
+
+class EffectiveStats(NamedTuple):
+    """Stats of a character with modifiers applied. Infinite values are Max."""
+    attribute: 'FrozenAttribute'
+    computational: 'FrozenComputationalAttribute'
+
+
+class CharacterSnapshot(NamedTuple):
+    """Immutable copy of a character's attributes, see BaseCharacter.snapshot."""
+    attribute: 'FrozenAttribute'
+    character_attribute: 'FrozenCharAttribute'
+    computational: 'FrozenComputationalAttribute'
+
+
+class LoadReport:
+    """Counts of BaseCharacter.load_many, filled in while the roster streams."""
+
+    def __init__(self):
+        self.loaded = 0
+        self.skipped = 0
+
+    def __repr__(self):
+        return f"<LoadReport: {self.loaded} loaded, {self.skipped} skipped>"
+
+
 class ValidationReturn(NamedTuple):
     """ValidationReturn
 
@@ -131,12 +199,37 @@ class _AbstractFileStructure:
 
     _correspondend_classes = {}
 
-    def __new__(self, **kwargs):
-        self.__dict__.update(kwargs)
+    def __new__(cls, **kwargs):
+        new = object.__new__(cls)
+        new.__dict__.update(kwargs)
+        return new
+
+    def __setattr__(self, name: str, value: Any) -> NoReturn:
+        raise FrozenClassError("%r is shared and cannot be changed" % self)
+
+    def __delattr__(self, name: str) -> NoReturn:
+        raise FrozenClassError("%r is shared and cannot be changed" % self)
+
+    def __eq__(self, other: Any) -> bool:
+        # Loaded structures are interned, so identity is enough; a struct id still compares equal.
+        if isinstance(other, str):
+            return other == self.__dict__.get('_struct_id')
+        return self is other
+
+    def __hash__(self):
+        struct_id = self.__dict__.get('_struct_id')
+        return id(self) if struct_id is None else hash(struct_id)
+
+    def __reduce__(self):
+        struct_id = self.__dict__.get('_struct_id')
+        if struct_id is None:
+            return _rebuild_structure, (self.__class__, self.__dict__.copy())
+        return self.__class__.loader, (struct_id,)
 
     def __init_subclass__(cls, path: str, final=True) -> None:
         cls._path = path
-        cls._loaded_instances = []
+        # struct_id -> the one live instance of it, dropped once nothing refers to it.
+        cls._loaded_instances = WeakValueDictionary()
         if final is True:
             def _n():
                 raise FinalClassError("Cannot subclass a finalized class.")
@@ -149,11 +242,43 @@ class _AbstractFileStructure:
 
     @classmethod
     def loader(cls, struct_id: str) -> Any:
-        return cls(**_AFS_loader('', struct_id))
+        """The shared instance of struct_id, built again only when its file changed."""
+        version = _structure_version(cls._path, struct_id)
+        instance = cls._loaded_instances.get(struct_id)
+        if instance is not None and instance.__dict__['_version'] == version:
+            return instance
+        instance = cls(**_load_structure(cls._path, struct_id))
+        instance.__dict__.update(_struct_id=struct_id, _version=version)
+        cls._loaded_instances[struct_id] = instance
+        return instance
+
+    @classmethod
+    def intern(cls, struct_id: str) -> Optional['_AbstractFileStructure']:
+        """The live shared instance of struct_id, loaded if needed, or None if there is no such structure.
+
+        Unlike loader, a live instance is returned without checking its file."""
+        instance = cls._loaded_instances.get(struct_id)
+        if instance is None and _structure_exists(cls._path, struct_id):
+            instance = cls.loader(struct_id)
+        return instance
+
+    @property
+    def struct_id(self) -> Optional[str]:
+        return self.__dict__.get('_struct_id')
 
     def __repr__(self):
         return '<%s: %s>' % (self.__class__.__name__, self._name if hasattr(self, '_name') else None)
 
+    @property
+    def modifiers(self) -> Modifier:
+        """Buff/Debuff of this structure, compiled once into a Modifier over every stat."""
+        modifier = self.__dict__.get('_modifiers')
+        if modifier is None:
+            section = self.__dict__.get(self.__class__.__name__) or {}
+            modifier = self.__dict__['_modifiers'] = Modifier.compile(
+                _stat_fields, section.get('Buff'), section.get('Debuff'))
+        return modifier
+
 # source: http://docs.python.org/3/howto/descriptor.html
 # if i'm not wrong... i use the offline docs
 # offline docs: http://[IPv4]:[port]/howto/descriptor.html
@@ -240,19 +365,42 @@ Max = Maximum()
 # Internal functions
 
 
-def max_exp(level: int, type_: Literal[0, 1, 2] = 0) -> Union[int, Maximum]:
-    if type_ == 0:
-        return (level*46)*level + randint(0, 30, 1)
-    elif type_ == 1:
-        if level == 5 or level >= 10:
-            return Max
-        return (level*200*17)*level + randint(0, 100, 1)
-    elif type_ == 2:
-        if level >= 10:
-            return Max
-        return (level*30)*level + randint(0, 60, 1)
-    else:
+# Normal, magical and skill EXP curves, indexed by type_.
+_exp_curves = (
+    ExpCurve(lambda levels: (levels*46)*levels, 30, name="normal"),
+    ExpCurve(lambda levels: (levels*200*17)*levels, 100,
+             lambda levels: (levels == 5) | (levels >= 10), "magical"),
+    ExpCurve(lambda levels: (levels*30)*levels, 60, lambda levels: levels >= 10, "skill"),
+)
+
+
+def _exp_curve_for(type_: int) -> ExpCurve:
+    if type_ not in (0, 1, 2):
         raise ValueError("type_ expected 0 or 1 or 2, got %s" % type_)
+    return _exp_curves[type_]
+
+
+def _exp_seed(name: Any) -> int:
+    """Jitter seed of a character, from its Name."""
+    return crc32(str(name).encode("utf8"))
+
+
+def max_exp(level: int, type_: Literal[0, 1, 2] = 0, seed: int = 0) -> Union[int, Maximum]:
+    """EXP needed to leave level, or Max. The same seed always gets the same jitter."""
+    cost = _exp_curve_for(type_).cost(level, seed)
+    return Max if cost is None else cost
+
+
+def level_for_exp(exp: int, type_: Literal[0, 1, 2] = 0, seed: int = 0) -> tuple[int, int]:
+    """Level reached from level 1 with exp in total, and the EXP left over in that level."""
+    return _exp_curve_for(type_).level_for(exp, seed)
+
+
+registry = StructureRegistry(structure_folder)
+_pack: Optional[StructurePack] = None
+_item_index: Optional[StructureIndex] = None
+_loadouts: Optional[LoadoutCache] = None
+_loadout_registry: Optional[StructureRegistry] = None
 
 
 def setDebug(value: Any = None):
@@ -260,78 +408,251 @@ def setDebug(value: Any = None):
     _debug_ = (not _debug_) if value is None else not not value
 
 
+def setInstrumentation(value: Any = None):
+    """Switch call counting and timing of the hot paths on or off, toggles like setDebug.
+
+    While off, the hot paths are the plain functions. See stats() and profile()."""
+    value = (not _instrumentation.enabled) if value is None else not not value
+    if value:
+        _instrumentation.enable()
+    else:
+        _instrumentation.disable()
+
+
+def stats(reset: bool = False) -> dict[str, CallStats]:
+    """Counters, timers and histograms per instrumented function, see setInstrumentation."""
+    result = _instrumentation.stats()
+    if reset:
+        _instrumentation.reset()
+    return result
+
+
+def profile() -> str:
+    """The instrumentation counters as a flat profile."""
+    return _instrumentation.profile()
+
+
+def _registry() -> StructureRegistry:
+    """The structure registry, rebuilt when structure_folder was changed."""
+    global registry
+    if registry.root != structure_folder:
+        registry = StructureRegistry(structure_folder, registry.maxsize)
+    return registry
+
+
 def _AFS_loader(path, struct_id) -> dict:
-    f_path = join(structure_folder+path, struct_id.split('.'))
-    id_path = f'{path}.{struct_id}'
-    if not exists(f_path):
-        raise FileNotFoundError(id_path)
-    with open(f_path) as f:
-        n = safe_load(f.read())
-    if not isinstance(n, dict):
-        raise TypeError("Expected dict type, got %s" % type(n))
-    return n
+    """Read a structure as dict, through the cached structure registry."""
+    return _registry().get(f'{path}.{struct_id}'.strip('.'))
+
+
+def _structure_exists(path, struct_id) -> bool:
+    """Whether the pack or the structure folder has the structure, without re-indexing."""
+    key = f'{path}.{struct_id}'.strip('.')
+    if _pack is not None and key in _pack:
+        return True
+    try:
+        return key in _registry()
+    except FileNotFoundError:
+        return False
+
+
+def _structure_version(path, struct_id) -> tuple[str, int, Optional[StructurePack]]:
+    """File, mtime and serving pack of a structure. Unlike the parsed dict, it
+    stays the same when the registry drops the entry and parses the file again."""
+    key = f'{path}.{struct_id}'.strip('.')
+    f_path = _registry().path(key)
+    return f_path, stat(f_path).st_mtime_ns, _pack if _pack is not None and _pack.is_fresh(key) else None
+
+
+def _rebuild_structure(cls: type, data: dict) -> '_AbstractFileStructure':
+    return cls(**{key: val for key, val in data.items() if not key.startswith('_')})
+
+
+def item_index(refresh: bool = False) -> StructureIndex:
+    """Inverted index over the structures under items, built on first use, see lib.index.
+
+    With refresh, files changed since the last refresh are indexed again first."""
+    global _item_index
+    current = _registry()
+    if _item_index is None or _item_index.registry is not current:
+        _item_index = StructureIndex(current, "items.", lambda key: _load_structure(*key.split('.', 1)))
+    elif refresh:
+        _item_index.refresh()
+    return _item_index
+
+
+def loadout_cache() -> LoadoutCache:
+    """Combined modifiers of item loadouts, see lib.loadout and BaseCharacter.effective.
+
+    Emptied when structure_folder or the pack changes; after editing item
+    files in place, call invalidate() on it."""
+    global _loadouts, _loadout_registry
+    current = _registry()
+    if _loadouts is None:
+        _loadouts = LoadoutCache(lambda item_id: Item.loader(item_id).modifiers, _stat_fields)
+    elif _loadout_registry is not current:
+        _loadouts.invalidate()
+    _loadout_registry = current
+    return _loadouts
+
+
+def use_pack(filename: Optional[str]) -> Optional[StructurePack]:
+    """Serve structures from a pack built by lib.structpack, or from YAML again with None."""
+    global _pack
+    if _pack is not None:
+        _pack.close()
+        _pack = None
+    if _loadouts is not None:
+        _loadouts.invalidate()
+    if filename is None:
+        return None
+    try:
+        _pack = StructurePack(filename, structure_folder)
+    except StalePackError:
+        StalePackWarning.warn(filename)
+    return _pack
+
+
+def set_formulas(formulas: Union[dict[str, str], str, FormulaSet]) -> FormulaSet:
+    """Swap the ComputationalAttribute formulas, from a mapping, a YAML file or a FormulaSet.
+
+    Every ComputationalAttribute field needs an expression (or N/A). Returns
+    the previous formulas, which can be passed back to restore them.
+    Characters keep their values until recomputed."""
+    global _formulas
+    if isinstance(formulas, FormulaSet):
+        formulas = formulas.source
+    elif isinstance(formulas, str):
+        formulas = load_formulas(formulas, "ComputationalAttribute")
+    missing = set(_computational_fields).difference(formulas)
+    unknown = set(formulas).difference(_computational_fields)
+    if missing or unknown:
+        raise ValueError("Formulas must cover exactly the ComputationalAttribute fields (missing: %s, unknown: %s)" % (
+            ", ".join(sorted(missing)) or "none", ", ".join(sorted(unknown)) or "none"))
+    previous, _formulas = _formulas, compile_formulas(
+        formulas, _attribute_fields, NotAvailable)
+    return previous
+
+
+def _load_structure(path, struct_id) -> dict:
+    """Read a structure from the pack when it is fresh, otherwise with _AFS_loader."""
+    if _pack is not None:
+        data = _pack.get(f'{path}.{struct_id}')
+        if data is not None:
+            return data
+    return _AFS_loader(path, struct_id)
+
+
+class _Validator:
+    """Checks of one stat block class, generated once from its field type hints.
+
+    Fields typed int in a computational block also take floats, the formulas
+    produce floats for them."""
+
+    def __init__(self, cls: type):
+        source = getattr(cls, '_validates_as', cls)
+        hints = get_type_hints(source)
+        self.name = cls.__name__
+        params = getattr(cls, '__dataclass_params__', None)
+        self.frozen = params is not None and params.frozen
+        widen_int = issubclass(source, (ComputationalAttribute, FrozenComputationalAttribute))
+        self.checks = tuple(_field_check(field.name, hints[field.name], widen_int)
+                            for field in fields(source))
+
+    def __repr__(self):
+        return "<_Validator: %s>" % self.name
+
+    def errors(self, instance) -> Iterable[ValidationReturn]:
+        """Every failing field of instance. NotAvailable fields are set to their default."""
+        for key, types, expected, extra, lenient in self.checks:
+            val = getattr(instance, key)
+            if val is NotAvailable:
+                NotAvailableWarning.warn(key)
+                if self.frozen:
+                    raise UnableToSetAttribute(
+                        "Instance %s has frozen attribute or itself is frozen" % (self.name))
+                default = _not_available_defaults.get(key, 0)
+                setattr(instance, key, default() if callable(default) else default)
+                continue
+            if not isinstance(val, types):
+                if lenient is True and _debug_ is True:
+                    continue
+                yield ValidationReturn(False, key, type(val), _default_unmatched_str % (key, expected, type(val).__name__))
+            elif extra is not None:
+                reason = extra(val)
+                if reason:
+                    yield ValidationReturn(False, key, type(val), reason)
+
+    def validate(self, instance) -> ValidationReturn:
+        """First failing field of instance, or a successful ValidationReturn."""
+        for error in self.errors(instance):
+            return error
+        return ValidationReturn(True)
+
+
+def _field_check(name: str, hint: Any, widen_int: bool) -> tuple:
+    """(name, isinstance types, expected type text, extra check, lenient in debug) of one field."""
+    if hint is Race:
+        # Races may still be referred to by name.
+        types = (Race, str)
+    elif get_origin(hint) is Union:
+        types = get_args(hint)
+    else:
+        types = (get_origin(hint) or hint,)
+    if widen_int and types == (int,):
+        types = (int, float)
+    expected = " | ".join(sorted(_type.__name__ for _type in types)) if len(types) > 1 else types[0].__name__
+    return name, types, expected, _extra_checks.get(name), hint is Race
+
+
+def _check_gender(val: Union[int, str]) -> str:
+    if isinstance(val, int) and (val < -1 or val > 3):
+        return "The gender id is less than -1 or more than 3"
+    return ""
+
+
+def _check_skills(val: dict) -> str:
+    for key, val_ in val.items():
+        if not isinstance(key, str) or not isinstance(val_, str):
+            return _default_unmatched_str % (key, "str", type(val_).__name__)
+    return ""
+
+
+_extra_checks = {"Gender": _check_gender, "Skills": _check_skills}
+_not_available_defaults = {"Race": "Nothing", "Gender": -1, "Skills": dict}
+_validators: dict[type, _Validator] = {}
+
+
+def _validator_for(instance) -> _Validator:
+    cls = type(instance)
+    validator = _validators.get(cls)
+    if validator is None:
+        validator = _validators[cls] = _Validator(cls)
+    return validator
 
 
 def _is_valid_attribute(instance: Union['Attribute', 'FrozenAttribute']) -> ValidationReturn:
-    for key, val in instance.__dict__.copy().items():
-        if isinstance(val, NotAvailable.__class__):
-            NotAvailableWarning.warn(key)
-            if "Frozen" in instance.__class__.__name__:
-                raise UnableToSetAttribute(
-                    "Instance %s has frozen attribute or itself is frozen" % (instance.__class__.__name__))
-            setattr(instance, key, 0)
-            continue
-        if not isinstance(val, int):
-            return ValidationReturn(False, key, type(val), _default_unmatched_str % (key, "int", type(val).__name__))
-    return ValidationReturn(True)
+    return _validator_for(instance).validate(instance)
 
 
 def _is_valid_comp_attribute(instance: Union['ComputationalAttribute', 'FrozenComputationalAttribute']) -> ValidationReturn:
-    for key, val in instance.__dict__.copy().items():
-        if isinstance(val, NotAvailable.__class__):
-            NotAvailableWarning.warn(key)
-            if "Frozen" in instance.__class__.__name__:
-                raise UnableToSetAttribute(
-                    "Instance %s has frozen attribute or itself is frozen" % (instance.__class__.__name__))
-            setattr(instance, key, 0)
-            continue
-        if not isinstance(val, (int, float)):
-            return ValidationReturn(False, key, type(val), _default_unmatched_str % (key, "int | float", type(val).__name__))
-    return ValidationReturn(True)
+    return _validator_for(instance).validate(instance)
 
 
 def _is_valid_char_attribute(instance: Union['CharAttribute', 'FrozenCharAttribute']) -> ValidationReturn:
-    for key, val in instance.__dict__.copy().items():
-        if isinstance(val, NotAvailable.__class__):
-            NotAvailableWarning.warn(key)
-            if "Frozen" in instance.__class__.__name__:
-                raise UnableToSetAttribute(
-                    "Instance %s has frozen attribute or itself is frozen" % (instance.__class__.__name__))
-            if key == "Race":
-                setattr(instance, key, "Nothing")
-            elif key == "Gender":
-                setattr(instance, key, -1)
-            elif key == 'Skills':
-                setattr(instance, key, {})
-            else:
-                setattr(instance, key, 0)
-            continue
-        if key == "Race":
-            if not isinstance(val, Race) and not isinstance(val, str) and not _debug_ is True:
-                return ValidationReturn(False, key, type(val), _default_unmatched_str % (key, "Race | str", type(val).__name__))
-        elif key == "Gender":
-            if not isinstance(val, (int, str)):
-                return ValidationReturn(False, key, type(val), _default_unmatched_str % (key, "int | str", type(val).__name__))
-            if val < -1 or val > 3:
-                return ValidationReturn(False, key, type(val), "The gender id is less than -1 or more than 3")
-        elif not isinstance(val, (int, str, dict)):
-            return ValidationReturn(False, key, type(val), _default_unmatched_str % (key, "int | str | dict", type(val).__name__))
-        elif isinstance(val, dict):
-            # Skills
-            for key, val_ in val.items():
-                if not isinstance(key, str) and isinstance(val_, str):
-                    return ValidationReturn(False, key, type(val), _default_unmatched_str % (key, "str", type(val).__name__))
-    return ValidationReturn(True)
+    return _validator_for(instance).validate(instance)
+
+
+def validate_many(instances: Iterable[Any]) -> list[tuple[int, ValidationReturn]]:
+    """Validate a batch of stat blocks, of any mix of classes.
+
+    Returns (index, ValidationReturn) for every failing field of every
+    instance, an empty list when the whole batch is valid."""
+    failures = []
+    for index, instance in enumerate(instances):
+        failures.extend((index, error)
+                        for error in _validator_for(instance).errors(instance))
+    return failures
 
 
 def _is_valid_everything(instance1: Union['Attribute', 'FrozenAttribute'], instance2: Union['CharAttribute', 'FrozenAttribute'], instance3: Union['ComputationalAttribute', 'FrozenComputationalAttribute']) -> Iterable:
@@ -351,6 +672,23 @@ def _is_valid_for_base_character(instance1: Union['Attribute', 'FrozenAttribute'
     return True, (n1, n2)
 
 
+def _as_dict(instance) -> dict:
+    """Field values of a stat block, whether it has a __dict__, slots or packed storage."""
+    try:
+        return instance.__dict__.copy()
+    except AttributeError:
+        return {name: getattr(instance, name) for name in instance._fields}
+
+
+def _char_attribute_dict(instance) -> dict:
+    """_as_dict of a character attribute, with a Race structure as its struct id."""
+    obj = _as_dict(instance)
+    race = obj.get('Race')
+    if isinstance(race, _AbstractFileStructure):
+        obj['Race'] = race.struct_id
+    return obj
+
+
 def no_frozen(func):
     def wrapper(self, *args, **kwargs):
         if self._frozen is True:
@@ -366,22 +704,22 @@ def no_frozen(func):
 
 class Race(_AbstractFileStructure, path="races"):
     def __new__(cls, **kwargs) -> "Race":
-        pass
+        return super().__new__(cls, **kwargs)
 
 
 class Item(_AbstractFileStructure, path="items"):
     def __new__(cls, **kwargs) -> 'Item':
-        pass
+        return super().__new__(cls, **kwargs)
 
 
 class Magic(_AbstractFileStructure, path="magics"):
     def __new__(cls, **kwargs) -> 'Magic':
-        pass
+        return super().__new__(cls, **kwargs)
 
 
 class Skill(_AbstractFileStructure, path="skills"):
     def __new__(cls, **kwargs) -> 'Skill':
-        pass
+        return super().__new__(cls, **kwargs)
 
 
 # =================================================================
@@ -505,12 +843,190 @@ class FrozenCharAttribute:
 
 # =================================================================
 
+#                             Compact
+
+# =================================================================
+
+# Same fields and attribute access as the classes above, for large rosters.
+# BaseCharacter picks the matching computational class by itself.
+# Measured with bench/bench_memory.py (10 000 characters, CPython 3.11):
+#
+#                                       Attribute + CharAttribute   BaseCharacter
+#   Attribute, CharAttribute                         667 bytes         1547 bytes
+#   SlottedAttribute, SlottedCharAttribute           442 bytes         1266 bytes
+#   PackedAttribute, SlottedCharAttribute            490 bytes         1092 bytes
+
+def _slotted(cls: type) -> type:
+    """Slotted twin of a stat dataclass: the same fields, but no per-instance __dict__."""
+    new = make_dataclass('Slotted' + cls.__name__, [(field.name, field.type) for field in fields(cls)],
+                         repr=True, eq=True, frozen=False, init=True, slots=True)
+    new.__module__ = __name__
+    new.__doc__ = "Slotted %s" % cls.__doc__[0].lower() + cls.__doc__[1:]
+    new._fields = tuple(field.name for field in fields(cls))
+    new._validates_as = cls
+    return new
+
+
+SlottedAttribute = _slotted(Attribute)
+SlottedComputationalAttribute = _slotted(ComputationalAttribute)
+SlottedCharAttribute = _slotted(CharAttribute)
+
+
+class _PackedStats(array):
+    """Stat block stored as one typed array, fields are read by index.
+
+    Subclasses set _fields and _typecode. In 'd' blocks NaN stands for
+    NotAvailable and inf for Max; 'q' blocks only hold integers."""
+    __slots__ = ()
+    _fields: tuple[str] = ()
+    _typecode = 'd'
+
+    def __new__(cls, *args, **kwargs):
+        if len(args) > len(cls._fields):
+            raise TypeError("%s takes %s values, got %s" %
+                            (cls.__name__, len(cls._fields), len(args)))
+        values = dict(zip(cls._fields, args))
+        for key, val in kwargs.items():
+            if key not in cls._fields or key in values:
+                raise TypeError("Unexpected or duplicate field %s" % key)
+            values[key] = val
+        if len(values) != len(cls._fields):
+            raise TypeError("%s missing %s" % (cls.__name__, ", ".join(
+                name for name in cls._fields if name not in values)))
+        return super().__new__(cls, cls._typecode, [cls._store(name, values[name]) for name in cls._fields])
+
+    @classmethod
+    def _store(cls, name: str, value: Any) -> Union[int, float]:
+        """value as it goes into the array, StaticTypingException if it cannot."""
+        stored = _packed_value(value)
+        if cls._typecode == 'q' and (isinstance(stored, bool) or not isinstance(stored, int)):
+            raise StaticTypingException(_default_unmatched_str % (name, "int", type(value).__name__))
+        return stored
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for index, name in enumerate(cls._fields):
+            setattr(cls, name, property(*_packed_accessors(index, name), doc=name))
+
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__, ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields))
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return [getattr(self, name) for name in self._fields] == [getattr(other, name) for name in other._fields]
+
+    __hash__ = None
+
+    def __copy__(self):
+        return self.__class__(*(getattr(self, name) for name in self._fields))
+
+    def __deepcopy__(self, memo):
+        return self.__copy__()
+
+    def __reduce__(self):
+        return self.__class__, tuple(getattr(self, name) for name in self._fields)
+
+
+def _packed_value(value: Any) -> Union[int, float]:
+    """A stat value as a plain number: NotAvailable as NaN, Max as inf."""
+    if value is NotAvailable or isinstance(value, NotAvailable.__class__):
+        return float('nan')
+    if isinstance(value, Maximum):
+        return inf
+    return value
+
+
+def _packed_accessors(index: int, name: str):
+    def getter(self):
+        value = self[index]
+        return NotAvailable if value != value else Max if value == inf else value
+
+    def setter(self, value):
+        self[index] = self._store(name, value)
+    return getter, setter
+
+
+class PackedAttribute(_PackedStats):
+    """Attribute stored as one array('q')"""
+    __slots__ = ()
+    _validates_as = Attribute
+    _fields = tuple(field.name for field in fields(Attribute))
+    _typecode = 'q'
+
+
+class PackedComputationalAttribute(_PackedStats):
+    """Computational attribute stored as one array('d')"""
+    __slots__ = ()
+    _validates_as = ComputationalAttribute
+    _fields = tuple(field.name for field in fields(ComputationalAttribute))
+    _typecode = 'd'
+
+
+# =================================================================
+
+class StatView:
+    """Read-only view over one stat block of a character.
+
+    Reads go straight to the character's current storage, so the view never
+    goes stale and nothing is copied. Dict fields (Skills) are read through a
+    read-only proxy. Use BaseCharacter.snapshot for values that must not change."""
+    __slots__ = ('_owner', '_slot')
+
+    def __init__(self, owner: 'BaseCharacter', slot: str):
+        object.__setattr__(self, '_owner', owner)
+        object.__setattr__(self, '_slot', slot)
+
+    def _target(self):
+        return getattr(self._owner, self._slot)
+
+    def __getattr__(self, name: str):
+        value = getattr(self._target(), name)
+        # Forks share the dict with their parent, see BaseCharacter.fork.
+        return MappingProxyType(value) if isinstance(value, dict) else value
+
+    def __setattr__(self, name: str, value: Any) -> NoReturn:
+        raise UnableToSetAttribute("%s is read-only" % self.__class__.__name__)
+
+    def __delattr__(self, name: str) -> NoReturn:
+        raise UnableToSetAttribute("%s is read-only" % self.__class__.__name__)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, StatView):
+            other = other._target()
+        try:
+            return _as_dict(self._target()) == _as_dict(other)
+        except AttributeError:
+            return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__, ", ".join(f"{key}={val!r}" for key, val in _as_dict(self._target()).items()))
+
+    def _asdict(self) -> dict:
+        """Copy of the field values."""
+        return _as_dict(self._target())
+
+
+class _ComputationalView(StatView):
+    """StatView that recomputes dirty fields before reading them."""
+    __slots__ = ()
+
+    def _target(self):
+        owner = self._owner
+        if owner._dirty:
+            owner._recompute_dirty()
+        return owner._comp_attribute
+
+
 class BaseCharacter:
     """Base class for character"""
     skill_enclosing_declose = '「 ', '」'
 
-    def __init__(self, char_attribute: Union[CharAttribute, FrozenCharAttribute], attribute: Union[Attribute, FrozenAttribute]):
-        if not isinstance(attribute, FrozenAttribute) and not isinstance(char_attribute, FrozenCharAttribute):
+    def __init__(self, char_attribute: Union[CharAttribute, FrozenCharAttribute], attribute: Union[Attribute, FrozenAttribute], trusted: bool = False):
+        """Pass trusted=True for stat blocks that were already validated, e.g. at load time."""
+        if not trusted and not isinstance(attribute, FrozenAttribute) and not isinstance(char_attribute, FrozenCharAttribute):
             isvalid = _is_valid_for_base_character(attribute, char_attribute)
             if not isvalid[0]:
                 if isvalid[1][0].Error_Reason == '' and isvalid[1][1].Error_Reason == '':
@@ -527,168 +1043,599 @@ class BaseCharacter:
                         raise Exception(e2)
                     elif e2 == "":
                         raise Exception(e1)
+        if isinstance(char_attribute.Race, str) and not isinstance(char_attribute, FrozenCharAttribute):
+            # One shared Race per struct id; names without a race file stay strings.
+            race = Race.intern(char_attribute.Race)
+            if race is not None:
+                char_attribute.Race = race
         self._name: str = char_attribute.Name
         self._char_attribute: Union[CharAttribute,
                                     FrozenCharAttribute] = char_attribute
         self._attribute: Union[Attribute, FrozenAttribute] = attribute
-        self._comp_attribute: Union[ComputationalAttribute, FrozenComputationalAttribute] = ComputationalAttribute(*[0]*14) if not isinstance(
+        self._comp_attribute: Union[ComputationalAttribute, FrozenComputationalAttribute] = _computational_for.get(type(attribute), ComputationalAttribute)(*[0]*14) if not isinstance(
             attribute, FrozenAttribute) and not isinstance(char_attribute, FrozenCharAttribute) else FrozenComputationalAttribute(*[0]*14)
         self._frozen = False
+        # ComputationalAttribute fields waiting for a recompute, see set_stat.
+        self._dirty: set[str] = set()
+        self._views: dict[str, StatView] = {}
+        self._snapshot: Optional[CharacterSnapshot] = None
+        # Copy-on-write state, see fork.
+        self._shared = False
+        self._parent: Optional[BaseCharacter] = None
+        self._base: Optional[dict[str, Any]] = None
         if isinstance(self._comp_attribute, FrozenComputationalAttribute):
             FrozenClassWarning.warn(2)
             self._frozen = True
         else:
             self.cls_calculate()
-        self._MaxEXP = max_exp(self._char_attribute.Level)
-        self._MaxMagicalEXP = max_exp(self._char_attribute.Magical_Level, 1)
+        self._exp_seed = _exp_seed(self._name)
+        self._MaxEXP = max_exp(self._char_attribute.Level, 0, self._exp_seed)
+        self._MaxMagicalEXP = max_exp(self._char_attribute.Magical_Level, 1, self._exp_seed)
         self._MaxSkillEXP = max_exp(
-            self._char_attribute.Magical_Skill_Level, 2)
+            self._char_attribute.Magical_Skill_Level, 2, self._exp_seed)
 
     def __repr__(self):
         return f"<{self.__class__.__name__}: {self._name} (Level {self._char_attribute.Level}){' (Frozen)' if self._frozen else ''}>"
 
-    def dump(self, **options) -> str:
-        """Dump the object into Yaml string. Dis-including Computational Attribute"""
-        obj = self._char_attribute.__dict__.copy()
-        obj.update(self._attribute.__dict__.copy())
-        # trying to ignore VSCode's Python 'errors'.
-        v = safe_dump(obj, **options)
-        if isinstance(v, str):
+    def dump(self, serializer: Union[str, Serializer] = None, **options) -> Union[str, bytes]:
+        """Dump the object into Yaml string. Dis-including Computational Attribute
+
+        serializer picks another backend of lib.serializer (e.g. "cyaml", "json",
+        "binary"), the process default is used otherwise. Options go to the backend."""
+        v = get_serializer(serializer).dumps(self._to_mapping(), **options)
+        if isinstance(v, (str, bytes)):
             return v
         raise Exception("Failed to dump object: %s" % v)
 
     def dump_to_jsonable(self) -> tuple[dict]:
         """This method dumps all attributes defined in self. it returns a list, containing dicts. This method should return 3 stuffs."""
-        a1 = self._attribute.__dict__.copy()
-        a2 = self._char_attribute.__dict__.copy()
-        a3 = self._comp_attribute.__dict__.copy()
+        a1 = _as_dict(self._attribute)
+        a2 = _char_attribute_dict(self._char_attribute)
+        if self._dirty:
+            self._recompute_dirty()
+        a3 = _as_dict(self._comp_attribute)
         return a1, a2, a3
 
     def cls_calculate(self) -> NoReturn:
+        """Recompute every ComputationalAttribute field.
+
+        The formulas are defined in lib/formula.yaml, see set_formulas."""
         if self._frozen:
             raise FrozenClassError(
                 "Either CharAttribute or Attribute are/is a Frozen instance(s).")
+        self._ensure_own()
+        _formulas.apply(self._attribute, self._comp_attribute)
+        self._dirty.clear()
+        self._snapshot = None
+
+    def _recompute_dirty(self):
+        """Recompute only the computed fields invalidated since the last read."""
+        self._ensure_own()
+        dirty = self._dirty
+        attribute, comp_attribute = self._attribute, self._comp_attribute
+        closures = _formulas.closures
+        for name in _formulas.fields:
+            if name in dirty:
+                setattr(comp_attribute, name, closures[name](
+                    attribute, comp_attribute))
+        dirty.clear()
 
-        """\ 
-        MaxHP    = ((Vit * 10) + (End * 3) + (Res * 2) + (Str * 1.4) / 15) * 10
-        MaxMP    = ((Sta * 30) + (Will * 10) + (Wis * 3) / 10) * 1.3
-        Crit%    = (((Str * 10) + (Sta * 5) + (Per * 1.2) + (Bra * 1.3) / 4) / 1.5) * 2 / 100 + (Luck / 3)
-        Evade%   = (((Agi * 40) + (Dex * 20)) / 50) / 100
-        Accura%  = N/A
-        SpdAcc   = ((Agi * 20) + (Dex * 10)) / 400
-        Atk      = ((Str * 60) + (Will * 1.5) + (Sta * 5)) / 59
-        Def      = (((Vit * 40) + (End * 4.6) + (Res * 2.4) + (Str * 3.4)) / 60) * 2
-        MagDef   = (MP + (Will * 10 + Wis * 2)) / 13
-        MagAtk   = (MP + (Will * 10 + Wis * 2) + (Sta * 1.004)) / 13
-        ResPTS   = N/A
-        UsageAce = N/A
-        Stamina  = Sta * 10
-        LeadPTS  = (((Bra * 10) + (Wis * 2) + (Will * 1.3)) / 12) * 1.2
+    @no_frozen
+    def set_stat(self, name: str, value: int):
+        """Set one Attribute stat, invalidating only the computed fields that read it.
+
+        They are recomputed on the next read of the computational attributes."""
+        dependents = _formulas.dependents.get(name)
+        if dependents is None:
+            raise AttributeError("%s is not an Attribute stat" % name)
+        self._ensure_own()
+        setattr(self._attribute, name, value)
+        self._dirty.update(dependents)
+        self._snapshot = None
+
+    def add_stat(self, name: str, amount: int):
+        """Raise (or, with a negative amount, lower) one Attribute stat. See set_stat."""
+        return self.set_stat(name, getattr(self._attribute, name) + amount)
+
+    def effective(self, *sources: Union[_AbstractFileStructure, Modifier], loadout: Iterable[str] = ()) -> EffectiveStats:
+        """Stats with the modifiers of a race, items, etc. applied.
+
+        The Attribute part of the combined modifier is applied before the
+        formulas run, the ComputationalAttribute part after them. Item ids
+        in loadout are combined once per loadout, see loadout_cache.
+
+            >>> character.effective(Race.loader("human"), *equipment)
+            >>> character.effective(loadout=("armor.head.debug_headplate",))
         """
-
-        self._comp_attribute.Max_HealthPoint = (((self._atribute.Vit*10) + (
-            self._atribute.End*3) + (self._atribute.Res*2) + (self._atribute.Str*1.4)) / 15) * 10
-        self._comp_attribute.Max_MagicalPoint = (
-            ((self._atribute.Sta*30) + (self._atribute.Will*10) + (self._atribute.Wis*3)) / 10) * 1.3
-        self._comp_attribute.Critical_Percentage = (((self._atribute.Str*10) + (self._atribute.Sta*5) + (
-            self._atribute.Per*1.2) + (self._atribute.Bra*1.3) / 4) / 1.5) * 2 / 100 + (self._atribute.Luck/3)
-        self._comp_attribute.Evade_Percentage = (
-            ((self._atribute.Agi*40) + (self._atribute.Dex*20)) / 50) / 100
-        self._comp_attribute.Accuracy = NotAvailable
-        self._comp_attribute.Speed_Acceleration = (
-            (self._atribute.Agi*20) + (self._atribute.Dex*10)) / 400
-        self._comp_attribute.Atk = (
-            (self._atribute.Str*60) + (self._atribute.Will*1.5) + (self._atribute.Sta*5)) / 59
-        self._comp_attribute.Def = (((self._atribute.Vit*40) + (self._atribute.End*4.6) + (
-            self._atribute.Res*2.4) + (self._atribute.Str*3.4)) / 60) * 2
-        self._comp_attribute.Magical_Def = (
-            self._comp_attribute.MP + (self._atribute.Will*10 + self._atribute.Wis*2)) / 13
-        self._comp_attribute.Magical_Atk = (self._comp_attribute.MP + (
-            self._atribute.Will*10 + self._atribute.Wis*2) + (self._atribute.Sta*1.004)) / 13
-        self._comp_attribute.Resistance_Point = NotAvailable
-        self._comp_attribute.Usage_Acceleration = NotAvailable
-        self._comp_attribute.Stamina_Point = self._atribute.Sta * 10
-        self._comp_attribute.Leadership_Point = (((self._attribute.Bra * 10) + (
-            self._attribute.Wis * 2) + (self._attribute.Will * 1.3)) / 12) * 1.2
+        modifiers = [source if isinstance(source, Modifier) else source.modifiers for source in sources]
+        if loadout:
+            modifiers.append(loadout_cache().get(loadout))
+        modifier = modifiers[0] if len(modifiers) == 1 else Modifier.sum(_stat_fields, modifiers)
+        attribute = modifier.apply(np.array(
+            [getattr(self._attribute, name) for name in _attribute_fields], dtype=np.float64))
+        computed = _formulas.kernel(dict(zip(_attribute_fields, attribute)))
+        computational = np.array([computed.get(name, np.nan)
+                                  for name in _computational_fields])
+        # A stat without a formula (NotAvailable) counts as 0 once something adds to it.
+        computational[np.isnan(computational) & (
+            modifier.add[len(_attribute_fields):] != 0)] = 0
+        computational = modifier.apply(computational, len(_attribute_fields))
+        return EffectiveStats(FrozenAttribute(*_with_maximum(attribute)),
+                              FrozenComputationalAttribute(*_with_maximum(computational)))
 
     @classmethod
-    def load(cls, filename: str):
-        """Load a file into a BaseCharacter object."""
-        fill_arg1 = ['Str', "Int", 'Con', "Agi", "Dex", "Wis", "Will", "Luck"]
-        fill_arg2 = ["Name", "Race", "Level", 'EXP', 'Age', 'Skills']
-        arg1 = {}
-        arg2 = {}
-        with open(filename) as file:
-            obj = safe_load(file)
-        for key, val in obj.items():
-            if key in fill_arg1:
-                arg1[key] = val
-            elif key in fill_arg2:
-                arg2[key] = val
-
-        # Special handle for 'Race' parameter
-        # Define 'string' get for all Races in Race's list
-        #raise NotImplementedError
+    def load(cls, filename: str, trusted: bool = False, serializer: Union[str, Serializer] = None):
+        """Load a file into a BaseCharacter object.
 
-        obj1 = CharAttribute(**arg2)
-        obj2 = Attribute(**arg1)
+        The serializer is guessed from the file content and extension when not given."""
+        with open(filename, "rb") as file:
+            data = file.read()
+        backend = _serializer_for(data, filename) if serializer is None else get_serializer(serializer)
+        obj = backend.loads(data if backend.binary else data.decode("utf8"))
+        return cls._from_mapping(obj, trusted)
 
-        if not _is_valid_for_base_character(obj2, obj1):
+    @classmethod
+    def _from_mapping(cls, obj: dict, trusted: bool = False) -> 'BaseCharacter':
+        """Build a character from the mapping written by dump."""
+        if not isinstance(obj, dict):
+            raise StaticTypingException(
+                "Expected a mapping of attributes, got %s" % type(obj).__name__)
+        try:
+            obj1 = CharAttribute(**{key: obj[key] for key in _char_attribute_fields if key in obj})
+            obj2 = Attribute(**{key: obj[key] for key in _attribute_fields if key in obj})
+        except TypeError as exc:
             raise StaticTypingException(
-                "Invalid attribute type. Perhaps you have put one of these attributes in wrong type. Check your Yaml object and try again.")
+                "Invalid attributes, %s. Check your Yaml object and try again." % exc) from None
+        return cls(obj1, obj2, trusted)
 
-        return cls(obj1, obj2)
+    def _to_mapping(self) -> dict:
+        """Character and base attributes in one mapping, as written by dump."""
+        obj = _char_attribute_dict(self._char_attribute)
+        obj.update(_as_dict(self._attribute))
+        return obj
+
+    @classmethod
+    def load_many(cls, filename: str, roster_format: str = None, skip_malformed: bool = False,
+                  report: 'LoadReport' = None, trusted: bool = False) -> Iterable['BaseCharacter']:
+        """Stream characters out of a roster file, one at a time.
+
+        A roster is either multi-document YAML (as written by dump_many) or
+        JSON Lines (.jsonl), only one record is held in memory at a time.
+        With skip_malformed, records that cannot be parsed or are not valid
+        characters are skipped and counted in report instead of raising."""
+        roster_format = _roster_format(filename, roster_format)
+        with open(filename) as file:
+            records = _yaml_documents(file) if roster_format == "yaml" else _json_lines(file)
+            for record in records:
+                try:
+                    character = cls._from_mapping(record(), trusted)
+                except Exception:
+                    if not skip_malformed:
+                        raise
+                    if report is not None:
+                        report.skipped += 1
+                    continue
+                if report is not None:
+                    report.loaded += 1
+                yield character
+
+    @staticmethod
+    def dump_many(characters: Iterable['BaseCharacter'], filename: str, roster_format: str = None) -> int:
+        """Stream characters into a roster file, see load_many. Returns how many were written."""
+        roster_format = _roster_format(filename, roster_format)
+        count = 0
+        with open(filename, "w") as file:
+            for character in characters:
+                if roster_format == "yaml":
+                    safe_dump(character._to_mapping(), file, explicit_start=True)
+                else:
+                    file.write(json_dumps(character._to_mapping(), separators=(",", ":")))
+                    file.write("\n")
+                count += 1
+        return count
 
     @property
-    def attribute(self):
-        """Get the attribute, in frozen!"""
-        return FrozenAttribute(**self._attribute.__dict__)
+    def attribute(self) -> 'StatView':
+        """Get the attribute, as a read-only view (no copy is made)."""
+        view = self._views.get('_attribute')
+        if view is None:
+            view = self._views['_attribute'] = StatView(self, '_attribute')
+        return view
 
     @property
-    def character_attribute(self):
-        """Get the character attribute, in frozen!"""
-        return FrozenCharAttribute(**self._character.__dict__)
+    def character_attribute(self) -> 'StatView':
+        """Get the character attribute, as a read-only view (no copy is made)."""
+        view = self._views.get('_char_attribute')
+        if view is None:
+            view = self._views['_char_attribute'] = StatView(
+                self, '_char_attribute')
+        return view
 
     @property
-    def computational(self):
-        """Get the computational attribute, in frozen!"""
-        return FrozenComputationalAttribute(**self._comp_attribute.__dict__)
+    def computational(self) -> 'StatView':
+        """Get the computational attribute, as a read-only view (no copy is made)."""
+        view = self._views.get('_comp_attribute')
+        if view is None:
+            view = self._views['_comp_attribute'] = _ComputationalView(
+                self, '_comp_attribute')
+        return view
+
+    def snapshot(self) -> CharacterSnapshot:
+        """Get all attributes, in frozen!
+
+        The snapshot is cached until level_up, when_exp_eq_mexp, grant_exp,
+        cls_calculate or set_stat changes the character."""
+        if self._snapshot is None:
+            if self._dirty:
+                self._recompute_dirty()
+            char_attribute = _as_dict(self._char_attribute)
+            char_attribute['Skills'] = char_attribute['Skills'].copy()
+            self._snapshot = CharacterSnapshot(FrozenAttribute(**_as_dict(self._attribute)),
+                                               FrozenCharAttribute(
+                                                   **char_attribute),
+                                               FrozenComputationalAttribute(**_as_dict(self._comp_attribute)))
+        return self._snapshot
+
+    def fork(self) -> 'BaseCharacter':
+        """Copy-on-write child for what-if branches.
+
+        The child shares this character's stat blocks until either of them
+        changes; the one that writes first copies them. Changes of the child
+        are seen with diff() and taken over by this character with commit(),
+        or dropped with discard().
+
+            >>> preview = character.fork()
+            >>> preview.grant_exp(500)
+            >>> preview.diff()
+            {'Level': (3, 4), 'EXP': (20, 70), 'Str': (9, 11), ...}
+        """
+        if self._dirty:
+            self._recompute_dirty()
+        child = object.__new__(self.__class__)
+        child.__dict__.update(self.__dict__)
+        child._dirty = set()
+        child._views = {}
+        child._parent = self
+        child._base = {name: self.__dict__[name] for name in _fork_state}
+        child._shared = self._shared = True
+        return child
+
+    def _ensure_own(self):
+        """Copy shared stat blocks before the first write to them, see fork."""
+        if not self._shared:
+            return
+        self._attribute = copy(self._attribute)
+        self._comp_attribute = copy(self._comp_attribute)
+        char_attribute = self._char_attribute = copy(self._char_attribute)
+        char_attribute.Skills = dict(char_attribute.Skills)
+        self._shared = False
+
+    def diff(self) -> dict[str, tuple[Any, Any]]:
+        """Fields changed since the fork, as {name: (at the fork, now)}. Free while nothing was written."""
+        if self._base is None:
+            raise ValueError("%r is not a fork" % self)
+        changes = {}
+        for slot in _fork_blocks:
+            before, after = self._base[slot], self.__dict__[slot]
+            if before is after:
+                continue
+            if slot == '_comp_attribute' and self._dirty:
+                self._recompute_dirty()
+            before, after = _as_dict(before), _as_dict(after)
+            changes.update((name, (val, after[name])) for name, val in before.items() if after[name] != val)
+        return changes
+
+    def commit(self):
+        """Make the parent take over this fork's state. The fork stays usable, its diff starts over.
+
+        Raises ForkConflictError if the parent changed since the fork."""
+        parent, base = self._parent, self._base
+        if parent is None:
+            raise ValueError("%r is not a fork" % self)
+        if any(parent.__dict__[slot] is not base[slot] for slot in _fork_blocks):
+            raise ForkConflictError("%r changed since it was forked" % parent)
+        if self._dirty:
+            self._recompute_dirty()
+        state = {name: self.__dict__[name] for name in _fork_state}
+        parent.__dict__.update(state)
+        parent._dirty.clear()
+        parent._snapshot = self._snapshot
+        parent._shared = self._shared = True
+        self._base = state
+
+    def discard(self):
+        """Drop every change since the fork (or the last commit)."""
+        if self._base is None:
+            raise ValueError("%r is not a fork" % self)
+        self.__dict__.update(self._base)
+        self._dirty.clear()
+        self._snapshot = None
+        self._shared = True
 
     @no_frozen
     def level_up(self):
+        self._ensure_own()
         self._char_attribute.Level += 1
         self._char_attribute.EXP = 0
-        base_attr_name = ("Vit", "Str", "Sta", "Res", "Wis",
-                          "Will", "End", "Dex", 'Agi', 'Int', "Per")
-        for name in base_attr_name:
+        for name, gain in zip(_level_up_attributes, get_stream().randint_many(1, 5, len(_level_up_attributes)).tolist()):
             setattr(self._attribute, name,
-                    self._attribute[name] + randint(1, 5))
+                    getattr(self._attribute, name) + gain)
 
-        self._MaxEXP = max_exp(self._char_attribute.Level)
+        self._MaxEXP = max_exp(self._char_attribute.Level, 0, self._exp_seed)
         self.cls_calculate()
-    
+
     @no_frozen
     def when_exp_eq_mexp(self):
-        while self._char_attribute.EXP >= self._MaxEXP:
-            self._char_attribute.Level += 1
-            self._char_attribute.EXP -= self._MaxEXP
-            base_attr_name = ("Vit", "Str", "Sta", "Res", "Wis",
-                          "Will", "End", "Dex", 'Agi', 'Int', "Per")
-            for name in base_attr_name:
-                setattr(self._attribute, name,
-                    self._attribute[name] + randint(1, 5))
-
-            self._MaxEXP = max_exp(self._char_attribute.Level)
-            self.cls_calculate()
+        """Level up for as long as EXP reaches MaxEXP."""
+        self.grant_exp(0)
+
+    @no_frozen
+    def grant_exp(self, amount: int, breakdown: bool = False) -> Union[int, list[LevelUpRecord]]:
+        """Add EXP and take every level it crosses in one step.
+
+        The final level is found against a precomputed EXP curve, the attribute
+        gains of all crossed levels are drawn at once and cls_calculate runs once.
+        Returns the number of levels gained, or a LevelUpRecord per level if
+        breakdown is True."""
+        self._ensure_own()
+        char_attribute = self._char_attribute
+        self._snapshot = None
+        gained, char_attribute.EXP, costs = _exp_curves[0].resolve(
+            char_attribute.Level, char_attribute.EXP + amount, self._exp_seed)
+        if gained == 0:
+            return [] if breakdown else 0
+        gains = get_stream().randint_many(1, 5, (gained, len(_level_up_attributes)))
+        for name, gain in zip(_level_up_attributes, gains.sum(axis=0).tolist()):
+            setattr(self._attribute, name,
+                    getattr(self._attribute, name) + gain)
+        level = char_attribute.Level
+        char_attribute.Level += gained
+        self._MaxEXP = max_exp(char_attribute.Level, 0, self._exp_seed)
+        self.cls_calculate()
+        if not breakdown:
+            return gained
+        return [LevelUpRecord(level + index + 1, cost, dict(zip(_level_up_attributes, row)))
+                for index, (cost, row) in enumerate(zip(costs.tolist(), gains.tolist()))]
+
+
+class CharacterPool:
+    """Column store for many characters at once.
+
+    The 13 Attribute stats are kept as NumPy columns (one row per stat, one
+    column per character) and every formula of cls_calculate is evaluated
+    as a batched array operation.
+
+        >>> pool = CharacterPool(characters)
+        >>> pool.column("Str")[:] += 1
+        >>> pool.calculate()
+        >>> pool.store()  # write stats back to the BaseCharacter objects
+    """
+
+    def __init__(self, characters: Iterable['BaseCharacter'] = ()):
+        self._characters: list[BaseCharacter] = []
+        self._attributes = np.zeros((len(_attribute_fields), 0), dtype=np.int64)
+        self._computational: dict[str, np.ndarray] = {}
+        self.extend(characters)
+
+    def __len__(self):
+        return len(self._characters)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self)} characters>"
+
+    @property
+    def characters(self) -> tuple['BaseCharacter']:
+        """Characters held by this pool, in column order."""
+        return tuple(self._characters)
+
+    def extend(self, characters: Iterable['BaseCharacter']):
+        """Move characters into the pool, copying their Attribute into the columns."""
+        characters = list(characters)
+        for character in characters:
+            if character._frozen:
+                raise FrozenClassError(
+                    "Cannot add %r to a pool, it is frozen." % character)
+        columns = np.array([[getattr(character._attribute, name) for name in _attribute_fields]
+                            for character in characters], dtype=np.int64).reshape(len(characters), len(_attribute_fields))
+        self._attributes = np.concatenate((self._attributes, columns.T), axis=1)
+        self._characters.extend(characters)
+        self._computational = {}
+
+    def append(self, character: 'BaseCharacter'):
+        """Move one character into the pool."""
+        self.extend((character,))
+
+    def column(self, name: str) -> np.ndarray:
+        """Writable view over one Attribute column."""
+        return self._attributes[_attribute_fields.index(name)]
+
+    def calculate(self) -> dict[str, np.ndarray]:
+        """Evaluate every computational formula over the whole pool."""
+        self._computational = _formulas.kernel(
+            dict(zip(_attribute_fields, self._attributes)))
+        return self._computational
+
+    def computational(self, name: str) -> np.ndarray:
+        """Computed column from the last calculate(), calculating if needed."""
+        if not self._computational:
+            self.calculate()
+        return self._computational[name]
+
+    def store(self):
+        """Move the pool back into its BaseCharacter objects.
+
+        Attribute columns are written first, then the computed columns; fields
+        the formulas do not cover are set to NotAvailable, as cls_calculate does."""
+        if not self._computational:
+            self.calculate()
+        attributes = dict(zip(_attribute_fields, self._attributes.tolist()))
+        computational = {key: val.tolist()
+                         for key, val in self._computational.items()}
+        for index, character in enumerate(self._characters):
+            character._ensure_own()
+            attribute = character._attribute
+            comp_attribute = character._comp_attribute
+            for name, column in attributes.items():
+                setattr(attribute, name, column[index])
+            for name in _computational_fields:
+                column = computational.get(name)
+                setattr(comp_attribute, name,
+                        NotAvailable if column is None else column[index])
+            character._dirty.clear()
+            character._snapshot = None
+
+    def effective(self, loadouts: Iterable[Iterable[str]]) -> dict[str, np.ndarray]:
+        """Every stat with one item loadout per character applied, as float64 columns.
+
+        Like BaseCharacter.effective, for the whole pool: each distinct loadout
+        is combined once (see loadout_cache), the formulas run once over every
+        column. Infinite values stay inf, stats without a formula are NaN."""
+        loadouts = list(loadouts)
+        if len(loadouts) != len(self._characters):
+            raise ValueError("Expected %s loadouts, got %s" % (len(self._characters), len(loadouts)))
+        cache = loadout_cache()
+        add = np.empty((len(_stat_fields), len(loadouts)))
+        mul = np.empty_like(add)
+        groups: dict[tuple[str], list[int]] = {}
+        for index, item_ids in enumerate(loadouts):
+            groups.setdefault(cache.key(item_ids), []).append(index)
+        for key, indices in groups.items():
+            modifier = cache.get(key)
+            add[:, indices] = modifier.add[:, None]
+            mul[:, indices] = modifier.mul[:, None]
+        split = len(_attribute_fields)
+        attribute = modify(self._attributes, add[:split], mul[:split])
+        computed = _formulas.kernel(dict(zip(_attribute_fields, attribute)))
+        not_available = np.full(len(loadouts), np.nan)
+        computational = np.array([computed.get(name, not_available) for name in _computational_fields],
+                                 dtype=np.float64).reshape(len(_computational_fields), len(loadouts))
+        # As in BaseCharacter.effective, a stat without a formula counts as 0 once something adds to it.
+        computational[np.isnan(computational) & (add[split:] != 0)] = 0
+        computational = modify(computational, add[split:], mul[split:])
+        return dict(zip(_stat_fields, np.concatenate((attribute, computational))))
+
+
+def write_snapshot(population: Union[CharacterPool, Iterable[BaseCharacter]], folder: str) -> int:
+    """Write a population as a columnar snapshot, see lib.snapshot. Returns the row count.
+
+    Every stat becomes one typed column: Attribute and the integer fields of
+    CharAttribute as int64, ComputationalAttribute as float64 (NotAvailable
+    as NaN). Name and Race go to the string table, Skills and Gender as JSON.
+    A CharacterPool is written straight from its columns."""
+    if isinstance(population, CharacterPool):
+        characters = population._characters
+        columns = dict(zip(_attribute_fields, population._attributes))
+        # Columns may have been edited since the last calculate().
+        computational = population.calculate()
+        for name in _computational_fields:
+            column = computational.get(name)
+            columns[name] = np.full(len(characters), np.nan) if column is None else np.asarray(column, dtype=np.float64)
+    else:
+        characters = list(population)
+        for character in characters:
+            if character._dirty:
+                character._recompute_dirty()
+        attributes = np.array([[getattr(character._attribute, name) for name in _attribute_fields]
+                               for character in characters], dtype=np.int64).reshape(len(characters), len(_attribute_fields))
+        computational = np.array([[_packed_value(getattr(character._comp_attribute, name)) for name in _computational_fields]
+                                  for character in characters], dtype=np.float64).reshape(len(characters), len(_computational_fields))
+        columns = dict(zip(_attribute_fields, attributes.T))
+        columns.update(zip(_computational_fields, computational.T))
+    char_attributes = [character._char_attribute for character in characters]
+    for name in _char_attribute_fields:
+        if name not in _snapshot_strings and name not in _snapshot_documents:
+            columns[name] = np.fromiter((getattr(char_attribute, name) for char_attribute in char_attributes),
+                                        dtype=np.int64, count=len(characters))
+    return _write_snapshot(folder, len(characters), columns,
+                           {name: [_struct_id_of(getattr(char_attribute, name)) for char_attribute in char_attributes]
+                            for name in _snapshot_strings},
+                           {name: [getattr(char_attribute, name) for char_attribute in char_attributes]
+                            for name in _snapshot_documents})
+
+
+def _roster_format(filename: str, roster_format: Optional[str] = None) -> str:
+    """The roster format asked for, checked, or the one of the file extension."""
+    if roster_format is not None:
+        if roster_format not in ("yaml", "jsonl"):
+            raise ValueError("Unknown roster format %r, expected 'yaml' or 'jsonl'" % roster_format)
+        return roster_format
+    if filename.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if filename.endswith((".yaml", ".yml")):
+        return "yaml"
+    raise ValueError("Cannot tell the roster format of %s, pass roster_format='yaml' or 'jsonl'" % filename)
+
+
+def _yaml_documents(file: IO) -> Iterable[Callable[[], Any]]:
+    """Split a multi-document YAML stream, yielding a parser per document.
+
+    Documents are parsed separately, so a broken one does not end the stream."""
+    lines = []
+    for line in file:
+        if line.startswith(("---", "...")) and (len(line) == 3 or line[3] in " \t\r\n"):
+            if any(not text.isspace() and not text.lstrip().startswith('#') for text in lines):
+                yield partial(safe_load, "".join(lines))
+            lines = [line[3:]] if line.startswith("---") else []
+        else:
+            lines.append(line)
+    if any(not text.isspace() and not text.lstrip().startswith('#') for text in lines):
+        yield partial(safe_load, "".join(lines))
+
+
+def _json_lines(file: IO) -> Iterable[Callable[[], Any]]:
+    for line in file:
+        if line.strip():
+            yield partial(json_loads, line)
+
+
+def _struct_id_of(value: Any) -> Any:
+    return value.struct_id if isinstance(value, _AbstractFileStructure) else value
+
+
+def _with_maximum(values: np.ndarray) -> list:
+    """Plain values for a modified stat vector: inf as Max, -inf as 0, NaN as NotAvailable."""
+    return [Max if val == inf else 0 if val == -inf else NotAvailable if val != val else val
+            for val in values.tolist()]
 
 
 # Instance initializations?
 
+_attribute_fields = tuple(field.name for field in fields(Attribute))
+_computational_fields = tuple(field.name for field in fields(ComputationalAttribute))
+_char_attribute_fields = tuple(field.name for field in fields(CharAttribute))
+_stat_fields = _attribute_fields + _computational_fields
+# What a fork shares with its parent, and what discard and commit move around.
+_fork_blocks = ('_attribute', '_char_attribute', '_comp_attribute')
+_fork_state = _fork_blocks + ('_MaxEXP', '_MaxMagicalEXP', '_MaxSkillEXP')
+
+_computational_for = {
+    SlottedAttribute: SlottedComputationalAttribute,
+    PackedAttribute: PackedComputationalAttribute,
+}
+
+_snapshot_strings = ("Name", "Race")
+_snapshot_documents = ("Skills", "Gender")
+
+_formulas: FormulaSet = None
+_level_up_attributes = ("Vit", "Str", "Sta", "Res", "Wis",
+                        "Will", "End", "Dex", 'Agi', 'Int', "Per")
+
 
 NotAvailable = NotAvailable()
+set_formulas(formula_file)
+
+_instrumentation = Instrumentation()
+for _name in ("max_exp", "_AFS_loader", "validate_many", "_is_valid_attribute", "_is_valid_comp_attribute",
+              "_is_valid_char_attribute", "_is_valid_everything", "_is_valid_for_base_character"):
+    _instrumentation.register(sys.modules[__name__], _name, _name)
+for _name in ("cls_calculate", "level_up", "when_exp_eq_mexp", "grant_exp"):
+    _instrumentation.register(BaseCharacter, _name)
+_instrumentation.register(RandomStream, "randint_many")
+del _name
 
 __all__ = [
-    "ValidationReturn", "AbstractTypedValue", "Integer", "String", "setDebug", "Race", "Item", "Magic",
-    "Skill", "Attribute", "ComputationalAttribute", "CharAttribute", "FrozenComputationalAttribute",
-    "FrozenAttribute", "FrozenCharAttribute", "BaseCharacter", "NotAvailable"
+    "ValidationReturn", "LevelUpRecord", "AbstractTypedValue", "Integer", "String", "setDebug", "level_for_exp", "setInstrumentation", "stats", "profile", "CallStats", "validate_many", "use_pack", "item_index", "loadout_cache", "LoadoutStats", "Race", "Item", "Magic",
+    "Skill", "set_formulas", "Attribute", "ComputationalAttribute", "CharAttribute", "FrozenComputationalAttribute",
+    "FrozenAttribute", "FrozenCharAttribute", "SlottedAttribute", "SlottedComputationalAttribute",
+    "SlottedCharAttribute", "PackedAttribute", "PackedComputationalAttribute", "BaseCharacter", "CharacterPool", "write_snapshot", "Snapshot", "EffectiveStats", "StatView", "CharacterSnapshot", "LoadReport", "NotAvailable"
 ]
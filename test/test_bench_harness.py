@@ -0,0 +1,51 @@
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+import json
+import unittest
+from tempfile import TemporaryDirectory
+
+from bench import harness
+
+
+class HarnessTest(unittest.TestCase):
+    def test_run(self):
+        results = harness.run(["randint", "validate", "dump"], (1, 20_000), repeat=1)
+        self.assertEqual(sorted(results), ["dump@1", "randint@1", "randint@20000", "validate@1", "validate@20000"])
+        for result in results.values():
+            self.assertGreater(result["seconds"], 0)
+            self.assertGreaterEqual(result["peak_bytes"], 0)
+
+    def test_leaves_global_state_alone(self):
+        import status
+        from lib.internal import get_stream
+        stream, folder = get_stream(), status.structure_folder
+        harness.main(["--cases", "load,max_exp", "--sizes", "1", "--repeat", "1"])
+        self.assertIs(get_stream(), stream)
+        self.assertEqual(status.structure_folder, folder)
+
+    def test_compare(self):
+        baseline = {"a@1": {"per_item": 1.0, "peak_bytes": 100},
+                    "b@1": {"per_item": 1.0, "peak_bytes": 100}}
+        results = {"a@1": {"per_item": 1.2, "peak_bytes": 100},
+                   "b@1": {"per_item": 1.0, "peak_bytes": 200},
+                   "c@1": {"per_item": 9.0, "peak_bytes": 900}}
+        regressions = harness.compare(results, baseline, 0.25)
+        self.assertEqual([(r.key, r.metric) for r in regressions], [("b@1", "peak_bytes")])
+        self.assertEqual(len(harness.compare(results, baseline, 0.1, memory_threshold=1.0)), 1)
+
+    def test_main_fails_on_regression(self):
+        with TemporaryDirectory() as folder:
+            baseline = f"{folder}/baseline.json"
+            self.assertEqual(harness.main(["--cases", "max_exp", "--sizes", "10", "--repeat", "1", "--save", baseline]), 0)
+            with open(baseline) as f:
+                data = json.load(f)
+            data["results"]["max_exp@10"]["per_item"] /= 100
+            with open(baseline, "w") as f:
+                json.dump(data, f)
+            self.assertEqual(harness.main(["--cases", "max_exp", "--sizes", "10", "--repeat", "1", "--compare", baseline]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
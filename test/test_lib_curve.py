@@ -0,0 +1,63 @@
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+import unittest
+from lib.curve import ExpCurve
+
+class ExpCurveTest(unittest.TestCase):
+    def setUp(self):
+        self.curve = ExpCurve(lambda levels: (levels*46)*levels, 30, name="normal")
+        self.capped = ExpCurve(lambda levels: (levels*200*17)*levels, 100,
+                               lambda levels: (levels == 5) | (levels >= 10), "magical")
+
+    def test_base(self):
+        self.assertEqual(self.curve.base(1), 0)
+        self.assertEqual(self.curve.base(4), 46 + 46*4 + 46*9)
+
+    def test_jitter_is_stable(self):
+        jitter = self.curve.jitter_for(1234)
+        self.assertTrue(0 <= jitter <= 30)
+        self.assertEqual(self.curve.cost(7, 1234), 46*49 + jitter)
+        self.assertEqual(self.curve.cost(7, 1234), self.curve.cost(7, 1234))
+        self.assertEqual(self.curve.total(4, 1234), self.curve.base(4) + 3 * jitter)
+
+    def test_resolve_matches_loop(self):
+        gained, left, costs = self.curve.resolve(1, 100000, 3)
+        level, exp = 1, 100000
+        while exp >= self.curve.cost(level, 3):
+            exp -= self.curve.cost(level, 3)
+            level += 1
+        self.assertEqual((gained, left), (level - 1, exp))
+        self.assertEqual(costs.tolist(), [self.curve.cost(index, 3) for index in range(1, level)])
+
+    def test_level_for(self):
+        for seed in (0, 5, 99):
+            for level in (1, 2, 50, 3000):
+                total = self.curve.total(level, seed)
+                self.assertEqual(self.curve.level_for(total, seed), (level, 0))
+                if level > 1:
+                    self.assertEqual(self.curve.level_for(total - 1, seed)[0], level - 1)
+        level, left = self.curve.level_for(3_200_000)
+        self.assertTrue(self.curve.total(level) <= 3_200_000 < self.curve.total(level + 1))
+        self.assertEqual(left, 3_200_000 - self.curve.total(level))
+        with self.assertRaises(ValueError):
+            self.curve.level_for(-1)
+
+    def test_cap(self):
+        self.assertIsNone(self.capped.cost(5))
+        self.assertIsNone(self.capped.cost(12))
+        self.assertIsNotNone(self.capped.cost(7))
+        gained, left, costs = self.capped.resolve(1, 10**9, 8)
+        self.assertEqual(gained, 4)
+        self.assertEqual(left, 10**9 - self.capped.total(5, 8))
+        self.assertEqual(self.capped.resolve(5, 10**9)[:2], (0, 10**9))
+        self.assertEqual(self.capped.level_for(10**12)[0], 5)
+        with self.assertRaises(ValueError):
+            self.capped.base(6)
+
+    def test_resolve_nothing(self):
+        self.assertEqual(self.curve.resolve(3, 10)[:2], (0, 10))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+import unittest
+from types import SimpleNamespace
+import numpy as np
+from lib.formula import FormulaError, compile_formulas
+
+INPUTS = ("Str", "Sta")
+FORMULAS = {
+    "MP": "Sta * 30 / 10",
+    "MagAtk": "(MP + Str) / 2",
+    "Acc": "N/A",
+}
+
+class FormulaTest(unittest.TestCase):
+    def test_order_and_dependents(self):
+        formulas = compile_formulas({"MagAtk": FORMULAS["MagAtk"], "MP": FORMULAS["MP"]}, INPUTS)
+        self.assertEqual(formulas.fields, ("MP", "MagAtk"))
+        self.assertEqual(formulas.dependents, {"Str": ("MagAtk",), "Sta": ("MP", "MagAtk")})
+
+    def test_scalar(self):
+        formulas = compile_formulas(FORMULAS, INPUTS, "n/a")
+        a, c = SimpleNamespace(Str=4, Sta=2), SimpleNamespace()
+        formulas.apply(a, c)
+        self.assertEqual(vars(c), {"MP": 6.0, "MagAtk": 5.0, "Acc": "n/a"})
+        self.assertEqual(formulas.closures["MagAtk"](a, c), 5.0)
+
+    def test_kernel(self):
+        formulas = compile_formulas(FORMULAS, INPUTS)
+        columns = formulas.kernel({"Str": np.array([4, 0]), "Sta": np.array([2, 10])})
+        self.assertEqual(sorted(columns), ["MP", "MagAtk"])
+        self.assertEqual(columns["MagAtk"].tolist(), [5.0, 15.0])
+
+    def test_constant_kernel(self):
+        formulas = compile_formulas({"One": "1", "Two": "One * 2", "MP": "Sta * 3"}, INPUTS)
+        columns = formulas.kernel({"Str": np.array([4, 0, 1]), "Sta": np.array([2, 10, 1])})
+        self.assertEqual(columns["One"].tolist(), [1, 1, 1])
+        self.assertEqual(columns["Two"].tolist(), [2, 2, 2])
+        self.assertEqual(formulas.kernel({"Str": 4, "Sta": 2})["One"], 1)
+
+    def test_cached(self):
+        self.assertIs(compile_formulas(FORMULAS, INPUTS), compile_formulas(dict(FORMULAS), INPUTS))
+
+    def test_errors(self):
+        for formulas in ({"MP": "Cha * 2"}, {"MP": "__import__('os')"}, {"MP": "MP + 1"},
+                         {"MP": "Sta +"}, {"MP": "Acc", "Acc": "N/A"}, {"MP": "'a' * 3"}):
+            with self.assertRaises(FormulaError):
+                compile_formulas(formulas, INPUTS)
+
+if __name__ == '__main__':
+    unittest.main()
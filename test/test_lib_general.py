@@ -3,7 +3,7 @@ from os.path import realpath
 path.insert(0, realpath(f"{__file__}/../../"))
 
 import unittest
-from lib.general import Switch, default, Call
+from lib.general import Switch, default, Call, DuplicationError, SwitchCaseError
 
 class MainTest(unittest.TestCase):
     def setUp(self):
@@ -23,5 +23,38 @@ class MainTest(unittest.TestCase):
     def test_switch_not_found(self):
         self.n.do('bar')
 
+    def test_switch_jump_table(self):
+        calls = []
+        switch = Switch({
+            'call': Call(calls.append, 1),
+            'func': lambda: 'func',
+            'const': 42,
+            0: 'zero',
+            default: 'default',
+        })
+        self.assertEqual(switch.do('call'), None)
+        self.assertEqual(calls, [1])
+        self.assertEqual(switch.do_many(['func', 'const', 0, 0.0, default]), ['func', 42, 'zero', 'zero', 'default'])
+        self.assertEqual(switch.do(), 'default')
+        with self.assertRaises(SwitchCaseError):
+            switch.do_many(['const', 'missing'])
+        with self.assertRaises(SwitchCaseError):
+            switch.do(['unhashable'])
+
+    def test_switch_errors_from_cases(self):
+        def broken():
+            raise KeyError('inside')
+        switch = Switch({'broken': broken})
+        with self.assertRaises(KeyError) as raised:
+            switch.do('broken')
+        self.assertEqual(raised.exception.args, ('inside',))
+
+    def test_switch_unhashable(self):
+        switch = Switch([([1, 2], 'list'), ({'a': 1}, lambda: 'dict'), ('key', 'str')])
+        self.assertEqual(len(switch), 3)
+        self.assertEqual(switch.do_many([[1, 2], {'a': 1}, 'key']), ['list', 'dict', 'str'])
+        with self.assertRaises(DuplicationError):
+            Switch([(default, 1), (default, 2)])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,36 @@
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+import unittest
+from lib.htf import Template, compile_template, format
+
+
+class TemplateTest(unittest.TestCase):
+    def test_format(self):
+        self.assertEqual(format("$[val]", val="Hello, World!"), "Hello, World!")
+        self.assertEqual(format("$[a]-$[b]-$[a]", a=1, b="x"), "1-x-1")
+        self.assertEqual(format("100% $[a] $[missing] $[", a="sure"), "100% sure $[missing] $[")
+        self.assertIs(compile_template("$[a]"), compile_template("$[a]"))
+
+    def test_segments(self):
+        template = Template("Name: $[Name], Str $[Str]%")
+        self.assertEqual(template.segments, ("Name: ", ("Name",), ", Str ", ("Str",), "%"))
+        self.assertEqual(template.keys, ("Name", "Str"))
+        self.assertEqual(template.render({"Name": "A"}, Str=3), "Name: A, Str 3%")
+
+    def test_render_many(self):
+        template = Template("$[Name] $[Str] $[Atk]")
+        records = [({"Str": 1}, {"Name": "A"}, {"Atk": 2.5}), {"Name": "B", "Str": 2}]
+        self.assertEqual(template.render_many(records), ["A 1 2.5", "B 2 $[Atk]"])
+
+    def test_keys_with_parentheses(self):
+        self.assertEqual(format("$[a)] x", **{"a)": "V"}), "V x")
+        self.assertEqual(format("100% $[(b] $[c]", **{"(b": 1}), "100% 1 $[c]")
+        template = Template("$[f(x)] / $[a]")
+        self.assertEqual(template.render_many([{"f(x)": 2, "a": (1, 2)}, {}]), ["2 / (1, 2)", "$[f(x)] / $[a]"])
+        self.assertEqual(Template("$[a]").render(a=(1, 2)), "(1, 2)")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+import os
+import unittest
+from math import inf
+from tempfile import TemporaryDirectory
+
+from lib.index import StructureIndex
+from lib.registry import StructureRegistry
+
+_item = """ItemHeader:
+  Type: %(type)s
+  Wear_at: %(wear)s
+Item:
+  Name: %(name)s
+  Buff:
+    %(buff)s
+  Debuff:
+    Agi: 1%%
+"""
+
+
+class StructureIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = TemporaryDirectory()
+        self.root = self.folder.name
+        self.write("armor/head/plate", type="Armor", wear="BodyArmor(0)", buff="Atk: '@const:infinity'")
+        self.write("armor/head/cap", type="Armor", wear="BodyArmor(0)", buff="Luck: 42%")
+        self.write("armor/chest/mail", type="Armor", wear="BodyArmor(1)", buff="Luck: 5%")
+        self.write("weapons/sword", type="Weapon", wear="Hand(0)", buff="Atk: 12")
+        os.makedirs(f"{self.root}/races")
+        with open(f"{self.root}/races/human", "w") as f:
+            f.write("Race:\n  Name: Human\n")
+        self.index = StructureIndex(StructureRegistry(self.root))
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def write(self, relpath, mtime=None, **fields):
+        os.makedirs(os.path.dirname(f"{self.root}/items/{relpath}"), exist_ok=True)
+        with open(f"{self.root}/items/{relpath}", "w") as f:
+            f.write(_item % dict(fields, name=relpath))
+        if mtime is not None:
+            os.utime(f"{self.root}/items/{relpath}", ns=(mtime, mtime))
+
+    def test_queries(self):
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(self.index.query(under="armor.head", buff="Luck"), ["armor.head.cap"])
+        self.assertEqual(self.index.query(wear_at="BodyArmor", minimum={"Atk": inf}), ["armor.head.plate"])
+        self.assertEqual(self.index.query(type="Armor", wear_at="BodyArmor(1)"), ["armor.chest.mail"])
+        self.assertEqual(self.index.query(minimum={"Luck%": 5}, maximum={"Luck%": 42}),
+                         ["armor.chest.mail", "armor.head.cap"])
+        self.assertEqual(self.index.query(minimum={"Atk": 1}, maximum={"Atk": 100}), ["weapons.sword"])
+        self.assertEqual(len(self.index.query(debuff="Agi", maximum={"Agi%": -1})), 4)
+        self.assertEqual(self.index.query(type="Armor", buff=["Atk", "Luck"]), [])
+        self.assertEqual(self.index.query(type="Shield"), [])
+        self.assertEqual(self.index.terms("type"), ["Armor", "Weapon"])
+
+    def test_refresh(self):
+        self.write("armor/head/cap", mtime=1, type="Armor", wear="BodyArmor(0)", buff="Luck: 7%")
+        self.write("weapons/bow", type="Weapon", wear="Hand(1)", buff="Dex: 3")
+        os.remove(f"{self.root}/items/armor/chest/mail")
+        stats = self.index.refresh()
+        self.assertEqual((stats.added, stats.updated, stats.removed, stats.entries), (1, 1, 1, 4))
+        self.assertEqual(self.index.query(minimum={"Luck%": 1}), ["armor.head.cap"])
+        self.assertEqual(self.index.query(buff="Dex"), ["weapons.bow"])
+        self.assertEqual(self.index.query(wear_at="BodyArmor(1)"), [])
+        self.assertEqual(self.index.refresh()[2:], (0, 0, 0))
+
+    def test_add_remove(self):
+        index = StructureIndex()
+        index.add("a", {"ItemHeader": {"Type": "Armor"}, "Item": {"Buff": {"Str": 1}}})
+        index.add("a", {"ItemHeader": {"Type": "Armor"}, "Item": {"Buff": {"Str": 2}}})
+        self.assertEqual(index.query(minimum={"Str": 2}), ["a"])
+        index.remove("a")
+        self.assertEqual((len(index), index.stats().terms, index._ranges), (0, 0, {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+import unittest
+from types import SimpleNamespace
+from lib.instrument import Instrumentation
+
+
+class Target:
+    def method(self, value):
+        return value * 2
+
+    @classmethod
+    def build(cls):
+        return cls()
+
+    def fail(self):
+        raise KeyError("fail")
+
+
+class InstrumentationTest(unittest.TestCase):
+    def setUp(self):
+        self.module = SimpleNamespace(__name__="module", outer=None, inner=lambda: 1)
+        self.module.outer = lambda: self.module.inner() + self.module.inner()
+        self.instruments = Instrumentation()
+        self.instruments.register(self.module, "outer")
+        self.instruments.register(self.module, "inner")
+        for name in ("method", "build", "fail"):
+            self.instruments.register(Target, name)
+        self.original = Target.__dict__["method"], Target.__dict__["build"], self.module.inner
+
+    def tearDown(self):
+        self.instruments.disable()
+
+    def test_disabled_is_original(self):
+        self.module.outer()
+        self.assertEqual(self.instruments.stats(), {})
+        self.instruments.enable()
+        self.assertIsNot(self.module.inner, self.original[2])
+        self.instruments.disable()
+        self.assertEqual((Target.__dict__["method"], Target.__dict__["build"], self.module.inner), self.original)
+
+    def test_counts_and_self_time(self):
+        self.instruments.enable()
+        self.assertEqual(self.module.outer(), 2)
+        self.assertEqual(Target().method(2), 4)
+        self.assertIsInstance(Target.build(), Target)
+        with self.assertRaises(KeyError):
+            Target().fail()
+        stats = self.instruments.stats()
+        self.assertEqual(stats["module.inner"].calls, 2)
+        self.assertEqual(stats["Target.fail"].errors, 1)
+        self.assertEqual(stats["Target.build"].calls, 1)
+        outer = stats["module.outer"]
+        self.assertAlmostEqual(outer.self_time, outer.total - stats["module.inner"].total, places=9)
+        self.assertEqual(sum(count for _, count in stats["module.inner"].histogram), 2)
+        self.assertIn("module.outer", self.instruments.profile())
+        self.instruments.reset()
+        self.assertEqual(self.instruments.stats(), {})
+
+    def test_register_unknown(self):
+        with self.assertRaises(AttributeError):
+            self.instruments.register(Target, "missing")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+import unittest
+from lib.internal import RandomStream, randint, seed
+
+class RandomStreamTest(unittest.TestCase):
+    def test_seeded_streams_repeat(self):
+        self.assertEqual(RandomStream(42).randint_many(0, 100, 50).tolist(),
+                         RandomStream(42).randint_many(0, 100, 50).tolist())
+
+    def test_randint_many_bounds(self):
+        n = RandomStream(1).randint_many(1, 5, (100, 11))
+        self.assertEqual(n.shape, (100, 11))
+        self.assertTrue(((n >= 1) & (n <= 5)).all())
+        self.assertEqual(set(n.ravel().tolist()), {1, 2, 3, 4, 5})
+
+    def test_substreams(self):
+        stream = RandomStream(7)
+        self.assertEqual(stream.substream(3).randint_many(0, 2**30, 8).tolist(),
+                         RandomStream(7).substream(3).randint_many(0, 2**30, 8).tolist())
+        self.assertNotEqual(stream.substream(3).randint_many(0, 2**30, 8).tolist(),
+                            stream.substream(4).randint_many(0, 2**30, 8).tolist())
+        self.assertNotEqual(stream.substream(0).randint_many(0, 2**30, 8).tolist(),
+                            RandomStream(7).spawn(1)[0].randint_many(0, 2**30, 8).tolist())
+        self.assertNotEqual(stream.substream(0).randint_many(0, 2**30, 8).tolist(),
+                            stream.thread_stream().randint_many(0, 2**30, 8).tolist())
+        self.assertIs(stream.thread_stream(), stream.thread_stream())
+
+    def test_module_randint(self):
+        seed(5)
+        first = [randint(0, 30, 1) for _ in range(10)]
+        seed(5)
+        self.assertEqual([randint(0, 30, 1) for _ in range(10)], first)
+
+if __name__ == '__main__':
+    unittest.main()
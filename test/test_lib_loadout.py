@@ -0,0 +1,73 @@
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+import unittest
+
+import numpy as np
+
+from lib.loadout import LoadoutCache
+from lib.modifier import Modifier
+
+keys = ("Str", "Agi", "Luck")
+items = {
+    "helmet": Modifier.compile(keys, {"Luck": "42%"}),
+    "boots": Modifier.compile(keys, {"Agi": 3}, {"Str": 1}),
+    "ring": Modifier.compile(keys, {"Str": "@const:infinity"}),
+}
+
+
+class LoadoutCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.resolved = []
+        self.cache = LoadoutCache(self.resolve, keys, maxsize=2)
+
+    def resolve(self, item_id):
+        self.resolved.append(item_id)
+        return items[item_id]
+
+    def test_combines_once_per_loadout(self):
+        modifier = self.cache.get(["helmet", "boots"])
+        self.assertEqual(modifier, Modifier.sum(keys, (items["helmet"], items["boots"])))
+        self.assertIs(self.cache.get(("boots", "helmet")), modifier)
+        self.assertIn(["boots", "helmet"], self.cache)
+        self.assertEqual(self.resolved, ["boots", "helmet"])
+        stats = self.cache.stats()
+        self.assertEqual((stats.hits, stats.misses, stats.size), (1, 1, 1))
+        self.assertEqual(stats.hit_rate, 0.5)
+        self.assertGreater(stats.nbytes, modifier.add.nbytes + modifier.mul.nbytes)
+        with self.assertRaises(ValueError):
+            modifier.add[0] = 1
+
+    def test_duplicates_count(self):
+        self.assertEqual(self.cache.get(["boots", "boots"]).add.tolist(), [-2, 6, 0])
+        self.assertEqual(self.cache.get([]).add.tolist(), [0, 0, 0])
+
+    def test_lru_eviction(self):
+        self.cache.get(["helmet"])
+        self.cache.get(["boots"])
+        self.cache.get(["helmet"])
+        self.cache.get(["ring"])
+        self.assertNotIn(["boots"], self.cache)
+        self.assertIn(["helmet"], self.cache)
+        stats = self.cache.stats()
+        self.assertEqual((stats.evictions, stats.size), (1, 2))
+        fresh = LoadoutCache(self.resolve, keys)
+        fresh.get(["helmet"])
+        fresh.get(["ring"])
+        self.assertEqual(stats.nbytes, fresh.stats().nbytes)
+        self.assertEqual(self.cache.get(["ring"]).add[0], np.inf)
+
+    def test_invalidate(self):
+        self.cache.get(["helmet", "ring"])
+        self.cache.get(["boots"])
+        self.cache.invalidate("ring")
+        self.assertEqual(len(self.cache), 1)
+        self.cache.invalidate()
+        self.assertEqual((len(self.cache), self.cache.stats().nbytes), (0, 0))
+        with self.assertRaises(ValueError):
+            LoadoutCache(self.resolve, keys, maxsize=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+import unittest
+from math import inf
+import numpy as np
+from lib.modifier import Modifier, parse_value
+
+KEYS = ("Str", "Agi", "Luck", "Atk")
+
+class ModifierTest(unittest.TestCase):
+    def test_parse_value(self):
+        self.assertEqual(parse_value("42%"), (0.0, 0.42))
+        self.assertEqual(parse_value(3), (3.0, 0.0))
+        self.assertEqual(parse_value("@const:infinity"), (inf, 0.0))
+        with self.assertRaises(ValueError):
+            parse_value("@const:nothing")
+
+    def test_compile_and_apply(self):
+        modifier = Modifier.compile(KEYS, {"Luck": "50%", "Atk": "@const:infinity", "Str": 2}, {"Agi": "10%"})
+        values = modifier.apply(np.array([10.0, 10.0, 10.0, 5.0]))
+        self.assertEqual(values.tolist(), [12.0, 9.0, 15.0, inf])
+
+    def test_sum(self):
+        first = Modifier.compile(KEYS, {"Luck": "50%"})
+        second = Modifier.compile(KEYS, {"Luck": "25%", "Str": 1})
+        self.assertEqual(first + second, Modifier.sum(KEYS, (first, second)))
+        self.assertEqual((first + second).mul.tolist(), [0.0, 0.0, 0.75, 0.0])
+        self.assertFalse(Modifier(KEYS))
+
+    def test_batch_apply(self):
+        modifier = Modifier.compile(KEYS, {"Agi": 1})
+        values = modifier.apply(np.zeros((2, 3)), start=1)
+        self.assertEqual(values.tolist(), [[1.0] * 3, [0.0] * 3])
+
+    def test_infinite_edge_cases(self):
+        modifier = Modifier.compile(KEYS, {"Atk": "@const:infinity"}, {"Atk": "100%", "Str": "@const:infinity"})
+        values = modifier.apply(np.array([10.0, 10.0, np.nan, 5.0]))
+        self.assertEqual(values[[0, 1, 3]].tolist(), [0.0, 10.0, 0.0])
+        self.assertTrue(np.isnan(values[2]))
+        halved = Modifier.compile(KEYS, {"Atk": "@const:infinity"}, {"Atk": "50%"})
+        self.assertEqual(halved.apply(np.zeros(4))[3], inf)
+
+    def test_unknown_stat(self):
+        with self.assertRaises(ValueError):
+            Modifier.compile(KEYS, {"Cha": 1})
+
+if __name__ == '__main__':
+    unittest.main()
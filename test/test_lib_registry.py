@@ -0,0 +1,47 @@
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+import os
+import unittest
+from tempfile import TemporaryDirectory
+from lib.registry import StructureRegistry
+
+class RegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = TemporaryDirectory()
+        os.makedirs(f"{self.folder.name}/items/armor")
+        for name in ("a", "b", "c"):
+            self.write(f"items/armor/{name}", f"Item:\n  Name: {name}\n")
+        self.registry = StructureRegistry(self.folder.name, maxsize=2)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def write(self, name, content, mtime=None):
+        with open(f"{self.folder.name}/{name}", "w") as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(f"{self.folder.name}/{name}", ns=(mtime, mtime))
+
+    def test_index(self):
+        self.assertEqual(self.registry.keys("items."), ["items.armor.a", "items.armor.b", "items.armor.c"])
+        with self.assertRaises(FileNotFoundError):
+            self.registry.get("items.armor.d")
+
+    def test_cache_and_stats(self):
+        first = self.registry.get("items.armor.a")
+        self.assertIs(self.registry.get("items.armor.a"), first)
+        self.registry.get("items.armor.b")
+        self.registry.get("items.armor.c")
+        stats = self.registry.stats()
+        self.assertEqual((stats.hits, stats.misses, stats.evictions, stats.size), (1, 3, 1, 2))
+
+    def test_reload_on_mtime(self):
+        self.assertEqual(self.registry.get("items.armor.a")["Item"]["Name"], "a")
+        self.write("items/armor/a", "Item:\n  Name: changed\n", mtime=10**9)
+        self.assertEqual(self.registry.get("items.armor.a")["Item"]["Name"], "changed")
+        self.assertEqual(self.registry.stats().reloads, 1)
+
+if __name__ == '__main__':
+    unittest.main()
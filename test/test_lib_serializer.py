@@ -0,0 +1,42 @@
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+import unittest
+from lib import serializer
+from lib.serializer import BinarySerializer, SerializerError
+
+RECORD = {"Name": "Debug #0", "Level": 12, "EXP": -3, "Big": 2**70, "Crit": 0.25,
+          "Skills": {"Fire": "1", "Ice": "ü"}, "List": [1, None, True, False], "Race": "human"}
+
+class SerializerTest(unittest.TestCase):
+    def test_round_trip(self):
+        for name in serializer.available():
+            backend = serializer.get(name)
+            data = backend.dumps(RECORD)
+            self.assertIsInstance(data, bytes if backend.binary else str)
+            self.assertEqual(backend.loads(data), RECORD, name)
+
+    def test_binary_errors(self):
+        backend = BinarySerializer()
+        data = backend.dumps(RECORD)
+        for broken in (data[:-3], b"nope", data + b"N"):
+            with self.assertRaises(SerializerError):
+                backend.loads(broken)
+        with self.assertRaises(SerializerError):
+            backend.dumps({"key": object()})
+
+    def test_default_and_guess(self):
+        previous = serializer.set_default("json")
+        try:
+            self.assertEqual(serializer.get().name, "json")
+            self.assertEqual(serializer.for_data(b"{}", "a.yaml").extensions, (".yaml", ".yml"))
+            self.assertEqual(serializer.for_data(b"{}", "a").name, "json")
+            self.assertEqual(serializer.for_data(BinarySerializer.MAGIC, "a.yaml").name, "binary")
+        finally:
+            serializer.set_default(previous)
+        with self.assertRaises(SerializerError):
+            serializer.set_default("xml")
+
+if __name__ == '__main__':
+    unittest.main()
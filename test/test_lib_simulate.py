@@ -0,0 +1,42 @@
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+import unittest
+
+import numpy as np
+from lib.simulate import simulate
+
+
+def same(first, second):
+    return (all(np.array_equal(a, b) for a, b in zip(first[2:6], second[2:6]))
+            and first.computational.keys() == second.computational.keys()
+            and all(np.array_equal(first.computational[name], second.computational[name])
+                    for name in first.computational))
+
+
+class SimulateTest(unittest.TestCase):
+    def test_independent_of_workers(self):
+        inline = simulate(50, 10, seed=3, workers=1, shard_size=16)
+        pooled = simulate(50, 10, seed=3, workers=3, shard_size=16)
+        self.assertTrue(same(inline, pooled))
+        self.assertEqual(inline.levels.shape, (11, 50))
+        self.assertEqual(inline.attributes.shape, (50, 13))
+        self.assertTrue((inline.levels[0] == 1).all())
+        self.assertTrue((np.diff(inline.levels, axis=0) >= 0).all())
+        np.testing.assert_array_equal(inline.attribute_sums[-1], inline.attributes.sum(axis=0))
+        self.assertEqual(inline.attribute("Str").tolist(), inline.attributes[:, 0].tolist())
+
+    def test_seeded(self):
+        self.assertTrue(same(simulate(20, 5, seed=1, workers=1), simulate(20, 5, seed=1, workers=1)))
+        self.assertFalse(same(simulate(20, 5, seed=1, workers=1), simulate(20, 5, seed=2, workers=1)))
+
+    def test_empty(self):
+        result = simulate(0, 3, seed=1, workers=1)
+        self.assertEqual((result.count, result.days), (0, 3))
+        with self.assertRaises(ValueError):
+            simulate(10, 3, seed=1, shard_size=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+import json
+import unittest
+from os.path import join
+from tempfile import TemporaryDirectory
+
+import numpy as np
+from lib.snapshot import Snapshot, SnapshotError, write
+
+
+class SnapshotTest(unittest.TestCase):
+    def test_round_trip(self):
+        with TemporaryDirectory() as folder:
+            write(folder, 3, {"Str": np.arange(3), "Crit": np.array([0.5, np.nan, 2.0])},
+                  {"Name": ["a", "ü", "a"]}, {"Skills": [{}, {"Fire": "1"}, {}]})
+            snapshot = Snapshot(folder)
+            self.assertEqual(len(snapshot), 3)
+            self.assertEqual(snapshot.columns, ("Str", "Crit", "Name", "Skills"))
+            self.assertIsInstance(snapshot.column("Str"), np.memmap)
+            self.assertEqual(snapshot.column("Str").tolist(), [0, 1, 2])
+            self.assertEqual(snapshot.column("Name"), ["a", "ü", "a"])
+            self.assertEqual(snapshot.codes("Name").tolist(), [0, 1, 0])
+            self.assertEqual(snapshot.codes("Skills")[0], snapshot.codes("Skills")[2])
+            self.assertEqual(snapshot.row(1)["Skills"], {"Fire": "1"})
+            self.assertTrue(np.isnan(snapshot.row(1)["Crit"]))
+            self.assertEqual([row["Str"] for row in snapshot], [0, 1, 2])
+            with self.assertRaises(ValueError):
+                snapshot.column("Str")[0] = 5
+
+    def test_lazy_columns(self):
+        with TemporaryDirectory() as folder:
+            write(folder, 2, {"Str": np.arange(2), "Agi": np.arange(2)})
+            snapshot = Snapshot(folder)
+            snapshot.column("Str")
+            self.assertEqual(list(snapshot._arrays), ["Str"])
+
+    def test_errors(self):
+        with TemporaryDirectory() as folder:
+            with self.assertRaises(SnapshotError):
+                Snapshot(folder)
+            with self.assertRaises(ValueError):
+                write(folder, 3, {"Str": np.arange(2)})
+            write(folder, 1, {"Str": np.arange(1)})
+            with open(join(folder, "meta.json"), "w") as f:
+                json.dump({"version": 0}, f)
+            with self.assertRaises(SnapshotError):
+                Snapshot(folder)
+
+
+if __name__ == '__main__':
+    unittest.main()
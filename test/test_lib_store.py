@@ -0,0 +1,128 @@
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+import asyncio
+import threading
+import unittest
+from os import listdir
+from tempfile import TemporaryDirectory
+
+from lib import store as store_module
+from lib.store import AsyncCharacterStore
+from status import Attribute, BaseCharacter, CharAttribute
+
+
+def character(name="Hero", value=10):
+    return BaseCharacter(CharAttribute(1, 0, 0, 1, 1, 1, name, "human", 20, {"Fire": "1"}, 0), Attribute(*[value] * 13))
+
+
+class StoreTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.folder = TemporaryDirectory()
+        self.store = AsyncCharacterStore(self.folder.name, "json", max_workers=2, write_window=0.01)
+
+    async def asyncTearDown(self):
+        await self.store.close()
+        self.folder.cleanup()
+
+    async def test_round_trip(self):
+        hero = character()
+        await self.store.save(hero)
+        self.assertEqual(listdir(self.folder.name), ["Hero.json"])
+        loaded = await self.store.load("Hero")
+        self.assertEqual(loaded.dump_to_jsonable(), hero.dump_to_jsonable())
+
+    async def test_concurrent_loads_share_one_read(self):
+        await self.store.save(character())
+        loaded = await asyncio.gather(*(self.store.load("Hero") for _ in range(5)))
+        self.assertEqual(len({id(each) for each in loaded}), 5)
+        stats = self.store.stats()
+        self.assertEqual((stats.loads, stats.reads, stats.merged), (5, 1, 4))
+
+    async def test_saves_are_batched(self):
+        heroes = [character("Hero #%s" % index, index) for index in range(4)]
+        await asyncio.gather(*(self.store.save(hero) for hero in heroes), self.store.save(heroes[0]))
+        stats = self.store.stats()
+        self.assertEqual((stats.saves, stats.writes, stats.batches), (5, 4, 1))
+        loaded = await self.store.load("Hero #3")
+        self.assertEqual(loaded.attribute.Str, 3)
+
+    async def test_load_sees_buffered_save(self):
+        hero = character()
+        saving = asyncio.ensure_future(self.store.save(hero))
+        await asyncio.sleep(0)
+        hero.set_stat("Str", 99)
+        loaded = await self.store.load("Hero")
+        self.assertEqual(loaded.attribute.Str, 10)
+        await saving
+        self.assertEqual(self.store.stats().reads, 0)
+
+    async def test_load_sees_save_being_written(self):
+        await self.store.save(character(value=1))
+        writing, release = threading.Event(), threading.Event()
+        write = self.store._write
+
+        def slow_write(pending):
+            writing.set()
+            release.wait(5)
+            write(pending)
+        self.store._write = slow_write
+        saving = asyncio.ensure_future(self.store.save(character(value=2)))
+        await asyncio.get_running_loop().run_in_executor(None, writing.wait, 5)
+        loaded = await self.store.load("Hero")
+        release.set()
+        await saving
+        self.assertEqual(loaded.attribute.Str, 2)
+        self.assertEqual(self.store._writing, {})
+
+    async def test_failed_flush_is_retried(self):
+        write = self.store._write
+        failures = []
+
+        def failing_write(pending):
+            if not failures:
+                failures.append(pending)
+                raise OSError("disk full")
+            write(pending)
+        self.store._write = failing_write
+        with self.assertRaises(OSError):
+            await self.store.save(character())
+        await asyncio.sleep(0.1)
+        self.assertEqual(listdir(self.folder.name), ["Hero.json"])
+        self.assertEqual(self.store.stats().batches, 2)
+
+    async def test_characters_are_built_off_the_loop(self):
+        build, threads = store_module._build, []
+
+        def recording_build(mapping, trusted):
+            threads.append(threading.current_thread())
+            return build(mapping, trusted)
+        store_module._build = recording_build
+        try:
+            saving = asyncio.ensure_future(self.store.save(character()))
+            await asyncio.sleep(0)
+            await self.store.load("Hero")
+            await saving
+            loaded = await asyncio.gather(*(self.store.load("Hero") for _ in range(3)))
+        finally:
+            store_module._build = build
+        self.assertEqual(len(threads), 4)
+        self.assertNotIn(threading.main_thread(), threads)
+        self.assertEqual(len({id(each) for each in loaded}), 3)
+        self.assertEqual(self.store.stats().merged, 2)
+
+    async def test_errors(self):
+        with self.assertRaises(FileNotFoundError):
+            await self.store.load("Nobody")
+        with self.assertRaises(ValueError):
+            await self.store.load("../Hero")
+        structure = await self.store.load_structure("races", "human")
+        self.assertIsInstance(structure, dict)
+        await self.store.close()
+        with self.assertRaises(RuntimeError):
+            await self.store.save(character())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+from sys import path
+from os.path import realpath
+path.insert(0, realpath(f"{__file__}/../../"))
+
+import os
+import unittest
+from tempfile import TemporaryDirectory
+from lib.structpack import StructurePack, build
+
+class StructPackTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = TemporaryDirectory()
+        self.root = f"{self.folder.name}/structures"
+        os.makedirs(f"{self.root}/races")
+        for name in ("elf", "human"):
+            with open(f"{self.root}/races/{name}", "w") as f:
+                f.write(f"Race:\n  Name: {name}\n  Buff:\n    Agi: 1%\n")
+        self.filename = f"{self.folder.name}/structures.pack"
+        self.assertEqual(build(self.root, self.filename), 2)
+        self.pack = StructurePack(self.filename, self.root)
+
+    def tearDown(self):
+        self.pack.close()
+        self.folder.cleanup()
+
+    def test_get(self):
+        self.assertEqual(self.pack.keys(), ["races.elf", "races.human"])
+        human = self.pack.get("races.human")
+        self.assertEqual(human, {"Race": {"Name": "human", "Buff": {"Agi": "1%"}}})
+        self.assertIs(self.pack.get("races.human"), human)
+        self.assertIsNone(self.pack.get("races.orc"))
+
+    def test_stale_entry(self):
+        os.utime(f"{self.root}/races/elf", ns=(10**9, 10**9))
+        self.assertIsNone(self.pack.get("races.elf"))
+        self.assertIsNotNone(self.pack.get("races.elf", check=False))
+        self.assertIsNotNone(self.pack.get("races.human"))
+
+    def test_not_a_pack(self):
+        with open(self.filename, "wb") as f:
+            f.write(b"\0" * 64)
+        with self.assertRaises(ValueError):
+            StructurePack(self.filename, self.root)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,8 +5,13 @@ from sys import path
 from os.path import realpath
 path.insert(0, realpath(f"{__file__}/../../"))
 
-from status import BaseCharacter, Attribute, CharAttribute, setDebug
+from status import BaseCharacter, Attribute, CharAttribute, ComputationalAttribute, FrozenAttribute, SlottedComputationalAttribute, UnableToSetAttribute, validate_many, CharacterPool, LoadReport, PackedAttribute, PackedComputationalAttribute, SlottedAttribute, SlottedCharAttribute, Race, Item, Max, NotAvailable, setDebug, set_formulas, use_pack, formula_file, write_snapshot, Snapshot, setInstrumentation, stats, profile
+from lib.formula import load_formulas
+from lib.structpack import build
+from lib.modifier import Modifier
+from tempfile import TemporaryDirectory
 import unittest
+import numpy as np
 from pprint import pprint
 
 # We don't really need other classes like Attribute, etc. -- because 'they' was handled by BaseCharacter.
@@ -20,7 +25,7 @@ from pprint import pprint
 class TestCharacter(unittest.TestCase):
     def setUp(self):
         setDebug(True)
-        self.attribute = Attribute([10]*13)
+        self.attribute = Attribute(*[10]*13)
         self.char_attribute = CharAttribute(1, 0, 0, 1, 1, 1, "Debug #0", "DebugRace", 0, {"Debug": "debug"}, -1)
         self.base_char_init = [1, 0, 0, 1, 1, 1, "NAME", "DebugRace", 0, {"Debug": "debug"}, -1]
         self.main = BaseCharacter(self.char_attribute, self.attribute)
@@ -40,14 +45,418 @@ class TestCharacter(unittest.TestCase):
         self.output.write("Generating up-to 100 characters with unique 100 Attribute classes...\n")
         for i in range(0, 100):
             # Up to 100 Attribute instances are different, but only CharAttribute that's different (unless Name.)
-            n_attr = Attribute([i]*13)
+            n_attr = Attribute(*[i]*13)
             n_attr1 = self.base_char_init.copy()
             n_attr1.remove("NAME")
             n_attr1.insert(6, f"Debug #{i}")
-            a1 = CharAttribute(**n_attr1)
+            a1 = CharAttribute(*n_attr1)
             obj = BaseCharacter(a1, n_attr)
             json_string = pprint(obj.dump_to_jsonable())
-            self.output.write(f"{'='*30}\n\n{n_attr[6]}\n\n")
+            self.output.write(f"{'='*30}\n\n{n_attr.Will}\n\n")
             pprint(json_string, self.output, 2, sort_dicts=False)
             self.output.write("\n\n{'='*30}\n\n")
-    
+
+    def test_pool_matches_cls_calculate(self):
+        characters = [BaseCharacter(CharAttribute(1, 0, 0, 1, 1, 1, f"Debug #{i}", "DebugRace", 0, {}, -1),
+                                    Attribute(*range(i, i+13))) for i in range(0, 20)]
+        expected = [character.dump_to_jsonable()[2] for character in characters]
+        pool = CharacterPool(characters)
+        pool.calculate()
+        pool.store()
+        self.assertEqual(len(pool), 20)
+        self.assertEqual([character.dump_to_jsonable()[2] for character in characters], expected)
+
+    def test_pool_store_attributes(self):
+        pool = CharacterPool([self.main])
+        pool.column("Sta")[:] = 20
+        pool.store()
+        self.assertEqual(self.main.dump_to_jsonable()[0]["Sta"], 20)
+        self.assertEqual(self.main.dump_to_jsonable()[2]["Stamina_Point"], 200)
+
+    def test_grant_exp_bulk(self):
+        start_exp = self.main._MaxEXP + 5000000
+        before = self.main.dump_to_jsonable()[0]
+        records = self.main.grant_exp(start_exp, breakdown=True)
+        after = self.main.dump_to_jsonable()[0]
+        self.assertEqual(len(records), self.main._char_attribute.Level - 1)
+        self.assertEqual([record.Level for record in records], list(range(2, self.main._char_attribute.Level + 1)))
+        self.assertEqual(sum(record.EXP_Cost for record in records) + self.main._char_attribute.EXP, start_exp)
+        self.assertLess(self.main._char_attribute.EXP, self.main._MaxEXP)
+        for name in ("Vit", "Str", "Per"):
+            self.assertEqual(after[name] - before[name], sum(record.Gains[name] for record in records))
+        self.assertEqual(after["Luck"], before["Luck"])
+
+    def test_grant_exp_below_max(self):
+        self.assertEqual(self.main.grant_exp(0), 0)
+        self.assertEqual(self.main._char_attribute.Level, 1)
+
+    def test_structure_loader(self):
+        human = Race.loader("human")
+        self.assertEqual(human.Race["Name"], "Human")
+        self.assertIs(Race.loader("human"), human)
+        self.assertEqual(Item.loader("armor.head.debug_headplate").ItemHeader["Type"], "Armor")
+
+    def test_structure_pack(self):
+        with TemporaryDirectory() as folder:
+            build("structures/", f"{folder}/structures.pack")
+            pack = use_pack(f"{folder}/structures.pack")
+            try:
+                self.assertIs(Race.loader("human").Race, pack.get("races.human")["Race"])
+            finally:
+                use_pack(None)
+
+    def test_effective_stats(self):
+        stats = self.main.effective(Race.loader("human"), Item.loader("armor.head.debug_headplate"))
+        self.assertAlmostEqual(stats.attribute.Luck, 14.2)
+        self.assertAlmostEqual(stats.attribute.Dex, 9.9)
+        self.assertEqual(stats.attribute.Agi, 10)
+        self.assertIs(stats.computational.Atk, Max)
+        self.assertIs(stats.computational.Accuracy, Max)
+        self.assertIs(stats.computational.Usage_Acceleration, NotAvailable)
+        self.assertEqual(self.main.effective().computational, self.main.computational)
+        from status import _stat_fields
+        nullified = Modifier.compile(_stat_fields, {"Atk": "@const:infinity"}, {"Atk": "100%", "Luck": "@const:infinity"})
+        stats = self.main.effective(nullified)
+        self.assertEqual((stats.attribute.Luck, stats.computational.Atk), (0, 0))
+        self.assertEqual(CharacterPool([self.main]).effective([()])["Atk"].tolist(),
+                         [self.main.computational.Atk])
+
+    def test_set_stat_recomputes_dependents(self):
+        self.main.set_stat("Agi", 30)
+        self.assertEqual(self.main._dirty, {"Evade_Percentage", "Speed_Acceleration"})
+        self.main.add_stat("Sta", 5)
+        self.assertIn("Magical_Atk", self.main._dirty)
+        self.assertNotIn("Def", self.main._dirty)
+        lazy = self.main.snapshot().computational
+        self.assertFalse(self.main._dirty)
+        self.main.cls_calculate()
+        self.assertEqual(lazy, self.main.computational)
+        self.assertEqual(lazy.Stamina_Point, 150)
+        with self.assertRaises(AttributeError):
+            self.main.set_stat("Max_HealthPoint", 1)
+
+    def test_set_formulas(self):
+        formulas = load_formulas(formula_file, "ComputationalAttribute")
+        formulas["Atk"] = "Str * 2"
+        previous = set_formulas(formulas)
+        try:
+            self.main.cls_calculate()
+            self.assertEqual(self.main.computational.Atk, 20)
+            pool = CharacterPool([self.main])
+            self.assertEqual(pool.computational("Atk").tolist(), [20])
+        finally:
+            self.assertEqual(set_formulas(previous).source["Atk"], "Str * 2")
+        self.main.cls_calculate()
+        self.assertAlmostEqual(self.main.computational.Atk, (10*60 + 10*1.5 + 10*5) / 59)
+        with self.assertRaises(ValueError):
+            set_formulas({"Atk": "Str"})
+
+    def test_constant_formula_in_pool(self):
+        from lib.simulate import simulate
+        formulas = load_formulas(formula_file, "ComputationalAttribute")
+        formulas["Accuracy"] = "1"
+        previous = set_formulas(formulas)
+        try:
+            pool = CharacterPool([self.main, BaseCharacter(CharAttribute(*self.base_char_init), Attribute(*[1]*13))])
+            self.assertEqual(pool.computational("Accuracy").tolist(), [1, 1])
+            pool.store()
+            self.assertEqual(self.main.computational.Accuracy, 1)
+            self.assertEqual(pool.effective([(), ()])["Accuracy"].tolist(), [1.0, 1.0])
+            self.assertEqual(simulate(3, 1, seed=1, workers=0).computational["Accuracy"].tolist(), [1.0] * 3)
+        finally:
+            set_formulas(previous)
+
+    def test_compact_stat_blocks(self):
+        for attribute_cls, char_attribute_cls in ((SlottedAttribute, SlottedCharAttribute), (PackedAttribute, SlottedCharAttribute)):
+            attribute = attribute_cls(*[10]*13)
+            self.assertFalse(hasattr(attribute, "__dict__"))
+            character = BaseCharacter(char_attribute_cls(*self.base_char_init), attribute)
+            attributes, char_attributes, computational = character.dump_to_jsonable()
+            self.assertEqual(attributes, self.main.dump_to_jsonable()[0])
+            self.assertEqual(computational, self.main.dump_to_jsonable()[2])
+            self.assertEqual(char_attributes["Name"], "NAME")
+            character.add_stat("Str", 5)
+            self.assertEqual(character.attribute.Str, 15)
+
+    def test_packed_attribute(self):
+        attribute = PackedAttribute(*range(13))
+        self.assertEqual((attribute.Str, attribute.Bra), (0, 12))
+        attribute.Luck = 40
+        self.assertEqual(attribute, PackedAttribute(*range(4), 40, *range(5, 13)))
+        computational = PackedComputationalAttribute(*[0]*14)
+        computational.Accuracy = NotAvailable
+        self.assertIs(computational.Accuracy, NotAvailable)
+        computational.Atk = Max
+        self.assertIs(computational.Atk, Max)
+        with self.assertRaises(TypeError):
+            PackedAttribute(1, 2)
+        from status import StaticTypingException
+        for value in (NotAvailable, Max, 1.5):
+            with self.assertRaisesRegex(StaticTypingException, "Unmatched type of Str"):
+                PackedAttribute(value, *range(12))
+            with self.assertRaisesRegex(StaticTypingException, "Unmatched type of Luck"):
+                attribute.Luck = value
+        self.assertEqual(attribute.Luck, 40)
+
+    def test_validate_many(self):
+        batch = [Attribute(*[1]*13), Attribute("foo", *[1]*11, 2.5), CharAttribute(*self.base_char_init),
+                 CharAttribute(1, 0, 0, 1, 1, 1, 3, "DebugRace", 0, {"Debug": 1}, 7),
+                 ComputationalAttribute(*[1.5]*14), SlottedComputationalAttribute(*[1.5]*14)]
+        failures = validate_many(batch)
+        self.assertEqual([(index, error.Error_Key) for index, error in failures],
+                         [(1, "Str"), (1, "Bra"), (3, "Name"), (3, "Skills"), (3, "Gender")])
+        self.assertEqual(failures[0][1].Error_Reason, "Unmatched type of Str, expected int but got str")
+
+    def test_validation_not_available(self):
+        attribute = Attribute(NotAvailable, *[1]*12)
+        with self.assertWarns(Warning):
+            self.assertEqual(validate_many([attribute]), [])
+        self.assertEqual(attribute.Str, 0)
+        with self.assertWarns(Warning), self.assertRaises(UnableToSetAttribute):
+            validate_many([FrozenAttribute(NotAvailable, *[1]*12)])
+
+    def test_trusted_skips_validation(self):
+        attribute = Attribute(*[10]*12, 1.5)
+        with self.assertRaises(Exception):
+            BaseCharacter(CharAttribute(*self.base_char_init), attribute)
+        BaseCharacter(CharAttribute(*self.base_char_init), attribute, trusted=True)
+
+    def test_views_share_storage(self):
+        view = self.main.attribute
+        self.assertIs(self.main.attribute, view)
+        self.main.add_stat("Str", 1)
+        self.assertEqual(view.Str, 11)
+        self.assertEqual(self.main.computational.Max_HealthPoint, self.main.dump_to_jsonable()[2]["Max_HealthPoint"])
+        self.assertEqual(self.main.character_attribute.Name, "Debug #0")
+        with self.assertRaises(UnableToSetAttribute):
+            view.Str = 5
+
+    def test_snapshot_cached(self):
+        snapshot = self.main.snapshot()
+        self.assertIs(self.main.snapshot(), snapshot)
+        self.assertEqual(snapshot.attribute, self.main.attribute)
+        self.main.cls_calculate()
+        self.assertIsNot(self.main.snapshot(), snapshot)
+        snapshot = self.main.snapshot()
+        self.main.grant_exp(self.main._MaxEXP)
+        self.assertEqual(snapshot.character_attribute.Level, 1)
+        self.assertEqual(self.main.snapshot().character_attribute.Level, 2)
+
+    def roster(self, count):
+        return [BaseCharacter(CharAttribute(1, 0, 0, 1, 1, 1, f"Member #{i}", "DebugRace", 20, {"Fire": "1"}, 0),
+                              Attribute(*range(i, i + 13))) for i in range(count)]
+
+    def test_load_dump_single(self):
+        with TemporaryDirectory() as folder:
+            with open(f"{folder}/character.yaml", "w") as f:
+                f.write(self.main.dump())
+            loaded = BaseCharacter.load(f"{folder}/character.yaml")
+        self.assertEqual(loaded.dump_to_jsonable(), self.main.dump_to_jsonable())
+
+    def test_roster_round_trip(self):
+        members = self.roster(5)
+        with TemporaryDirectory() as folder:
+            for name in ("guild.yaml", "guild.jsonl"):
+                self.assertEqual(BaseCharacter.dump_many(iter(members), f"{folder}/{name}"), 5)
+                loaded = list(BaseCharacter.load_many(f"{folder}/{name}"))
+                self.assertEqual([character.dump_to_jsonable() for character in loaded],
+                                 [character.dump_to_jsonable() for character in members])
+            self.assertEqual(BaseCharacter.dump_many(members, f"{folder}/guild.roster", roster_format="jsonl"), 5)
+            self.assertEqual(len(list(BaseCharacter.load_many(f"{folder}/guild.roster", "jsonl"))), 5)
+            for roster_format in ("yml", "json"):
+                with self.assertRaises(ValueError):
+                    BaseCharacter.dump_many(members, f"{folder}/guild.yaml", roster_format=roster_format)
+                with self.assertRaises(ValueError):
+                    list(BaseCharacter.load_many(f"{folder}/guild.yaml", roster_format))
+            with self.assertRaises(ValueError):
+                BaseCharacter.dump_many(members, f"{folder}/guild.txt")
+
+    def test_roster_skip_malformed(self):
+        members = self.roster(2)
+        with TemporaryDirectory() as folder:
+            with open(f"{folder}/guild.yaml", "w") as f:
+                f.write(members[0].dump(explicit_start=True))
+                f.write("---\nName: [broken\n")
+                f.write("---\nName: Incomplete\n")
+                f.write(members[1].dump(explicit_start=True))
+            with self.assertRaises(Exception):
+                list(BaseCharacter.load_many(f"{folder}/guild.yaml"))
+            report = LoadReport()
+            loaded = list(BaseCharacter.load_many(f"{folder}/guild.yaml", skip_malformed=True, report=report))
+        self.assertEqual([character._name for character in loaded], ["Member #0", "Member #1"])
+        self.assertEqual((report.loaded, report.skipped), (2, 2))
+
+    def test_dump_serializers(self):
+        from lib import serializer
+        with TemporaryDirectory() as folder:
+            for name in serializer.available():
+                data = self.main.dump(serializer=name)
+                with open(f"{folder}/character", "wb") as f:
+                    f.write(data if isinstance(data, bytes) else data.encode("utf8"))
+                loaded = BaseCharacter.load(f"{folder}/character", serializer=None if name == "binary" else name)
+                self.assertEqual(loaded.dump_to_jsonable(), self.main.dump_to_jsonable(), name)
+
+    def test_write_snapshot(self):
+        members = self.roster(4)
+        pool = CharacterPool(self.roster(4))
+        with TemporaryDirectory() as folder:
+            self.assertEqual(write_snapshot(members, f"{folder}/list"), 4)
+            write_snapshot(pool, f"{folder}/pool")
+            snapshot = Snapshot(f"{folder}/list")
+            self.assertEqual(snapshot.column("Str").tolist(), [0, 1, 2, 3])
+            self.assertEqual(snapshot.column("Name")[3], "Member #3")
+            self.assertTrue(np.isnan(snapshot.column("Accuracy")).all())
+            np.testing.assert_allclose(snapshot.column("Max_HealthPoint"),
+                                       [member.computational.Max_HealthPoint for member in members])
+            pooled = Snapshot(f"{folder}/pool")
+            for name in snapshot.columns:
+                if snapshot.kinds[name] == "number":
+                    np.testing.assert_allclose(pooled.column(name), snapshot.column(name))
+                else:
+                    self.assertEqual(pooled.column(name), snapshot.column(name))
+            loaded = BaseCharacter._from_mapping(snapshot.row(2))
+            pool.column("Vit")[:] += 100
+            write_snapshot(pool, f"{folder}/edited")
+            np.testing.assert_allclose(Snapshot(f"{folder}/edited").column("Max_HealthPoint"),
+                                       pool.computational("Max_HealthPoint"))
+            self.assertFalse(np.allclose(pool.computational("Max_HealthPoint"), pooled.column("Max_HealthPoint")))
+        self.assertEqual(loaded.dump_to_jsonable(), members[2].dump_to_jsonable())
+
+    def test_instrumentation(self):
+        plain = BaseCharacter.level_up
+        setInstrumentation(True)
+        try:
+            stats(reset=True)
+            self.main.level_up()
+            BaseCharacter(self.char_attribute, self.attribute)
+            counters = stats()
+        finally:
+            setInstrumentation(False)
+        self.assertIs(BaseCharacter.level_up, plain)
+        self.assertEqual(counters["BaseCharacter.level_up"].calls, 1)
+        self.assertEqual(counters["BaseCharacter.cls_calculate"].calls, 2)
+        self.assertEqual(counters["_is_valid_for_base_character"].calls, 1)
+        self.assertGreaterEqual(counters["max_exp"].calls, 4)
+        self.assertIn("RandomStream.randint_many", profile())
+
+    def test_max_exp_is_stable(self):
+        from status import max_exp, level_for_exp
+        self.assertEqual(self.main._MaxEXP, BaseCharacter(self.char_attribute, self.attribute)._MaxEXP)
+        self.assertEqual(max_exp(3, 0, 42), max_exp(3, 0, 42))
+        self.assertIs(max_exp(5, 1), Max)
+        self.assertIs(max_exp(10, 2), Max)
+        self.assertIsNot(max_exp(9, 2), Max)
+        with self.assertRaises(ValueError):
+            max_exp(1, 3)
+        self.main.grant_exp(3_200_000)
+        self.assertEqual(level_for_exp(3_200_000, 0, self.main._exp_seed),
+                         (self.main._char_attribute.Level, self.main._char_attribute.EXP))
+        self.assertEqual(self.main._MaxEXP, max_exp(self.main._char_attribute.Level, 0, self.main._exp_seed))
+
+    def test_structures_are_interned(self):
+        import pickle
+        from weakref import WeakValueDictionary
+        from status import FrozenClassError
+        humans = [BaseCharacter(CharAttribute(1, 0, 0, 1, 1, 1, f"Human #{i}", "human", 20, {}, 0), self.attribute)
+                  for i in range(3)]
+        race = humans[0].character_attribute.Race
+        self.assertIsInstance(race, Race)
+        self.assertTrue(all(human.character_attribute.Race is race for human in humans))
+        self.assertIs(Race.loader("human"), race)
+        self.assertEqual(race, "human")
+        self.assertEqual(race.struct_id, "human")
+        self.assertIs(pickle.loads(pickle.dumps(race)), race)
+        self.assertEqual(humans[0].dump_to_jsonable()[1]["Race"], "human")
+        self.assertIn("Race: human", humans[0].dump())
+        with self.assertRaises(FrozenClassError):
+            race.Race = {}
+        self.assertEqual(self.main.character_attribute.Race, "DebugRace")
+        self.assertIsNone(Race.intern("DebugRace"))
+        self.assertIsInstance(Race._loaded_instances, WeakValueDictionary)
+
+    def test_interned_structures_survive_registry_eviction(self):
+        import status
+        from lib.registry import StructureRegistry
+        previous, status.registry = status.registry, StructureRegistry(status.structure_folder, 1)
+        try:
+            human = Race.loader("human")
+            status.registry.get("items.armor.head.debug_headplate")
+            self.assertIs(Race.loader("human"), human)
+            status.registry.invalidate()
+            self.assertIs(Race.loader("human"), human)
+            self.assertEqual(Race.loader("human"), human)
+        finally:
+            status.registry = previous
+
+    def test_item_index(self):
+        from status import item_index, Item
+        index = item_index()
+        self.assertIs(item_index(), index)
+        heads = index.query(under="armor.head", buff="Luck")
+        self.assertIn("armor.head.debug_headplate", heads)
+        self.assertIsInstance(Item.loader(heads[0]), Item)
+        self.assertEqual(index.refresh().added, 0)
+
+    def test_loadout_effective(self):
+        from status import loadout_cache
+        loadout = ("armor.head.debug_headplate",)
+        stats = self.main.effective(loadout=loadout)
+        self.assertEqual(stats, self.main.effective(Item.loader(loadout[0])))
+        hits = loadout_cache().stats().hits
+        self.assertEqual(self.main.effective(loadout=list(loadout)), stats)
+        self.assertEqual(loadout_cache().stats().hits, hits + 1)
+        pool = CharacterPool([self.main])
+        columns = pool.effective([loadout])
+        self.assertEqual(columns["Atk"][0], np.inf)
+        self.assertAlmostEqual(columns["Luck"][0], stats.attribute.Luck)
+        with self.assertRaises(ValueError):
+            pool.effective([])
+
+    def test_fork_copy_on_write(self):
+        from status import ForkConflictError
+        parent = BaseCharacter(CharAttribute(1, 0, 0, 1, 1, 1, "Forked", "human", 20, {"Slash": "basic"}, 0), self.attribute)
+        before = parent.snapshot()
+        fork = parent.fork()
+        self.assertIs(fork._attribute, parent._attribute)
+        self.assertEqual(fork.diff(), {})
+        fork.grant_exp(1000)
+        fork.set_stat("Luck", 99)
+        self.assertIsNot(fork._attribute, parent._attribute)
+        self.assertEqual(parent.snapshot(), before)
+        changes = fork.diff()
+        self.assertEqual(changes["Level"], (1, fork.character_attribute.Level))
+        self.assertEqual(changes["Luck"], (before.attribute.Luck, 99))
+        self.assertIn("Evade_Percentage", changes)
+        self.assertNotIn("Name", changes)
+
+        other = parent.fork()
+        fork.commit()
+        self.assertEqual(parent.snapshot(), fork.snapshot())
+        self.assertEqual(parent.attribute.Luck, 99)
+        self.assertEqual(fork.diff(), {})
+        other.add_stat("Str", 1)
+        with self.assertRaises(ForkConflictError):
+            other.commit()
+        other.discard()
+        self.assertEqual(other.snapshot(), before)
+        self.assertEqual(other.diff(), {})
+
+        # Writes to the parent do not reach its forks either.
+        child = parent.fork()
+        parent.level_up()
+        self.assertEqual(child.character_attribute.Level, fork.character_attribute.Level)
+        with self.assertRaises(ValueError):
+            parent.diff()
+
+    def test_fork_skills_are_not_shared(self):
+        parent = BaseCharacter(CharAttribute(1, 0, 0, 1, 1, 1, "Forked", "human", 20, {"Slash": "basic"}, 0), self.attribute)
+        fork = parent.fork()
+        with self.assertRaises(TypeError):
+            fork.character_attribute.Skills["Ice"] = "2"
+        self.assertEqual(parent.character_attribute.Skills, {"Slash": "basic"})
+        self.assertEqual(fork.diff(), {})
+        fork.set_stat("Luck", 1)
+        fork._char_attribute.Skills["Ice"] = "2"
+        self.assertNotIn("Ice", parent.character_attribute.Skills)
+        self.assertEqual(fork.diff()["Skills"], ({"Slash": "basic"}, {"Slash": "basic", "Ice": "2"}))
+